@@ -1,8 +1,7 @@
-# Standard library imports
-import csv
-
 # Third-party imports
+import asyncio
 import dotenv
+from contextlib import asynccontextmanager
 from fastapi import (
     APIRouter,
     FastAPI,
@@ -13,34 +12,82 @@ from fastapi import (
     Response,
     UploadFile,
 )
+from fastapi.responses import StreamingResponse
 from typing import List
 
 # Local application/library specific imports
 import openai
-from app.utils.openai_utils import get_embedding
-from app.utils.description import build_vehicle_description
-from app.models.vehicle import Vehicle
+from app.services.cache.answer_cache import kavak_answer_cache
+from app.services.cache.embedding_cache import embedding_cache
+from app.services.cache.filter_cache import filter_cache
+from app.services.cache.search_cache import search_result_cache
+from app.services.ingestion.job_runner import (
+    job_store,
+    resume_ingestion_jobs,
+    submit_ingestion_job,
+)
+from app.services.intent.intent_classifier import intent_classifier
+from app.services.llm.openai_client import (
+    chat_breaker,
+    chat_call_counters,
+    chat_flight,
+    chat_latency,
+)
+from app.services.llm.rate_limiter import chat_limiter, embedding_limiter
+from app.services.memory.closure_jobs import closure_jobs
 from app.services.memory.cognitive_orchestrator import CognitiveOrchestrator
-from app.services.storage.relational_storage import RelationalStorage
-from app.services.storage.search_engine_storage import SearchEngineStorage
-from app.utils.helpers import parse_bool, parse_float
+from app.services.memory.compaction import compaction_counters
+from app.services.memory.context_builder import load_tokenizer
+from app.services.memory.session_sweeper import session_sweeper
 from app.utils.messaging import send_whatsapp_message
+from app.utils.openai_utils import embedding_flight
 from app.utils.sanitization import sanitize_message
+from app.utils.timing import StageTimer
 from app.services.search.search_handler import perform_vehicle_search
 
 dotenv.load_dotenv()
-app = FastAPI()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Resumes the ingestion and conversation closure jobs that were interrupted by
+    a restart, and starts loading the history tokenizer and closing idle
+    conversations in the background.
+    """
+    try:
+        await resume_ingestion_jobs()
+    except Exception as e:
+        print(f"Could not resume ingestion jobs: {e}")
+    try:
+        await closure_jobs.resume()
+    except Exception as e:
+        print(f"Could not resume conversation closures: {e}")
+    # Token counts are estimated until the tokenizer is loaded.
+    tokenizer = asyncio.create_task(load_tokenizer())
+    sweeper = asyncio.create_task(session_sweeper.run())
+    yield
+    tokenizer.cancel()
+    sweeper.cancel()
+
+
+app = FastAPI(lifespan=lifespan)
 router = APIRouter()
 app.include_router(router)
 
 
 @app.get("/search")
-async def search_similar_vehicles(query: str = Query(...), k: int = 5) -> List[dict]:
+async def search_similar_vehicles(
+    response: Response, query: str = Query(...), k: int = 5
+) -> List[dict]:
     """
     Performs a semantic search over the vehicle index using the user's query.
     Extracts structured filters using a language model before searching.
 
+    The latency of every stage is reported in the `Server-Timing` header.
+
     Args:
+        response (Response): Outgoing response, used to set headers.
         query (str): User's search input.
         k (int): Number of similar results to return.
 
@@ -48,79 +95,58 @@ async def search_similar_vehicles(query: str = Query(...), k: int = 5) -> List[d
         List[dict]: Matching vehicles with metadata.
     """
 
+    timer = StageTimer()
     try:
-        results = await perform_vehicle_search(query, k)
-        return results
+        results = await perform_vehicle_search(query, k, timer=timer)
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Search error: {e}")
+    response.headers["Server-Timing"] = timer.server_timing()
+    return results
 
 
-@app.post("/upload")
-async def upload_csv(file: UploadFile = File(...)) -> dict:
+@app.post("/upload", status_code=202)
+async def upload_csv(file: UploadFile = File(...), prune: bool = False) -> dict:
     """
-    Uploads a CSV file and ingests the data into PostgreSQL and OpenSearch in chunks.
+    Accepts a CSV file and ingests it into PostgreSQL and OpenSearch in the background.
+
+    Vehicles whose content has not changed since the previous upload are skipped.
+    Progress can be followed at `GET /upload/{job_id}`.
 
     Args:
         file (UploadFile): CSV file uploaded by the user.
+        prune (bool): Deletes previously ingested vehicles that are missing from the file.
 
     Returns:
-        dict: Result summary.
+        dict: The job identifier and its status URL.
     """
     try:
-        reader = csv.DictReader(line.decode("utf-8") for line in file.file)
-        records = []
-        total_processed = 0
-
-        relational_storage = RelationalStorage()
-        search_engine_storage = SearchEngineStorage()
-
-        for row in reader:
-            try:
-                record = Vehicle(
-                    stock_id=int(row["stock_id"]),
-                    km=int(row["km"]),
-                    price=parse_float(row["price"]),
-                    make=row["make"],
-                    model=row["model"],
-                    year=int(row["year"]),
-                    version=row["version"],
-                    bluetooth=parse_bool(row["bluetooth"]),
-                    largo=parse_float(row["largo"]),
-                    ancho=parse_float(row["ancho"]),
-                    altura=parse_float(row["altura"]),
-                    car_play=parse_bool(row["car_play"]),
-                )
-                records.append(record.model_dump())
-            except (ValueError, KeyError) as e:
-                raise HTTPException(status_code=400, detail=f"Invalid data format: {e}")
-
-            if len(records) == 10:
-                await relational_storage.bulk_load({"records": records})
-                for record in records:
-                    vehicle = Vehicle(**record)
-                    description = build_vehicle_description(vehicle)
-                    vector = await get_embedding(description)
-                    await search_engine_storage.index_with_embedding(
-                        description, record, vector
-                    )
-                total_processed += len(records)
-                records = []
-
-        if records:
-            await relational_storage.bulk_load({"records": records})
-            for record in records:
-                vehicle = Vehicle(**record)
-                description = build_vehicle_description(vehicle)
-                vector = await get_embedding(description)
-                await search_engine_storage.index_with_embedding(
-                    description, record, vector
-                )
-            total_processed += len(records)
-
+        job_id = await submit_ingestion_job(file.file, file.filename, prune)
     except Exception as e:
         raise HTTPException(status_code=400, detail=f"Error processing CSV file: {e}")
 
-    return {"message": "Upload successful", "records_processed": total_processed}
+    return {
+        "message": "Upload accepted",
+        "job_id": job_id,
+        "status_url": f"/upload/{job_id}",
+    }
+
+
+@app.get("/upload/{job_id}")
+async def upload_status(job_id: str) -> dict:
+    """
+    Returns the status and progress counters of an ingestion job.
+
+    Args:
+        job_id (str): Identifier returned by `/upload`.
+
+    Returns:
+        dict: Job state.
+    """
+    job = await job_store.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    job.pop("path", None)
+    return {"job_id": job_id, **job}
 
 
 @app.post("/webhook/whatsapp")
@@ -132,6 +158,9 @@ async def whatsapp_webhook(request: Request):
     Args:
         request (Request): Incoming HTTP request from Twilio containing message data.
 
+    Sandbox requests get the response streamed as plain text while it is generated,
+    so the first words arrive before the whole answer is ready.
+
     Returns:
         Response: HTTP response with status 200 and response text.
     """
@@ -142,12 +171,17 @@ async def whatsapp_webhook(request: Request):
     sandbox = form.get("Sandbox")
 
     orchestrator = await CognitiveOrchestrator.from_defaults()
+    if sandbox:
+        return StreamingResponse(
+            orchestrator.stream_incoming_message(from_number, user_msg),
+            media_type="text/plain; charset=utf-8",
+        )
+
     response_text = await orchestrator.handle_incoming_message(from_number, user_msg)
     
     print(f"response_text {response_text}")
 
-    if not sandbox:
-        send_whatsapp_message(raw_from, response_text)
+    send_whatsapp_message(raw_from, response_text)
 
     return Response(status_code=200, content=response_text)
 
@@ -156,6 +190,7 @@ async def whatsapp_webhook(request: Request):
 async def migrate_memory_endpoint(user_id: str):
     """
     Triggers the persistence of memory data to long-term storage for the given user ID.
+    The writes run in a background closure job.
 
     Args:
         user_id (str): The user's phone number identifier.
@@ -165,12 +200,61 @@ async def migrate_memory_endpoint(user_id: str):
     """
     try:
         orchestrator = await CognitiveOrchestrator.from_defaults()
-        await orchestrator.persist_conversation_closure(user_id)
-        return {"message": f"Memoria migrada correctamente para el usuario {user_id}"}
+        if not await orchestrator.persist_conversation_closure(user_id):
+            return {"message": f"Ya hay una migración en curso para el usuario {user_id}"}
+        return {"message": f"Migración de memoria en curso para el usuario {user_id}"}
     except Exception as e:
         return {"error": str(e)}
 
 
+@app.get("/debug/cache-stats")
+async def cache_stats_endpoint() -> dict:
+    """
+    Returns hit counters of the in-process caches.
+
+    Returns:
+        dict: Statistics per cache.
+    """
+    return {
+        "embeddings": embedding_cache.stats(),
+        "filters": filter_cache.stats(),
+        "search_results": search_result_cache.stats(),
+        "kavak_answers": kavak_answer_cache.stats(),
+    }
+
+
+@app.get("/debug/llm-stats")
+async def llm_stats_endpoint() -> dict:
+    """
+    Returns counters of the OpenAI call layer.
+
+    Returns:
+        dict: Coalesced calls, rate limiter queues, chat breaker state,
+            latency histogram, retries, timeouts and fallbacks, how many
+            messages the local intent classifier handled, working memory
+            compactions, idle conversations closed and closure jobs.
+    """
+    return {
+        "single_flight": {
+            "chat": chat_flight.stats(),
+            "embeddings": embedding_flight.stats(),
+        },
+        "rate_limits": {
+            "chat": chat_limiter.stats(),
+            "embeddings": embedding_limiter.stats(),
+        },
+        "chat": {
+            "breaker": chat_breaker.stats(),
+            "latency": chat_latency.stats(),
+            **chat_call_counters,
+        },
+        "intent_classifier": intent_classifier.stats(),
+        "memory_compaction": dict(compaction_counters),
+        "idle_sessions": session_sweeper.stats(),
+        "closure_jobs": closure_jobs.stats(),
+    }
+
+
 # Author information endpoint
 @app.get("/author")
 async def get_author():
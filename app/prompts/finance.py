@@ -38,3 +38,97 @@ FINANCE_PROMPT = """
 	<usuario>{user_input}</usuario>
 	<vehiculo>{vehicle_data}</vehiculo>
 	"""
+
+FINANCE_EXPLANATION_PROMPT = """
+	Actúa como un asesor financiero especializado en compra de automóviles.
+
+	Ya se calcularon las cotizaciones de financiamiento; están en <cotizaciones> en formato JSON.
+	Cada cotización incluye el vehículo, precio, enganche, monto financiado, tasa anual, plazo, mensualidad, total pagado, intereses y la mensualidad en otros plazos (by_term) con el mismo enganche.
+	Si el usuario pidió la tabla de amortización, la primera cotización incluye `schedule`: por cada año, los intereses y el capital pagados y el saldo al final del año.
+
+	Tu tarea es explicarlas en lenguaje natural, de forma breve y clara, respondiendo a lo que pidió el usuario.
+	No recalcules ni modifiques ninguna cifra: usa exactamente los montos de las cotizaciones, en pesos mexicanos (MXN).
+
+	No ofrezcas consejos legales ni garantices aprobación del crédito. Aclara que es un cálculo estimado.
+
+	<usuario>{user_input}</usuario>
+	<cotizaciones>{quotes}</cotizaciones>
+	"""
+
+
+def _money(amount: float) -> str:
+    """Formats an amount in pesos, e.g. 10782 -> "$10,782 MXN"."""
+    return f"${amount:,.0f} MXN"
+
+
+def _percent(fraction: float) -> str:
+    """Formats a fraction as a percentage, e.g. 0.125 -> "12.5%"."""
+    return f"{round(fraction * 100, 2):g}%"
+
+
+def _vehicle_name(vehicle: dict) -> str:
+    """Names a vehicle from its make, model, year and version, when known."""
+    parts = [str(vehicle[key]) for key in ("make", "model", "year", "version") if vehicle.get(key)]
+    return " ".join(parts) or "el vehículo"
+
+
+def render_financing_quotes(quotes: list) -> str:
+    """
+    Writes financing quotes as a WhatsApp message, without calling the LLM.
+
+    Args:
+        quotes (list): Quotes from `quote_vehicles`, all with the same term and rate;
+            the yearly amortization of the first one is listed if it has a `schedule`.
+
+    Returns:
+        str: The message in Spanish.
+    """
+    first = quotes[0]
+    if len({quote["down_payment"] for quote in quotes}) == 1:
+        down_payment = f"del {_percent(first['down_payment'])}"
+    else:
+        down_payment = f"de {_money(first['down_payment_amount'])}"
+    conditions = (
+        f"con un enganche {down_payment} a {first['term_months']} meses "
+        f"y una tasa anual del {_percent(first['annual_rate'])}"
+    )
+    disclaimer = (
+        "Es un cálculo estimado; la tasa final y la aprobación dependen del análisis de crédito."
+    )
+
+    schedule = [
+        f"- Año {row['year']}: {_money(row['principal'])} a capital, "
+        f"{_money(row['interest'])} de intereses, saldo de {_money(row['balance'])}"
+        for row in first.get("schedule", [])
+    ]
+    if schedule:
+        # With several quotes, names the vehicle the schedule belongs to.
+        owner = f" de {_vehicle_name(first['vehicle'])}" if len(quotes) > 1 else ""
+        schedule.insert(0, f"Amortización por año{owner}:")
+
+    if len(quotes) == 1:
+        other_terms = " · ".join(
+            f"{months} meses: {_money(payment)}"
+            for months, payment in first["by_term"].items()
+            if months != first["term_months"]
+        )
+        return (
+            f"Para {_vehicle_name(first['vehicle'])} de {_money(first['price'])}, {conditions}, "
+            f"tu mensualidad estimada sería de {_money(first['monthly_payment'])} "
+            f"(enganche de {_money(first['down_payment_amount'])}, "
+            f"total a pagar en mensualidades {_money(first['total_paid'])}, "
+            f"de los cuales {_money(first['total_interest'])} son intereses).\n"
+            f"Con el mismo enganche, en otros plazos: {other_terms}.\n"
+            + "".join(f"{line}\n" for line in schedule)
+            + disclaimer
+        )
+
+    lines = [f"Mensualidades estimadas {conditions}:"]
+    lines += [
+        f"- {_vehicle_name(quote['vehicle'])} ({_money(quote['price'])}): "
+        f"{_money(quote['monthly_payment'])} al mes, enganche de {_money(quote['down_payment_amount'])}"
+        for quote in quotes
+    ]
+    lines += schedule
+    lines.append(disclaimer)
+    return "\n".join(lines)
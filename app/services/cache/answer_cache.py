@@ -0,0 +1,242 @@
+import hashlib
+import json
+import os
+import time
+from typing import Dict, List
+
+import numpy as np
+
+from app.prompts.kavak import KAVAK_INFO_PROMPT
+from app.services.cache.filter_cache import prompt_version
+from app.services.llm.model_routing import TASK_KAVAK_INFO, get_model_route
+from app.services.storage.cache_storage import CacheStorage
+from app.utils.helpers import fold_text
+from app.utils.openai_utils import get_embedding
+
+KAVAK_ANSWER_CACHE_THRESHOLD = float(os.getenv("KAVAK_ANSWER_CACHE_THRESHOLD", 0.9))
+KAVAK_ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("KAVAK_ANSWER_CACHE_MAX_ENTRIES", 500))
+KAVAK_ANSWER_CACHE_REDIS_TTL = int(os.getenv("KAVAK_ANSWER_CACHE_REDIS_TTL", 7 * 24 * 3600))
+KAVAK_ANSWER_CACHE_REFRESH_SECONDS = float(os.getenv("KAVAK_ANSWER_CACHE_REFRESH_SECONDS", 30))
+
+# Rows added to the embedding matrix each time it runs out of room.
+_GROWTH_ROWS = 64
+
+
+class SemanticAnswerCache:
+    """Reuses LLM answers for questions similar enough to one answered before.
+
+    Entries live in a Redis hash named after the prompt version, so editing the
+    prompt (or switching its model) starts an empty cache and the old hash expires.
+    Every process keeps the questions' embeddings in a matrix and answers lookups
+    with one matrix product; entries stored by other processes are picked up every
+    `refresh_interval` seconds. Past `max_entries` the oldest answer is evicted,
+    locally and from Redis, so every process agrees on which answers are kept.
+
+    Only use it for prompts whose answer depends on the question alone.
+    """
+
+    def __init__(
+        self,
+        namespace: str,
+        prompt: str,
+        model: str | None = None,
+        storage: CacheStorage | None = None,
+        threshold: float = KAVAK_ANSWER_CACHE_THRESHOLD,
+        max_entries: int = KAVAK_ANSWER_CACHE_MAX_ENTRIES,
+        redis_ttl: int = KAVAK_ANSWER_CACHE_REDIS_TTL,
+        refresh_interval: float = KAVAK_ANSWER_CACHE_REFRESH_SECONDS,
+    ):
+        """
+        Initializes an empty cache.
+
+        Args:
+            namespace (str): Prefix for Redis keys.
+            prompt (str): Prompt template the answers depend on.
+            model (str, optional): Model that writes the answers.
+            storage (CacheStorage, optional): Redis backend. Defaults to `namespace`.
+            threshold (float): Lowest cosine similarity between questions to reuse an answer.
+            max_entries (int): Maximum number of answers kept; the oldest is evicted.
+            redis_ttl (int): Seconds a prompt version is kept after its last new answer.
+            refresh_interval (float): Seconds between checks for answers stored elsewhere.
+        """
+        self.storage = storage or CacheStorage(namespace=namespace)
+        self.version = prompt_version(prompt, model)
+        self.threshold = threshold
+        self.max_entries = max_entries
+        self.redis_ttl = redis_ttl
+        self.refresh_interval = refresh_interval
+        self._ids: Dict[str, int] = {}
+        self._entry_ids: List[str] = []
+        self._answers: List[str] = []
+        self._vectors: np.ndarray | None = None
+        self._stored_at = np.empty(0, dtype=np.float64)
+        self._refreshed_at: float | None = None
+        self.counters = {"hits": 0, "misses": 0, "stored": 0, "evicted": 0, "errors": 0}
+
+    @staticmethod
+    def _entry_id(question: str) -> str:
+        """Identifies a question regardless of case, accents and spacing."""
+        return hashlib.sha256(fold_text(question).encode("utf-8")).hexdigest()[:16]
+
+    def _grow(self, dimensions: int) -> None:
+        """Makes room for more rows, `_GROWTH_ROWS` at a time up to `max_entries`."""
+        size = len(self._answers)
+        capacity = min(self.max_entries, size + _GROWTH_ROWS)
+        vectors = np.empty((capacity, dimensions), dtype=np.float32)
+        stored_at = np.empty(capacity, dtype=np.float64)
+        if self._vectors is not None:
+            vectors[:size] = self._vectors[:size]
+            stored_at[:size] = self._stored_at[:size]
+        self._vectors = vectors
+        self._stored_at = stored_at
+
+    def _add(self, entry_id: str, answer: str, vector: List[float], stored_at: float) -> str | None:
+        """
+        Adds an answer and its unit-length question embedding to the local index.
+
+        Args:
+            entry_id (str): Identifier of the question.
+            answer (str): The cached answer.
+            vector (List[float]): Embedding of the question.
+            stored_at (float): Unix time the answer was stored.
+
+        Returns:
+            str | None: The entry that no longer fits and should leave Redis, if any.
+        """
+        if entry_id in self._ids:
+            return None
+        row = np.asarray(vector, dtype=np.float32)
+        row = row / (np.linalg.norm(row) or 1)
+        size = len(self._answers)
+        evicted = None
+        if size < self.max_entries:
+            if self._vectors is None or size == len(self._vectors):
+                self._grow(len(row))
+            index = size
+            self._entry_ids.append(entry_id)
+            self._answers.append(answer)
+        else:
+            index = int(self._stored_at[:size].argmin())
+            if stored_at <= self._stored_at[index]:
+                return entry_id
+            evicted = self._entry_ids[index]
+            del self._ids[evicted]
+            self._entry_ids[index] = entry_id
+            self._answers[index] = answer
+        self._ids[entry_id] = index
+        self._vectors[index] = row
+        self._stored_at[index] = stored_at
+        return evicted
+
+    async def _forget(self, entry_ids: List[str]) -> None:
+        """Removes evicted answers from Redis so no process loads them again."""
+        self.counters["evicted"] += len(entry_ids)
+        if entry_ids:
+            await self.storage.delete_hash_fields(self.version, entry_ids)
+
+    async def _refresh(self) -> None:
+        """Loads the answers other processes stored since the last check."""
+        now = time.monotonic()
+        if self._refreshed_at is not None and now - self._refreshed_at < self.refresh_interval:
+            return
+        self._refreshed_at = now
+        new_ids = [
+            entry_id
+            for entry_id in await self.storage.get_hash_keys(self.version)
+            if entry_id not in self._ids
+        ]
+        values = await self.storage.get_hash_fields(self.version, new_ids)
+        entries = [
+            (entry_id, json.loads(value))
+            for entry_id, value in zip(new_ids, values)
+            if value is not None
+        ]
+        evicted = []
+        for entry_id, entry in sorted(entries, key=lambda item: item[1].get("stored_at", 0)):
+            dropped = self._add(
+                entry_id, entry["answer"], entry["vector"], entry.get("stored_at", 0)
+            )
+            if dropped is not None:
+                evicted.append(dropped)
+        await self._forget(evicted)
+
+    async def get(self, question: str) -> str | None:
+        """
+        Returns the answer of the most similar cached question, if similar enough.
+
+        Args:
+            question (str): The user's question.
+
+        Returns:
+            str | None: The cached answer, or None on a miss or if Redis or the
+                embeddings are unavailable.
+        """
+        try:
+            await self._refresh()
+            if not self._answers:
+                self.counters["misses"] += 1
+                return None
+            vector = np.asarray(await get_embedding(question), dtype=np.float32)
+        except Exception as e:
+            print(f"Answer cache unavailable, asking the LLM: {e!r}")
+            self.counters["errors"] += 1
+            return None
+        scores = self._vectors[: len(self._answers)] @ (vector / (np.linalg.norm(vector) or 1))
+        best = int(scores.argmax())
+        if scores[best] < self.threshold:
+            self.counters["misses"] += 1
+            return None
+        self.counters["hits"] += 1
+        return self._answers[best]
+
+    async def set(self, question: str, answer: str) -> None:
+        """
+        Stores the answer to a question, unless the cache already has it.
+
+        When the cache is full the oldest answer is evicted.
+
+        Args:
+            question (str): The user's question.
+            answer (str): The LLM's answer.
+        """
+        entry_id = self._entry_id(question)
+        if entry_id in self._ids or self.max_entries <= 0:
+            return
+        stored_at = time.time()
+        try:
+            vector = await get_embedding(question)
+            entry = json.dumps(
+                {"question": question, "answer": answer, "vector": vector, "stored_at": stored_at}
+            )
+            await self.storage.set_hash_fields(self.version, {entry_id: entry})
+            await self.storage.expire(self.version, self.redis_ttl)
+            evicted = self._add(entry_id, answer, vector, stored_at)
+            if evicted is not None:
+                await self._forget([evicted])
+        except Exception as e:
+            print(f"Answer cache unavailable, answer not stored: {e!r}")
+            self.counters["errors"] += 1
+            return
+        self.counters["stored"] += 1
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the hit counters, the hit rate and the number of cached answers.
+
+        Returns:
+            Dict[str, float]: Hits, misses, stored and evicted answers, errors, hit
+                rate and entries.
+        """
+        total = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": self.counters["hits"] / total if total else 0.0,
+            "entries": len(self._answers),
+        }
+
+
+kavak_answer_cache = SemanticAnswerCache(
+    "kavak_answers",
+    prompt=KAVAK_INFO_PROMPT,
+    model=get_model_route(TASK_KAVAK_INFO).model,
+)
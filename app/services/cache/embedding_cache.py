@@ -0,0 +1,158 @@
+import hashlib
+import os
+import unicodedata
+from array import array
+from typing import Dict, List
+
+from redis.exceptions import RedisError
+
+from app.services.cache.local_cache import LocalLRUCache
+from app.services.storage.connections import get_redis_binary_client
+
+EMBEDDING_CACHE_LOCAL_SIZE = int(os.getenv("EMBEDDING_CACHE_LOCAL_SIZE", 2048))
+EMBEDDING_CACHE_LOCAL_TTL = int(os.getenv("EMBEDDING_CACHE_LOCAL_TTL", 3600))
+EMBEDDING_CACHE_REDIS_TTL = int(os.getenv("EMBEDDING_CACHE_REDIS_TTL", 7 * 24 * 3600))
+
+
+def normalize_text(text: str) -> str:
+    """Normalizes text before embedding so equivalent inputs share a cache entry.
+
+    Args:
+        text (str): Raw text.
+
+    Returns:
+        str: NFC normalized text with collapsed whitespace.
+    """
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def encode_vector(vector: List[float]) -> bytes:
+    """Packs a vector as float32 bytes."""
+    return array("f", vector).tobytes()
+
+
+def decode_vector(data: bytes) -> List[float]:
+    """Unpacks float32 bytes into a list of floats."""
+    vector = array("f")
+    vector.frombytes(data)
+    return vector.tolist()
+
+
+class EmbeddingCache:
+    """Two-tier embedding cache: an in-process LRU in front of Redis.
+
+    Keys are a hash of the model name and the normalized text. Both tiers store
+    vectors as raw float32 bytes, about four times smaller than a JSON list and
+    several times smaller than a Python list of floats, and decode them on read.
+    """
+
+    def __init__(
+        self,
+        namespace: str = "embedding",
+        local_size: int = EMBEDDING_CACHE_LOCAL_SIZE,
+        local_ttl: int = EMBEDDING_CACHE_LOCAL_TTL,
+        redis_ttl: int = EMBEDDING_CACHE_REDIS_TTL,
+    ):
+        """
+        Initializes the cache.
+
+        Args:
+            namespace (str): Prefix for Redis keys.
+            local_size (int): Maximum number of vectors kept in process.
+            local_ttl (int): Time to live in seconds of in-process entries.
+            redis_ttl (int): Time to live in seconds of Redis entries.
+        """
+        self.namespace = namespace
+        self.local = LocalLRUCache(max_size=local_size, ttl=local_ttl)
+        self.redis_ttl = redis_ttl
+        self.counters = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+
+    def _make_key(self, model: str, text: str) -> str:
+        """
+        Builds the cache key for a model and normalized text.
+
+        Args:
+            model (str): Embedding model name.
+            text (str): Normalized text.
+
+        Returns:
+            str: The namespaced key.
+        """
+        digest = hashlib.sha256(f"{model}\x00{text}".encode("utf-8")).hexdigest()
+        return f"{self.namespace}:{digest}"
+
+    async def get_many(self, model: str, texts: List[str]) -> List[List[float] | None]:
+        """
+        Looks up cached vectors, checking the local tier before Redis.
+
+        Args:
+            model (str): Embedding model name.
+            texts (List[str]): Normalized texts.
+
+        Returns:
+            List[List[float] | None]: One vector per text, None for misses.
+        """
+        keys = [self._make_key(model, text) for text in texts]
+        results = [self.local.get(key) for key in keys]
+        pending = [i for i, data in enumerate(results) if data is None]
+        results = [None if data is None else decode_vector(data) for data in results]
+        self.counters["local_hits"] += len(keys) - len(pending)
+
+        if pending:
+            try:
+                redis = await get_redis_binary_client()
+                stored = await redis.mget([keys[i] for i in pending])
+            except RedisError as e:
+                print(f"Embedding cache unavailable: {e}")
+                stored = [None] * len(pending)
+            for i, data in zip(pending, stored):
+                if data is None:
+                    self.counters["misses"] += 1
+                    continue
+                self.local.set(keys[i], data)
+                results[i] = decode_vector(data)
+                self.counters["redis_hits"] += 1
+
+        return results
+
+    async def set_many(self, model: str, vectors: Dict[str, List[float]]) -> None:
+        """
+        Stores vectors in both tiers.
+
+        Args:
+            model (str): Embedding model name.
+            vectors (Dict[str, List[float]]): Vectors keyed by normalized text.
+        """
+        if not vectors:
+            return
+        entries = {
+            self._make_key(model, text): encode_vector(vector) for text, vector in vectors.items()
+        }
+        for key, data in entries.items():
+            self.local.set(key, data)
+        try:
+            redis = await get_redis_binary_client()
+            async with redis.pipeline(transaction=False) as pipe:
+                for key, data in entries.items():
+                    pipe.set(key, data, ex=self.redis_ttl)
+                await pipe.execute()
+        except RedisError as e:
+            print(f"Embedding cache unavailable: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the hit counters and the overall hit rate.
+
+        Returns:
+            Dict[str, float]: Local hits, Redis hits, misses, hit rate and local size.
+        """
+        hits = self.counters["local_hits"] + self.counters["redis_hits"]
+        total = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": hits / total if total else 0.0,
+            "local_size": len(self.local),
+        }
+
+
+embedding_cache = EmbeddingCache()
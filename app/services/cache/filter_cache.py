@@ -0,0 +1,162 @@
+import hashlib
+import os
+from typing import Any, Dict
+
+from redis.exceptions import RedisError
+
+from app.prompts.filters import FILTER_EXTRACTION_PROMPT
+from app.services.cache.local_cache import LocalLRUCache
+from app.services.llm.model_routing import TASK_FILTERS, get_model_route
+from app.services.storage.cache_storage import CacheStorage
+from app.utils.helpers import fold_text
+
+FILTER_CACHE_LOCAL_SIZE = int(os.getenv("FILTER_CACHE_LOCAL_SIZE", 1024))
+FILTER_CACHE_LOCAL_TTL = int(os.getenv("FILTER_CACHE_LOCAL_TTL", 600))
+FILTER_CACHE_REDIS_TTL = int(os.getenv("FILTER_CACHE_REDIS_TTL", 24 * 3600))
+FILTER_CACHE_NEGATIVE_TTL = int(os.getenv("FILTER_CACHE_NEGATIVE_TTL", 60))
+
+INVALID_ENTRY = {"invalid": True}
+
+
+def prompt_version(prompt: str, model: str | None = None) -> str:
+    """Short fingerprint of a prompt, so editing it invalidates older entries.
+
+    Args:
+        prompt (str): The prompt template.
+        model (str, optional): Model that answers the prompt; switching models
+            invalidates older entries too.
+
+    Returns:
+        str: The first 12 hex characters of its sha256.
+    """
+    if model:
+        prompt = f"{model}\n{prompt}"
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()[:12]
+
+
+class FilterCache:
+    """Two-tier cache of LLM-extracted search filters keyed by the folded query.
+
+    Entries are `{"filters": {...}}`, or `INVALID_ENTRY` for a short time when the
+    LLM answered with something that is not a JSON object.
+    """
+
+    def __init__(
+        self,
+        storage: CacheStorage | None = None,
+        prompt: str = FILTER_EXTRACTION_PROMPT,
+        model: str | None = None,
+        local_size: int = FILTER_CACHE_LOCAL_SIZE,
+        local_ttl: int = FILTER_CACHE_LOCAL_TTL,
+        redis_ttl: int = FILTER_CACHE_REDIS_TTL,
+        negative_ttl: int = FILTER_CACHE_NEGATIVE_TTL,
+    ):
+        """
+        Initializes the cache.
+
+        Args:
+            storage (CacheStorage, optional): Redis backend. Defaults to the "filters" namespace.
+            prompt (str): Extraction prompt the entries depend on.
+            model (str, optional): Model that extracts the filters; entries depend on it too.
+            local_size (int): Maximum number of entries kept in process.
+            local_ttl (int): Time to live in seconds of in-process entries.
+            redis_ttl (int): Time to live in seconds of Redis entries.
+            negative_ttl (int): Time to live in seconds of invalid-answer entries.
+        """
+        self.storage = storage or CacheStorage(namespace="filters")
+        self.version = prompt_version(prompt, model)
+        self.local = LocalLRUCache(max_size=local_size, ttl=local_ttl)
+        self.redis_ttl = redis_ttl
+        self.negative_ttl = negative_ttl
+        self.counters = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+
+    def _make_key(self, query: str) -> str:
+        """
+        Builds the key of a query for the current prompt version.
+
+        Args:
+            query (str): Raw user query.
+
+        Returns:
+            str: `<prompt version>:<hash of the folded query>`.
+        """
+        digest = hashlib.sha256(fold_text(query).encode("utf-8")).hexdigest()
+        return f"{self.version}:{digest}"
+
+    async def get(self, query: str) -> Dict[str, Any] | None:
+        """
+        Looks up the entry of a query, checking the local tier before Redis.
+
+        Args:
+            query (str): Raw user query.
+
+        Returns:
+            Dict[str, Any] | None: The cached entry, or None on a miss.
+        """
+        key = self._make_key(query)
+        entry = self.local.get(key)
+        if entry is not None:
+            self.counters["local_hits"] += 1
+            return entry
+        try:
+            entry = await self.storage.get(key)
+        except RedisError as e:
+            print(f"Filter cache unavailable: {e}")
+            entry = None
+        if not isinstance(entry, dict):
+            self.counters["misses"] += 1
+            return None
+        self._set_local(key, entry)
+        self.counters["redis_hits"] += 1
+        return entry
+
+    async def set(self, query: str, filters: Dict[str, Any]) -> None:
+        """
+        Stores the filters extracted for a query.
+
+        Args:
+            query (str): Raw user query.
+            filters (Dict[str, Any]): The bool block returned by the LLM.
+        """
+        await self._store(query, {"filters": filters}, self.redis_ttl)
+
+    async def set_invalid(self, query: str) -> None:
+        """
+        Remembers for a short time that the LLM could not produce filters for a query.
+
+        Args:
+            query (str): Raw user query.
+        """
+        await self._store(query, INVALID_ENTRY, self.negative_ttl)
+
+    async def _store(self, query: str, entry: Dict[str, Any], ttl: int) -> None:
+        """Writes an entry to both tiers."""
+        key = self._make_key(query)
+        self._set_local(key, entry)
+        try:
+            await self.storage.set(key, entry, ttl=ttl)
+        except RedisError as e:
+            print(f"Filter cache unavailable: {e}")
+
+    def _set_local(self, key: str, entry: Dict[str, Any]) -> None:
+        """Caches an entry in process, keeping invalid answers only briefly."""
+        ttl = self.negative_ttl if entry == INVALID_ENTRY else None
+        self.local.set(key, entry, ttl=ttl)
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the hit counters and the overall hit rate.
+
+        Returns:
+            Dict[str, float]: Local hits, Redis hits, misses, hit rate and local size.
+        """
+        hits = self.counters["local_hits"] + self.counters["redis_hits"]
+        total = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": hits / total if total else 0.0,
+            "local_size": len(self.local),
+        }
+
+
+filter_cache = FilterCache(model=get_model_route(TASK_FILTERS).model)
@@ -0,0 +1,71 @@
+import time
+from collections import OrderedDict
+from typing import Any, Hashable
+
+
+class LocalLRUCache:
+    """In-process LRU cache with an optional per-entry time to live."""
+
+    def __init__(self, max_size: int = 1024, ttl: int = 0):
+        """
+        Initializes the cache.
+
+        Args:
+            max_size (int): Maximum number of entries before the least recently used is evicted.
+            ttl (int): Time to live in seconds. If 0, entries only expire by eviction.
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self._entries: OrderedDict = OrderedDict()
+
+    def get(self, key: Hashable) -> Any:
+        """
+        Returns the cached value for a key, refreshing its recency.
+
+        Args:
+            key (Hashable): The cache key.
+
+        Returns:
+            Any: The cached value, or None if missing or expired.
+        """
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        expires_at, value = entry
+        if expires_at and expires_at < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: int | None = None) -> None:
+        """
+        Stores a value, evicting the least recently used entry when full.
+
+        Args:
+            key (Hashable): The cache key.
+            value (Any): The value to store.
+            ttl (int, optional): Overrides the default time to live for this entry.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        expires_at = time.monotonic() + ttl if ttl > 0 else 0
+        self._entries[key] = (expires_at, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        """
+        Removes a key from the cache if present.
+
+        Args:
+            key (Hashable): The cache key.
+        """
+        self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        """Removes every entry."""
+        self._entries.clear()
+
+    def __len__(self) -> int:
+        return len(self._entries)
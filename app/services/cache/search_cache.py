@@ -0,0 +1,156 @@
+import hashlib
+import json
+import os
+import time
+from typing import Any, Dict, List
+
+from redis.exceptions import RedisError
+
+from app.services.cache.local_cache import LocalLRUCache
+from app.services.storage.cache_storage import CacheStorage
+
+SEARCH_CACHE_LOCAL_SIZE = int(os.getenv("SEARCH_CACHE_LOCAL_SIZE", 512))
+SEARCH_CACHE_LOCAL_TTL = int(os.getenv("SEARCH_CACHE_LOCAL_TTL", 60))
+SEARCH_CACHE_REDIS_TTL = int(os.getenv("SEARCH_CACHE_REDIS_TTL", 300))
+CATALOG_VERSION_TTL = float(os.getenv("CATALOG_VERSION_TTL", 1))
+
+CATALOG_VERSION_KEY = "catalog_version"
+
+
+class SearchResultCache:
+    """Two-tier cache of search results, invalidated by a catalog version counter.
+
+    Every key embeds the current catalog version, which ingestion bumps after
+    writing. Results cached before an ingestion are simply never read again and
+    expire on their own. The version is re-read from Redis at most every
+    `CATALOG_VERSION_TTL` seconds.
+    """
+
+    def __init__(
+        self,
+        storage: CacheStorage | None = None,
+        local_size: int = SEARCH_CACHE_LOCAL_SIZE,
+        local_ttl: int = SEARCH_CACHE_LOCAL_TTL,
+        redis_ttl: int = SEARCH_CACHE_REDIS_TTL,
+        version_ttl: float = CATALOG_VERSION_TTL,
+    ):
+        """
+        Initializes the cache.
+
+        Args:
+            storage (CacheStorage, optional): Redis backend. Defaults to the "search" namespace.
+            local_size (int): Maximum number of result lists kept in process.
+            local_ttl (int): Time to live in seconds of in-process entries.
+            redis_ttl (int): Time to live in seconds of Redis entries.
+            version_ttl (float): Seconds the catalog version is reused before re-reading it.
+        """
+        self.storage = storage or CacheStorage(namespace="search")
+        self.local = LocalLRUCache(max_size=local_size, ttl=local_ttl)
+        self.redis_ttl = redis_ttl
+        self.version_ttl = version_ttl
+        self._version: int | None = None
+        self._version_read_at = 0.0
+        self.counters = {"local_hits": 0, "redis_hits": 0, "misses": 0}
+
+    async def catalog_version(self) -> int:
+        """
+        Returns the current catalog version.
+
+        Returns:
+            int: The version, 0 if ingestion never ran.
+        """
+        if self._version is None or time.monotonic() - self._version_read_at > self.version_ttl:
+            self._version = int(await self.storage.get(CATALOG_VERSION_KEY) or 0)
+            self._version_read_at = time.monotonic()
+        return self._version
+
+    async def bump_catalog_version(self) -> int | None:
+        """
+        Invalidates every cached result by moving to a new catalog version.
+
+        Returns:
+            int | None: The new version, or None if Redis is unavailable.
+        """
+        try:
+            self._version = await self.storage.increment(CATALOG_VERSION_KEY)
+        except RedisError as e:
+            print(f"Search cache unavailable, catalog version not bumped: {e}")
+            return None
+        self._version_read_at = time.monotonic()
+        return self._version
+
+    async def _make_key(self, parts: Dict[str, Any]) -> str:
+        """
+        Builds the key of a search for the current catalog version.
+
+        Args:
+            parts (Dict[str, Any]): Everything the results depend on, e.g. query, filters and k.
+
+        Returns:
+            str: `<catalog version>:<hash of the parts>`.
+        """
+        version = await self.catalog_version()
+        digest = hashlib.sha256(
+            json.dumps(parts, sort_keys=True, ensure_ascii=False).encode("utf-8")
+        ).hexdigest()
+        return f"{version}:{digest}"
+
+    async def get(self, parts: Dict[str, Any]) -> List[Dict[str, Any]] | None:
+        """
+        Looks up cached results, checking the local tier before Redis.
+
+        Args:
+            parts (Dict[str, Any]): Everything the results depend on.
+
+        Returns:
+            List[Dict[str, Any]] | None: The cached results, or None on a miss.
+        """
+        try:
+            key = await self._make_key(parts)
+            results = self.local.get(key)
+            if results is not None:
+                self.counters["local_hits"] += 1
+                return results
+            results = await self.storage.get(key)
+        except RedisError as e:
+            print(f"Search cache unavailable: {e}")
+            results = None
+        if not isinstance(results, list):
+            self.counters["misses"] += 1
+            return None
+        self.local.set(key, results)
+        self.counters["redis_hits"] += 1
+        return results
+
+    async def set(self, parts: Dict[str, Any], results: List[Dict[str, Any]]) -> None:
+        """
+        Stores results in both tiers.
+
+        Args:
+            parts (Dict[str, Any]): Everything the results depend on.
+            results (List[Dict[str, Any]]): The search results.
+        """
+        try:
+            key = await self._make_key(parts)
+            self.local.set(key, results)
+            await self.storage.set(key, results, ttl=self.redis_ttl)
+        except RedisError as e:
+            print(f"Search cache unavailable: {e}")
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Returns the hit counters and the overall hit rate.
+
+        Returns:
+            Dict[str, float]: Local hits, Redis hits, misses, hit rate and local size.
+        """
+        hits = self.counters["local_hits"] + self.counters["redis_hits"]
+        total = hits + self.counters["misses"]
+        return {
+            **self.counters,
+            "hit_rate": hits / total if total else 0.0,
+            "local_size": len(self.local),
+        }
+
+
+search_result_cache = SearchResultCache()
@@ -0,0 +1,272 @@
+"""Deterministic car financing quotes.
+
+Payments follow the French amortization formula `PMT = P*r / (1 - (1 + r)^-n)`
+with a monthly rate `r`. Every function broadcasts over NumPy arrays, so a whole
+search result can be quoted over every term and down payment option at once.
+"""
+
+import os
+import re
+from typing import Any, Dict, Iterable, List, Sequence
+
+import numpy as np
+
+from app.services.search.filter_parser import AMOUNT_PATTERN, parse_amount
+from app.utils.helpers import fold_text
+
+FINANCE_ANNUAL_RATE = float(os.getenv("FINANCE_ANNUAL_RATE", 0.13))
+FINANCE_DOWN_PAYMENT = float(os.getenv("FINANCE_DOWN_PAYMENT", 0.20))
+FINANCE_TERM_MONTHS = int(os.getenv("FINANCE_TERM_MONTHS", 36))
+
+TERM_OPTIONS = (12, 24, 36, 48, 60, 72)
+DOWN_PAYMENT_OPTIONS = (0.10, 0.20, 0.30, 0.40)
+
+# Amounts below this are not car prices (e.g. "a 48 meses", "3 autos").
+MIN_VEHICLE_PRICE = 10_000
+
+_PERCENT = r"(\d+(?:[.,]\d+)?)\s*(?:%|por\s*ciento)"
+_TERM_RE = re.compile(r"\b(\d{1,3})\s*(meses|mensualidades|anos)\b")
+_DOWN_PERCENT_RES = (
+    re.compile(rf"\benganche\s+(?:del?\s+)?(?:un\s+)?{_PERCENT}"),
+    re.compile(rf"{_PERCENT}\s+de\s+enganche\b"),
+)
+_DOWN_AMOUNT_RE = re.compile(rf"\benganche\s+(?:de\s+)?{AMOUNT_PATTERN}")
+_RATE_RE = re.compile(rf"\b(?:tasa|interes)\b[^\d%]{{0,25}}{_PERCENT}")
+_AMOUNT_RE = re.compile(AMOUNT_PATTERN)
+_SCHEDULE_RE = re.compile(
+    r"\b(?:amortizacion(?:es)?|amortizar|calendario de pagos|tabla de pagos"
+    r"|corrida financiera|desglose de (?:los )?(?:pagos|mensualidades))\b"
+)
+_DISTANCE_RE = re.compile(r"\s*(?:km|kms|kilometros|kilometraje)\b")
+
+
+def monthly_payment(principal: Any, annual_rate: Any, months: Any) -> np.ndarray:
+    """
+    Computes the fixed monthly payment of a loan, element-wise.
+
+    Args:
+        principal (Any): Amount financed; a number or an array.
+        annual_rate (Any): Nominal annual interest rate, e.g. 0.13; a number or an array.
+        months (Any): Number of monthly payments; a number or an array.
+
+    Returns:
+        np.ndarray: Monthly payments, broadcast over the inputs.
+    """
+    principal = np.asarray(principal, dtype=np.float64)
+    rate = np.asarray(annual_rate, dtype=np.float64) / 12
+    months = np.asarray(months, dtype=np.float64)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        amortized = principal * rate / (1 - (1 + rate) ** -months)
+    return np.where(rate == 0, principal / months, amortized)
+
+
+def payment_grid(
+    prices: Sequence[float],
+    down_payments: Sequence[float] = DOWN_PAYMENT_OPTIONS,
+    terms: Sequence[int] = TERM_OPTIONS,
+    annual_rate: float = FINANCE_ANNUAL_RATE,
+) -> np.ndarray:
+    """
+    Computes the monthly payment of every price, down payment and term combination.
+
+    Args:
+        prices (Sequence[float]): Vehicle prices.
+        down_payments (Sequence[float]): Down payments as fractions of the price.
+        terms (Sequence[int]): Loan terms in months.
+        annual_rate (float): Nominal annual interest rate.
+
+    Returns:
+        np.ndarray: Payments of shape `(len(prices), len(down_payments), len(terms))`.
+    """
+    prices = np.asarray(prices, dtype=np.float64)[:, None, None]
+    down = np.asarray(down_payments, dtype=np.float64)[None, :, None]
+    months = np.asarray(terms, dtype=np.float64)[None, None, :]
+    return monthly_payment(prices * (1 - down), annual_rate, months)
+
+
+def amortization_table(principal: float, annual_rate: float, months: int) -> np.ndarray:
+    """
+    Builds the payment schedule of a loan without looping over the months.
+
+    Args:
+        principal (float): Amount financed.
+        annual_rate (float): Nominal annual interest rate.
+        months (int): Number of monthly payments.
+
+    Returns:
+        np.ndarray: One row per month with columns month, payment, interest,
+            principal paid and remaining balance.
+    """
+    rate = annual_rate / 12
+    payment = float(monthly_payment(principal, annual_rate, months))
+    month = np.arange(1, months + 1, dtype=np.float64)
+    if rate:
+        growth = (1 + rate) ** month
+        balance = principal * growth - payment * (growth - 1) / rate
+    else:
+        balance = principal - payment * month
+    balance = np.maximum(balance, 0.0)
+    previous = np.concatenate(([principal], balance[:-1]))
+    interest = previous * rate
+    return np.column_stack(
+        [month, np.full(months, payment), interest, payment - interest, balance]
+    )
+
+
+def yearly_schedule(principal: float, annual_rate: float, months: int) -> List[Dict[str, int]]:
+    """
+    Summarizes the amortization table of a loan by year, short enough for a chat reply.
+
+    Args:
+        principal (float): Amount financed.
+        annual_rate (float): Nominal annual interest rate.
+        months (int): Number of monthly payments.
+
+    Returns:
+        List[Dict[str, int]]: One row per year, the last one possibly partial, with
+            the `interest` and `principal` paid that year and the `balance` left at
+            its end, rounded to pesos.
+    """
+    table = amortization_table(principal, annual_rate, months)
+    starts = np.arange(0, months, 12)
+    interest = np.add.reduceat(table[:, 2], starts)
+    paid = np.add.reduceat(table[:, 3], starts)
+    balance = table[np.minimum(starts + 11, months - 1), 4]
+    return [
+        {
+            "year": year + 1,
+            "interest": round(float(interest[year])),
+            "principal": round(float(paid[year])),
+            "balance": round(float(balance[year])),
+        }
+        for year in range(len(starts))
+    ]
+
+
+def asks_for_schedule(text: str) -> bool:
+    """
+    Tells whether a message asks for the payment schedule of a loan.
+
+    Args:
+        text (str): The user's message, e.g. "¿me pasas la tabla de amortización?".
+
+    Returns:
+        bool: True if it mentions amortization or a payment schedule.
+    """
+    return bool(_SCHEDULE_RE.search(fold_text(text)))
+
+
+def parse_financing_terms(text: str) -> Dict[str, float]:
+    """
+    Reads the financing conditions a user states in a message.
+
+    Args:
+        text (str): The user's message, e.g. "auto de 300 mil a 48 meses con 30% de enganche".
+
+    Returns:
+        Dict[str, float]: Any of `price`, `down_payment` (fraction of the price),
+            `down_payment_amount`, `term_months` and `annual_rate` found in the text.
+    """
+    folded = fold_text(text)
+    terms: Dict[str, float] = {}
+    taken = []
+
+    match = _TERM_RE.search(folded)
+    if match:
+        months = int(match.group(1)) * (12 if match.group(2) == "anos" else 1)
+        if months > 0:
+            terms["term_months"] = months
+        taken.append(match.span())
+
+    for pattern in _DOWN_PERCENT_RES:
+        match = pattern.search(folded)
+        if match:
+            terms["down_payment"] = float(match.group(1).replace(",", ".")) / 100
+            taken.append(match.span())
+            break
+    else:
+        match = _DOWN_AMOUNT_RE.search(folded)
+        if match:
+            terms["down_payment_amount"] = parse_amount(match.group(1), match.group(2))
+            taken.append(match.span())
+
+    match = _RATE_RE.search(folded)
+    if match:
+        terms["annual_rate"] = float(match.group(1).replace(",", ".")) / 100
+        taken.append(match.span())
+
+    for match in _AMOUNT_RE.finditer(folded):
+        if any(start < match.end() and match.start() < end for start, end in taken):
+            continue
+        if folded[match.end():].lstrip().startswith(("%", "por ciento")):
+            continue
+        if _DISTANCE_RE.match(folded, match.end()):
+            # Mileage, e.g. "con 50 mil km".
+            continue
+        value = parse_amount(match.group(1), match.group(2))
+        if value >= MIN_VEHICLE_PRICE:
+            terms["price"] = value
+            break
+    return terms
+
+
+def quote_vehicles(
+    vehicles: Iterable[Dict[str, Any]],
+    down_payment: float = FINANCE_DOWN_PAYMENT,
+    term_months: int = FINANCE_TERM_MONTHS,
+    annual_rate: float = FINANCE_ANNUAL_RATE,
+    terms: Sequence[int] = TERM_OPTIONS,
+) -> List[Dict[str, Any]]:
+    """
+    Quotes several vehicles in one vectorized pass.
+
+    Args:
+        vehicles (Iterable[Dict[str, Any]]): Vehicles with a `price`, e.g. search results.
+        down_payment (float): Down payment as a fraction of the price.
+        term_months (int): Requested term in months.
+        annual_rate (float): Nominal annual interest rate.
+        terms (Sequence[int]): Other terms to show, at the same down payment.
+
+    Returns:
+        List[Dict[str, Any]]: One quote per vehicle with a valid price, with the
+            amounts rounded to pesos and the payment per alternative term.
+    """
+    vehicles = [v for v in vehicles if _price_of(v)]
+    if not vehicles:
+        return []
+    prices = np.array([_price_of(v) for v in vehicles])
+    down_amounts = prices * down_payment
+    financed = prices - down_amounts
+    payments = monthly_payment(financed, annual_rate, term_months)
+    by_term = payment_grid(prices, [down_payment], terms, annual_rate)[:, 0, :]
+    total_paid = payments * term_months
+
+    return [
+        {
+            "vehicle": {
+                key: vehicle[key]
+                for key in ("stock_id", "make", "model", "year", "version")
+                if vehicle.get(key) is not None
+            },
+            "price": round(float(prices[i])),
+            "down_payment": down_payment,
+            "down_payment_amount": round(float(down_amounts[i])),
+            "financed": round(float(financed[i])),
+            "annual_rate": annual_rate,
+            "term_months": term_months,
+            "monthly_payment": round(float(payments[i])),
+            "total_paid": round(float(total_paid[i])),
+            "total_interest": round(float(total_paid[i] - financed[i])),
+            "by_term": {int(t): round(float(p)) for t, p in zip(terms, by_term[i])},
+        }
+        for i, vehicle in enumerate(vehicles)
+    ]
+
+
+def _price_of(vehicle: Dict[str, Any]) -> float | None:
+    """Returns the positive price of a vehicle, if it has one."""
+    try:
+        price = float(vehicle.get("price"))
+    except (TypeError, ValueError):
+        return None
+    return price if price > 0 else None
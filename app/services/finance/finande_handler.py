@@ -1,22 +1,121 @@
-"""Módulo para manejar la intención de financiamiento utilizando un modelo LLM."""
+"""Módulo para manejar la intención de financiamiento.
 
-from app.prompts.finance import FINANCE_PROMPT
+Las mensualidades se calculan localmente con `finance_engine`. El texto de la
+respuesta se arma con una plantilla o, si `FINANCE_REPLY_MODE=llm`, lo redacta el
+LLM a partir de las cifras ya calculadas.
+"""
+
+import json
+import os
+from typing import Any, Dict, List
+
+from app.prompts.finance import (
+    FINANCE_EXPLANATION_PROMPT,
+    FINANCE_PROMPT,
+    render_financing_quotes,
+)
+from app.services.finance.finance_engine import (
+    FINANCE_ANNUAL_RATE,
+    FINANCE_DOWN_PAYMENT,
+    FINANCE_TERM_MONTHS,
+    asks_for_schedule,
+    parse_financing_terms,
+    quote_vehicles,
+    yearly_schedule,
+)
+from app.services.llm.model_routing import TASK_FINANCE
 from app.services.llm.openai_client import OpenAIClient
+from app.utils.helpers import parse_float
+
+FINANCE_REPLY_MODE = os.getenv("FINANCE_REPLY_MODE", "template")
 
 llm = OpenAIClient()
 
 
+def quote_financing(user_msg: str, vehicles: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Cotiza los vehículos con las condiciones que mencione el usuario.
+
+    Si el usuario menciona un precio, se cotiza ese precio en lugar de los vehículos.
+    Las condiciones que no mencione toman los valores por defecto. Si pide la tabla
+    de amortización, la primera cotización la incluye resumida por año en `schedule`.
+
+    Args:
+        user_msg (str): Mensaje del usuario.
+        vehicles (List[Dict[str, Any]]): Vehículos con `price`, por ejemplo resultados de búsqueda.
+
+    Returns:
+        List[Dict[str, Any]]: Una cotización por vehículo; vacía si no hay ningún precio.
+    """
+    terms = parse_financing_terms(user_msg)
+    if "price" in terms:
+        vehicles = [{"price": terms["price"]}]
+    conditions = {
+        "term_months": int(terms.get("term_months", FINANCE_TERM_MONTHS)),
+        "annual_rate": terms.get("annual_rate", FINANCE_ANNUAL_RATE),
+    }
+    if "down_payment_amount" not in terms:
+        quotes = quote_vehicles(
+            vehicles, down_payment=terms.get("down_payment", FINANCE_DOWN_PAYMENT), **conditions
+        )
+    else:
+        quotes = _quote_down_payment_amount(vehicles, terms["down_payment_amount"], conditions)
+    if quotes and asks_for_schedule(user_msg):
+        first = quotes[0]
+        first["schedule"] = yearly_schedule(
+            first["financed"], first["annual_rate"], first["term_months"]
+        )
+    return quotes
+
+
+def _quote_down_payment_amount(
+    vehicles: List[Dict[str, Any]], amount: float, conditions: Dict[str, Any]
+) -> List[Dict[str, Any]]:
+    """Cotiza un enganche en pesos, que es una fracción distinta del precio de cada vehículo."""
+    return [
+        quote
+        for vehicle in vehicles
+        if parse_float(vehicle.get("price")) > 0
+        for quote in quote_vehicles(
+            [vehicle],
+            down_payment=min(amount / parse_float(vehicle["price"]), 1.0),
+            **conditions,
+        )
+    ]
+
+
+def financing_explanation_messages(user_msg: str, quotes: List[Dict[str, Any]]) -> List[Dict[str, str]]:
+    """Arma el prompt para que el LLM explique cotizaciones ya calculadas.
+
+    Args:
+        user_msg (str): Mensaje del usuario.
+        quotes (List[Dict[str, Any]]): Cotizaciones de `quote_financing`.
+
+    Returns:
+        List[Dict[str, str]]: Mensajes para el LLM.
+    """
+    prompt = FINANCE_EXPLANATION_PROMPT.format(
+        user_input=user_msg, quotes=json.dumps(quotes, ensure_ascii=False)
+    )
+    return [{"role": "user", "content": prompt}]
+
+
 async def handle_financing_intent(user_query: str) -> str:
-    """Procesa la intención de financiamiento usando un modelo LLM.
+    """Procesa la intención de financiamiento.
 
     Args:
         user_query (str): La consulta del usuario relacionada con financiamiento.
 
     Returns:
-        str: La respuesta generada por el modelo LLM.
+        str: La cotización; si la consulta no menciona un precio, la respuesta del LLM.
     """
-    messages = [
-        {"role": "system", "content": FINANCE_PROMPT},
-        {"role": "user", "content": user_query},
-    ]
-    return await llm.generate_response(messages)
+    quotes = quote_financing(user_query, [])
+    if quotes and FINANCE_REPLY_MODE != "llm":
+        return render_financing_quotes(quotes)
+    if quotes:
+        messages = financing_explanation_messages(user_query, quotes)
+    else:
+        messages = [
+            {"role": "system", "content": FINANCE_PROMPT},
+            {"role": "user", "content": user_query},
+        ]
+    return await llm.generate_response(messages, task=TASK_FINANCE)
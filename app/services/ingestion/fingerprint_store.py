@@ -0,0 +1,101 @@
+import hashlib
+import json
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+from app.services.storage.cache_storage import CacheStorage
+
+FINGERPRINTS_KEY = "vehicle_fingerprints"
+
+
+def vehicle_fingerprint(record: Dict[str, Any]) -> str:
+    """Computes a stable content hash of a vehicle record.
+
+    The hash covers every stored field, which includes all the fields used by
+    `build_vehicle_description`, so an unchanged fingerprint means both the
+    embedding and the indexed metadata are still current.
+
+    Args:
+        record (Dict[str, Any]): The vehicle record.
+
+    Returns:
+        str: Hex encoded SHA-256 of the record.
+    """
+    payload = json.dumps(record, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class FingerprintStore:
+    """Keeps the last ingested fingerprint of every vehicle in a Redis hash."""
+
+    def __init__(self, storage: CacheStorage | None = None):
+        """
+        Initializes the store.
+
+        Args:
+            storage (CacheStorage, optional): Cache backend. Defaults to the "ingestion" namespace.
+        """
+        self.storage = storage or CacheStorage(namespace="ingestion")
+
+    async def split_changed(
+        self, records: List[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, str]]:
+        """
+        Separates new or modified records from the ones already ingested as-is.
+
+        Args:
+            records (List[Dict[str, Any]]): Validated vehicle records.
+
+        Returns:
+            Tuple[List[Dict[str, Any]], Dict[str, str]]: The changed records and
+                their new fingerprints keyed by stock_id.
+        """
+        fingerprints = {
+            str(record["stock_id"]): vehicle_fingerprint(record) for record in records
+        }
+        stored = await self.storage.get_hash_fields(
+            FINGERPRINTS_KEY, list(fingerprints)
+        )
+        previous = dict(zip(fingerprints, stored))
+        changed = [
+            record
+            for record in records
+            if previous[str(record["stock_id"])] != fingerprints[str(record["stock_id"])]
+        ]
+        return changed, {
+            str(record["stock_id"]): fingerprints[str(record["stock_id"])]
+            for record in changed
+        }
+
+    async def save(self, fingerprints: Dict[str, str]) -> None:
+        """
+        Persists fingerprints of successfully ingested records.
+
+        Args:
+            fingerprints (Dict[str, str]): Fingerprints keyed by stock_id.
+        """
+        await self.storage.set_hash_fields(FINGERPRINTS_KEY, fingerprints)
+
+    async def find_missing(self, seen_ids: Iterable[int]) -> List[int]:
+        """
+        Lists the stock_ids that were ingested before but are absent from `seen_ids`.
+
+        Args:
+            seen_ids (Iterable[int]): The stock_ids present in the latest file.
+
+        Returns:
+            List[int]: The stale stock_ids.
+        """
+        seen: Set[str] = {str(stock_id) for stock_id in seen_ids}
+        stored = await self.storage.get_hash_keys(FINGERPRINTS_KEY)
+        return [int(stock_id) for stock_id in stored if stock_id not in seen]
+
+    async def remove(self, stock_ids: Iterable[int]) -> None:
+        """
+        Forgets the fingerprints of deleted vehicles.
+
+        Args:
+            stock_ids (Iterable[int]): The stock_ids to forget.
+        """
+        await self.storage.delete_hash_fields(
+            FINGERPRINTS_KEY, [str(stock_id) for stock_id in stock_ids]
+        )
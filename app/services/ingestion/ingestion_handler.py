@@ -0,0 +1,131 @@
+"""Vehicle ingestion helpers shared by the `/upload` endpoint."""
+
+import asyncio
+import codecs
+import csv
+from itertools import islice
+from typing import Any, BinaryIO, Dict, Iterable
+
+from app.models.vehicle import Vehicle
+from app.services.cache.search_cache import search_result_cache
+from app.services.ingestion.fingerprint_store import FingerprintStore
+from app.services.ingestion.pipeline import IngestionPipeline, PipelineProgress
+from app.services.storage.relational_storage import RelationalStorage
+from app.services.storage.search_engine_storage import SearchEngineStorage
+from app.utils.helpers import parse_bool, parse_float
+
+
+def parse_vehicle_row(row: Dict[str, str]) -> Dict[str, Any]:
+    """Validates a raw CSV row into a vehicle record.
+
+    Args:
+        row (Dict[str, str]): The CSV row.
+
+    Returns:
+        Dict[str, Any]: The vehicle record.
+
+    Raises:
+        ValueError: If a field is missing or has an invalid format.
+    """
+    try:
+        vehicle = Vehicle(
+            stock_id=int(row["stock_id"]),
+            km=int(row["km"]),
+            price=parse_float(row["price"]),
+            make=row["make"],
+            model=row["model"],
+            year=int(row["year"]),
+            version=row["version"],
+            bluetooth=parse_bool(row["bluetooth"]),
+            largo=parse_float(row["largo"]),
+            ancho=parse_float(row["ancho"]),
+            altura=parse_float(row["altura"]),
+            car_play=parse_bool(row["car_play"]),
+        )
+    except (ValueError, KeyError) as e:
+        raise ValueError(f"Invalid data format: {e}") from e
+    return vehicle.model_dump()
+
+
+async def ingest_csv(
+    file: BinaryIO,
+    prune: bool = False,
+    start_row: int = 0,
+    progress: PipelineProgress | None = None,
+) -> Dict[str, int]:
+    """Streams a vehicle CSV through the ingestion pipeline.
+
+    Args:
+        file (BinaryIO): The uploaded CSV file.
+        prune (bool): Deletes previously ingested vehicles that are missing from the file.
+        start_row (int): Number of leading rows already ingested by a previous run.
+        progress (PipelineProgress, optional): Receives counters and checkpoints.
+
+    Returns:
+        Dict[str, int]: Counts of processed, skipped and deleted records, of rows
+            inserted and updated in PostgreSQL, of created, updated and unchanged
+            OpenSearch documents, and of OpenSearch item errors.
+    """
+    relational_storage = RelationalStorage()
+    search_engine_storage = SearchEngineStorage()
+    fingerprint_store = FingerprintStore()
+    pipeline = IngestionPipeline(
+        relational_storage, search_engine_storage, fingerprint_store, progress
+    )
+
+    seen_ids = set()
+
+    def parse_row(row: Dict[str, str]) -> Dict[str, Any]:
+        record = parse_vehicle_row(row)
+        if prune:
+            seen_ids.add(record["stock_id"])
+        return record
+
+    reader = csv.DictReader(codecs.iterdecode(file, "utf-8"))
+
+    def skip_committed_rows() -> None:
+        # Committed rows are not ingested again but still count as seen for pruning.
+        for row in islice(reader, start_row):
+            if prune:
+                seen_ids.add(int(row["stock_id"]))
+
+    try:
+        if start_row:
+            await asyncio.to_thread(skip_committed_rows)
+        summary = await pipeline.run(reader, parse_row, start_row)
+
+        summary["deleted"] = 0
+        if prune:
+            summary["deleted"] = await prune_missing_vehicles(
+                seen_ids, relational_storage, search_engine_storage, fingerprint_store
+            )
+    finally:
+        # Even a failed run may have written vehicles, so cached searches are stale.
+        await search_result_cache.bump_catalog_version()
+    return summary
+
+
+async def prune_missing_vehicles(
+    seen_ids: Iterable[int],
+    relational_storage: RelationalStorage,
+    search_engine_storage: SearchEngineStorage,
+    fingerprint_store: FingerprintStore,
+) -> int:
+    """Deletes the vehicles that were ingested before but are absent from the latest file.
+
+    Args:
+        seen_ids (Iterable[int]): The stock_ids present in the latest file.
+        relational_storage (RelationalStorage): PostgreSQL storage backend.
+        search_engine_storage (SearchEngineStorage): OpenSearch storage backend.
+        fingerprint_store (FingerprintStore): Store of previously ingested fingerprints.
+
+    Returns:
+        int: Number of vehicles removed.
+    """
+    missing = await fingerprint_store.find_missing(seen_ids)
+    if not missing:
+        return 0
+    await relational_storage.delete_many(missing)
+    await search_engine_storage.bulk_delete(missing)
+    await fingerprint_store.remove(missing)
+    return len(missing)
@@ -0,0 +1,180 @@
+"""Background execution of ingestion jobs.
+
+Uploads are spooled to disk and ingested by an asyncio task while `/upload`
+returns immediately. Progress lives in Redis through `IngestionJobStore`; a job
+that was interrupted resumes from its last checkpoint the next time the
+application starts, as soon as the lease of the stopped worker expires. A job
+that hits a transient error, e.g. an OpenSearch timeout, resumes from its
+checkpoint after a backoff. The spooled upload is deleted once a job ends.
+"""
+
+import asyncio
+import os
+import shutil
+import uuid
+from typing import BinaryIO, Dict
+
+from opensearchpy.exceptions import ConnectionError as OpenSearchConnectionError
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+from sqlalchemy.exc import InterfaceError, OperationalError
+
+from app.services.ingestion.ingestion_handler import ingest_csv
+from app.services.ingestion.job_store import IngestionJobStore, IngestionProgress
+from app.services.llm.resilience import RETRYABLE_ERRORS, backoff_delay
+
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "/tmp/kabot_uploads")
+JOB_LEASE_SECONDS = int(os.getenv("INGESTION_JOB_LEASE_SECONDS", 60))
+JOB_MAX_ATTEMPTS = int(os.getenv("INGESTION_JOB_MAX_ATTEMPTS", 5))
+JOB_RETRY_BASE_DELAY = float(os.getenv("INGESTION_JOB_RETRY_BASE_DELAY", 5))
+JOB_RETRY_MAX_DELAY = float(os.getenv("INGESTION_JOB_RETRY_MAX_DELAY", 300))
+
+# Failures of a backend that may recover; the job resumes from its checkpoint.
+# Anything else, e.g. an invalid row, fails the job.
+TRANSIENT_ERRORS = (
+    *RETRYABLE_ERRORS,
+    ConnectionError,
+    TimeoutError,
+    RedisConnectionError,
+    RedisTimeoutError,
+    OpenSearchConnectionError,
+    OperationalError,
+    InterfaceError,
+)
+
+job_store = IngestionJobStore()
+
+# Keeps strong references so running jobs are not garbage collected.
+_running_jobs: Dict[str, asyncio.Task] = {}
+
+
+def _spool_upload(file: BinaryIO, path: str) -> None:
+    """Copies an uploaded file to disk so the job outlives the request."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as destination:
+        shutil.copyfileobj(file, destination)
+
+
+def _launch(job_id: str) -> None:
+    """Runs a job in the background, keeping a reference until it finishes."""
+    task = asyncio.create_task(run_ingestion_job(job_id))
+    _running_jobs[job_id] = task
+    task.add_done_callback(lambda _: _running_jobs.pop(job_id, None))
+
+
+async def submit_ingestion_job(file: BinaryIO, filename: str, prune: bool) -> str:
+    """Spools an upload to disk, registers a job and starts it in the background.
+
+    Args:
+        file (BinaryIO): The uploaded CSV file.
+        filename (str): Original name of the file.
+        prune (bool): Deletes previously ingested vehicles that are missing from the file.
+
+    Returns:
+        str: The job identifier.
+    """
+    job_id = uuid.uuid4().hex
+    path = os.path.join(UPLOAD_DIR, f"{job_id}.csv")
+    await asyncio.to_thread(_spool_upload, file, path)
+    await job_store.create(job_id, filename, path, prune)
+    _launch(job_id)
+    return job_id
+
+
+async def _keep_lease(job_id: str) -> None:
+    """Renews the job lease while the job runs."""
+    while True:
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+        await job_store.renew_lease(job_id, JOB_LEASE_SECONDS)
+
+
+async def _acquire_lease(job_id: str) -> bool:
+    """Waits for the job lease, e.g. until a crashed worker's lease expires; False once the job finished."""
+    while not await job_store.acquire_lease(job_id, JOB_LEASE_SECONDS):
+        if not await job_store.is_active(job_id):
+            return False
+        await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+    return True
+
+
+def _remove_spool(path: str) -> None:
+    """Deletes the spooled upload of a job that ended."""
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+async def run_ingestion_job(job_id: str) -> None:
+    """Ingests a spooled upload, resuming from the job's last checkpoint.
+
+    Waits while another worker holds the job lease, and does nothing if that
+    worker finishes the job. Transient errors are retried from the checkpoint,
+    up to `JOB_MAX_ATTEMPTS` attempts.
+
+    Args:
+        job_id (str): The job identifier.
+    """
+    attempt = 1
+    while await _run_attempt(job_id, attempt):
+        await asyncio.sleep(backoff_delay(attempt, JOB_RETRY_BASE_DELAY, JOB_RETRY_MAX_DELAY))
+        attempt += 1
+
+
+async def _run_attempt(job_id: str, attempt: int) -> bool:
+    """Runs a job once while holding its lease; True if it should be retried."""
+    if not await _acquire_lease(job_id):
+        return False
+    heartbeat = asyncio.create_task(_keep_lease(job_id))
+    path = os.path.join(UPLOAD_DIR, f"{job_id}.csv")
+    try:
+        job = await job_store.get(job_id)
+        path = job["path"]
+        committed = await job_store.rewind(job_id)
+        await job_store.update(job_id, status="running", attempts=attempt)
+        progress = IngestionProgress(job_store, job_id, committed)
+        with open(path, "rb") as file:
+            summary = await ingest_csv(
+                file,
+                prune=bool(job["prune"]),
+                start_row=job["checkpoint"],
+                progress=progress,
+            )
+        await job_store.finish(
+            job_id,
+            "completed",
+            records_inserted=summary["records_inserted"],
+            records_updated=summary["records_updated"],
+            records_deleted=summary["deleted"],
+            documents_created=summary["created"],
+            documents_updated=summary["updated"],
+            documents_unchanged=summary["unchanged"],
+        )
+        _remove_spool(path)
+    except TRANSIENT_ERRORS as e:
+        if attempt < JOB_MAX_ATTEMPTS:
+            print(f"Ingestion job {job_id} interrupted (attempt {attempt}), retrying: {e!r}")
+            await job_store.update(job_id, status="retrying", error=str(e))
+            return True
+        await _fail(job_id, path, e)
+    except Exception as e:
+        await _fail(job_id, path, e)
+    finally:
+        heartbeat.cancel()
+        await job_store.release_lease(job_id)
+    return False
+
+
+async def _fail(job_id: str, path: str, error: Exception) -> None:
+    """Marks a job as failed and deletes its spooled upload."""
+    print(f"Ingestion job {job_id} failed: {error}")
+    await job_store.finish(job_id, "failed", error=str(error))
+    _remove_spool(path)
+
+
+async def resume_ingestion_jobs() -> None:
+    """Restarts every job that was queued or running when the process stopped."""
+    for job_id in await job_store.list_active():
+        if job_id not in _running_jobs:
+            print(f"Resuming ingestion job {job_id}")
+            _launch(job_id)
@@ -0,0 +1,237 @@
+import os
+from datetime import datetime
+from typing import Any, Dict, List
+
+from app.services.storage.cache_storage import CacheStorage
+
+ACTIVE_JOBS_KEY = "active"
+
+# Counters reported by the pipeline while a job runs.
+COUNTER_FIELDS = (
+    "rows_parsed",
+    "rows_written",
+    "rows_skipped",
+    "rows_embedded",
+    "rows_indexed",
+    "errors",
+)
+
+# Live counters, the checkpoint row and the counters as of that checkpoint.
+PROGRESS_FIELDS = (
+    *COUNTER_FIELDS,
+    "checkpoint",
+    *(f"committed_{field}" for field in COUNTER_FIELDS),
+)
+
+
+class IngestionJobStore:
+    """Tracks background ingestion jobs in Redis hashes.
+
+    Every job lives in `ingestion_job:<job_id>` and unfinished jobs are listed in
+    the `ingestion_job:active` set so they can be resumed after a restart.
+    """
+
+    def __init__(self, storage: CacheStorage | None = None):
+        """
+        Initializes the store.
+
+        Args:
+            storage (CacheStorage, optional): Cache backend. Defaults to the "ingestion_job" namespace.
+        """
+        self.storage = storage or CacheStorage(namespace="ingestion_job")
+
+    async def create(self, job_id: str, filename: str, path: str, prune: bool) -> None:
+        """
+        Registers a new queued job.
+
+        Args:
+            job_id (str): The job identifier.
+            filename (str): Original name of the uploaded file.
+            path (str): Location of the spooled upload on disk.
+            prune (bool): Whether vehicles missing from the file should be deleted.
+        """
+        await self.storage.set_hash_fields(
+            job_id,
+            {
+                "status": "queued",
+                "filename": filename or "",
+                "path": path,
+                "prune": int(prune),
+                "created_at": datetime.utcnow().isoformat(),
+                **{field: 0 for field in PROGRESS_FIELDS},
+            },
+        )
+        await self.storage.add_to_set(ACTIVE_JOBS_KEY, job_id)
+
+    async def get(self, job_id: str) -> Dict[str, Any] | None:
+        """
+        Retrieves the state of a job.
+
+        Args:
+            job_id (str): The job identifier.
+
+        Returns:
+            Dict[str, Any] | None: The job state with integer counters, or None if unknown.
+        """
+        state = await self.storage.get_hash(job_id)
+        if not state:
+            return None
+        for field in (*PROGRESS_FIELDS, "prune"):
+            state[field] = int(state.get(field, 0))
+        return state
+
+    async def update(self, job_id: str, **fields: Any) -> None:
+        """
+        Overwrites fields of a job.
+
+        Args:
+            job_id (str): The job identifier.
+            **fields (Any): The fields to store.
+        """
+        await self.storage.set_hash_fields(job_id, fields)
+
+    async def rewind(self, job_id: str) -> Dict[str, int]:
+        """
+        Resets the live counters to their values at the last checkpoint.
+
+        Rows after the checkpoint are processed again when a job resumes, so
+        their partial progress must not be counted twice.
+
+        Args:
+            job_id (str): The job identifier.
+
+        Returns:
+            Dict[str, int]: The committed counters the job resumes from.
+        """
+        state = await self.get(job_id) or {}
+        committed = {field: state.get(f"committed_{field}", 0) for field in COUNTER_FIELDS}
+        await self.update(job_id, **committed)
+        return committed
+
+    async def increment(self, job_id: str, field: str, amount: int) -> None:
+        """
+        Atomically increments a progress counter.
+
+        Args:
+            job_id (str): The job identifier.
+            field (str): The counter name.
+            amount (int): The increment.
+        """
+        await self.storage.increment_hash_field(job_id, field, amount)
+
+    async def list_active(self) -> List[str]:
+        """
+        Lists the jobs that have not completed or failed.
+
+        Returns:
+            List[str]: The job identifiers.
+        """
+        return await self.storage.get_set_members(ACTIVE_JOBS_KEY)
+
+    async def is_active(self, job_id: str) -> bool:
+        """
+        Checks whether a job has not completed or failed yet.
+
+        Args:
+            job_id (str): The job identifier.
+
+        Returns:
+            bool: True while the job is queued or running.
+        """
+        return await self.storage.is_set_member(ACTIVE_JOBS_KEY, job_id)
+
+    async def finish(self, job_id: str, status: str, **fields: Any) -> None:
+        """
+        Marks a job as finished so it is no longer resumed.
+
+        Args:
+            job_id (str): The job identifier.
+            status (str): Final status, "completed" or "failed".
+            **fields (Any): Extra fields such as the summary or the error.
+        """
+        await self.update(
+            job_id,
+            status=status,
+            finished_at=datetime.utcnow().isoformat(),
+            **fields,
+        )
+        await self.storage.remove_from_set(ACTIVE_JOBS_KEY, job_id)
+
+    async def acquire_lease(self, job_id: str, ttl: int) -> bool:
+        """
+        Takes the exclusive right to run a job, so only one worker processes it.
+
+        Args:
+            job_id (str): The job identifier.
+            ttl (int): Lease duration in seconds. Expires if the worker dies.
+
+        Returns:
+            bool: True if the lease was acquired.
+        """
+        return await self.storage.set_if_absent(f"{job_id}:lease", str(os.getpid()), ttl)
+
+    async def renew_lease(self, job_id: str, ttl: int) -> None:
+        """
+        Extends the lease of a running job.
+
+        Args:
+            job_id (str): The job identifier.
+            ttl (int): New lease duration in seconds.
+        """
+        await self.storage.expire(f"{job_id}:lease", ttl)
+
+    async def release_lease(self, job_id: str) -> None:
+        """
+        Releases the lease of a job.
+
+        Args:
+            job_id (str): The job identifier.
+        """
+        await self.storage.delete(f"{job_id}:lease")
+
+
+class IngestionProgress:
+    """Reports pipeline progress of a single job to the job store."""
+
+    def __init__(
+        self,
+        job_store: IngestionJobStore,
+        job_id: str,
+        committed: Dict[str, int] | None = None,
+    ):
+        """
+        Initializes the reporter.
+
+        Args:
+            job_store (IngestionJobStore): Where progress is persisted.
+            job_id (str): The job being reported.
+            committed (Dict[str, int], optional): Counters committed by a previous run.
+        """
+        self.job_store = job_store
+        self.job_id = job_id
+        self.committed = committed or {}
+
+    async def advance(self, field: str, amount: int) -> None:
+        """
+        Adds to a progress counter.
+
+        Args:
+            field (str): The counter name.
+            amount (int): The increment.
+        """
+        if amount:
+            await self.job_store.increment(self.job_id, field, amount)
+
+    async def checkpoint(self, rows: int, counters: Dict[str, int]) -> None:
+        """
+        Records that every row before `rows` is fully ingested.
+
+        Args:
+            rows (int): Number of leading rows that are safely committed.
+            counters (Dict[str, int]): Counters of the committed rows in this run.
+        """
+        committed = {
+            f"committed_{field}": self.committed.get(field, 0) + counters.get(field, 0)
+            for field in COUNTER_FIELDS
+        }
+        await self.job_store.update(self.job_id, checkpoint=rows, **committed)
@@ -0,0 +1,252 @@
+"""Streaming ingestion pipeline for vehicle CSV uploads.
+
+The upload flows through four stages connected by bounded queues:
+
+    parse/validate -> PostgreSQL write -> embed -> OpenSearch write
+
+Every stage works on batches, so a slow stage only applies back-pressure to the
+ones before it and memory stays bounded by `queue_size * batch_size` rows.
+
+Batches carry a sequence number. A batch is committed once its documents are
+indexed, or as soon as every row turns out to be unchanged. The checkpoint is the
+number of leading rows whose batches are all committed, so a resumed run can
+start from it without skipping any row.
+"""
+
+import asyncio
+import os
+from collections import Counter
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Protocol
+
+from app.models.vehicle import Vehicle
+from app.services.llm.rate_limiter import PRIORITY_BULK
+from app.services.ingestion.fingerprint_store import FingerprintStore
+from app.services.storage.relational_storage import RelationalStorage
+from app.services.storage.search_engine_storage import SearchEngineStorage
+from app.utils.description import build_vehicle_description
+from app.utils.helpers import chunk_records
+from app.utils.openai_utils import get_embeddings
+
+INGESTION_BATCH_SIZE = int(os.getenv("INGESTION_BATCH_SIZE", 1000))
+INGESTION_QUEUE_SIZE = int(os.getenv("INGESTION_QUEUE_SIZE", 4))
+EMBEDDING_BATCH_SIZE = int(os.getenv("EMBEDDING_BATCH_SIZE", 100))
+EMBEDDING_MAX_CONCURRENCY = int(os.getenv("EMBEDDING_MAX_CONCURRENCY", 4))
+
+_DONE = None
+
+
+class PipelineProgress(Protocol):
+    """Receives progress updates from a running pipeline."""
+
+    async def advance(self, field: str, amount: int) -> None: ...
+
+    async def checkpoint(self, rows: int, counters: Dict[str, int]) -> None: ...
+
+
+class IngestionPipeline:
+    """Runs the ingestion stages concurrently over a stream of validated records."""
+
+    def __init__(
+        self,
+        relational_storage: RelationalStorage,
+        search_engine_storage: SearchEngineStorage,
+        fingerprint_store: FingerprintStore | None = None,
+        progress: PipelineProgress | None = None,
+        batch_size: int = INGESTION_BATCH_SIZE,
+        queue_size: int = INGESTION_QUEUE_SIZE,
+        embed_workers: int = EMBEDDING_MAX_CONCURRENCY,
+    ):
+        """
+        Initializes the pipeline.
+
+        Args:
+            relational_storage (RelationalStorage): PostgreSQL storage backend.
+            search_engine_storage (SearchEngineStorage): OpenSearch storage backend.
+            fingerprint_store (FingerprintStore, optional): Skips records that did not change.
+            progress (PipelineProgress, optional): Receives counters and checkpoints.
+            batch_size (int): Number of rows handled together by every stage.
+            queue_size (int): Maximum number of batches waiting between two stages.
+            embed_workers (int): Number of embedding batches in flight at once.
+        """
+        self.relational_storage = relational_storage
+        self.search_engine_storage = search_engine_storage
+        self.fingerprint_store = fingerprint_store
+        self.progress = progress
+        self.batch_size = batch_size
+        self.queue_size = queue_size
+        self.embed_workers = embed_workers
+        self.summary = {
+            "processed": 0,
+            "skipped": 0,
+            "records_inserted": 0,
+            "records_updated": 0,
+            "created": 0,
+            "updated": 0,
+            "unchanged": 0,
+            "errors": 0,
+        }
+        self.checkpoint = 0
+        self._batch_sizes: List[int] = []
+        self._batch_counters: Dict[int, Counter] = {}
+        self._committed_batches = set()
+        self._next_uncommitted = 0
+        self._committed_counters = Counter()
+
+    async def run(
+        self,
+        rows: Iterator[Dict[str, str]],
+        parse_row: Callable[[Dict[str, str]], Dict[str, Any]],
+        start_row: int = 0,
+    ) -> Dict[str, int]:
+        """
+        Streams rows through every stage and waits until all of them finish.
+
+        Args:
+            rows (Iterator[Dict[str, str]]): Raw CSV rows. Read in a worker thread.
+            parse_row (Callable): Validates a raw row into a vehicle record.
+            start_row (int): Rows already consumed from `rows` by a previous run.
+                Checkpoints are reported relative to the whole file.
+
+        Returns:
+            Dict[str, int]: Counts of processed and skipped records, of rows inserted
+                and updated in PostgreSQL, of created, updated and unchanged
+                OpenSearch documents, and of OpenSearch item errors.
+        """
+        self.checkpoint = start_row
+        to_write = asyncio.Queue(maxsize=self.queue_size)
+        to_embed = asyncio.Queue(maxsize=self.queue_size)
+        to_index = asyncio.Queue(maxsize=self.queue_size)
+
+        try:
+            async with asyncio.TaskGroup() as group:
+                group.create_task(self._parse_stage(rows, parse_row, to_write))
+                group.create_task(self._write_stage(to_write, to_embed))
+                for _ in range(self.embed_workers):
+                    group.create_task(self._embed_stage(to_embed, to_index))
+                group.create_task(self._index_stage(to_index))
+        except ExceptionGroup as e:
+            raise e.exceptions[0]
+
+        return self.summary
+
+    async def _advance(self, batch: int, field: str, amount: int) -> None:
+        """Counts progress of a batch and forwards it to the progress reporter."""
+        self._batch_counters[batch][field] += amount
+        if self.progress is not None:
+            await self.progress.advance(field, amount)
+
+    async def _commit(self, batch: int) -> None:
+        """Marks a batch as fully ingested and moves the checkpoint forward."""
+        self._committed_batches.add(batch)
+        moved = False
+        while self._next_uncommitted in self._committed_batches:
+            self._committed_batches.remove(self._next_uncommitted)
+            self.checkpoint += self._batch_sizes[self._next_uncommitted]
+            self._committed_counters.update(
+                self._batch_counters.pop(self._next_uncommitted)
+            )
+            self._next_uncommitted += 1
+            moved = True
+        if moved and self.progress is not None:
+            await self.progress.checkpoint(
+                self.checkpoint, dict(self._committed_counters)
+            )
+
+    async def _parse_stage(
+        self,
+        rows: Iterator[Dict[str, str]],
+        parse_row: Callable[[Dict[str, str]], Dict[str, Any]],
+        output_queue: asyncio.Queue,
+    ) -> None:
+        """Reads and validates rows off the event loop, one batch at a time."""
+
+        def read_batch() -> List[Dict[str, Any]]:
+            return [parse_row(row) for row in islice(rows, self.batch_size)]
+
+        while True:
+            records = await asyncio.to_thread(read_batch)
+            if not records:
+                break
+            batch = len(self._batch_sizes)
+            self._batch_sizes.append(len(records))
+            self._batch_counters[batch] = Counter()
+            self.summary["processed"] += len(records)
+            await self._advance(batch, "rows_parsed", len(records))
+            await output_queue.put((batch, records))
+        await output_queue.put(_DONE)
+
+    async def _write_stage(
+        self, input_queue: asyncio.Queue, output_queue: asyncio.Queue
+    ) -> None:
+        """Drops unchanged records and upserts the rest into PostgreSQL."""
+        while (item := await input_queue.get()) is not _DONE:
+            batch, records = item
+            fingerprints = {}
+            if self.fingerprint_store is not None:
+                changed, fingerprints = await self.fingerprint_store.split_changed(records)
+                self.summary["skipped"] += len(records) - len(changed)
+                await self._advance(batch, "rows_skipped", len(records) - len(changed))
+                records = changed
+            if not records:
+                await self._commit(batch)
+                continue
+            written = await self.relational_storage.bulk_upsert(records)
+            self.summary["records_inserted"] += written["inserted"]
+            self.summary["records_updated"] += written["updated"]
+            await self._advance(batch, "rows_written", len(records))
+            await output_queue.put((batch, records, fingerprints))
+        for _ in range(self.embed_workers):
+            await output_queue.put(_DONE)
+
+    async def _embed_stage(
+        self, input_queue: asyncio.Queue, output_queue: asyncio.Queue
+    ) -> None:
+        """Builds descriptions and embeds them with multi-input requests."""
+        while (item := await input_queue.get()) is not _DONE:
+            batch, records, fingerprints = item
+            descriptions = [
+                build_vehicle_description(Vehicle(**record)) for record in records
+            ]
+            vectors = []
+            for chunk in chunk_records(descriptions, EMBEDDING_BATCH_SIZE):
+                vectors.extend(await get_embeddings(chunk, priority=PRIORITY_BULK))
+            await self._advance(batch, "rows_embedded", len(records))
+            await output_queue.put((batch, records, descriptions, vectors, fingerprints))
+        await output_queue.put(_DONE)
+
+    async def _index_stage(self, input_queue: asyncio.Queue) -> None:
+        """Bulk upserts embedded documents and records their fingerprints."""
+        remaining_workers = self.embed_workers
+        while remaining_workers:
+            item = await input_queue.get()
+            if item is _DONE:
+                remaining_workers -= 1
+                continue
+            batch, records, descriptions, vectors, fingerprints = item
+            result = await self.search_engine_storage.bulk_index_with_embedding(
+                zip(descriptions, records, vectors)
+            )
+            for key in ("created", "updated", "unchanged"):
+                self.summary[key] += result[key]
+            self.summary["errors"] += len(result["errors"])
+            for error in result["errors"]:
+                print(f"index_error: {error}")
+
+            if self.fingerprint_store is not None:
+                failed_ids = {
+                    str(error.get("update", {}).get("_id")) for error in result["errors"]
+                }
+                await self.fingerprint_store.save(
+                    {
+                        stock_id: fingerprint
+                        for stock_id, fingerprint in fingerprints.items()
+                        if stock_id not in failed_ids
+                    }
+                )
+
+            await self._advance(
+                batch, "rows_indexed", len(records) - len(result["errors"])
+            )
+            await self._advance(batch, "errors", len(result["errors"]))
+            await self._commit(batch)
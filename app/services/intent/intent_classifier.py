@@ -0,0 +1,196 @@
+"""Local intent classification by cosine similarity to per-intent embedding centroids.
+
+The message is embedded (through the embedding cache, so a search message is
+embedded once for both classification and kNN) and scored against one centroid
+per intention with a single matrix product. The prediction is only trusted when
+its score and its margin over the runner-up are high enough; otherwise the
+orchestrator asks the LLM as before.
+"""
+
+import asyncio
+import os
+from typing import Dict, List, Sequence
+
+import numpy as np
+
+from app.services.intent.intent_examples import INTENT_EXAMPLES
+from app.utils.openai_utils import EMBEDDING_MODEL, get_embedding, get_embeddings
+
+INTENT_CLASSIFIER_ENABLED = os.getenv("INTENT_CLASSIFIER_ENABLED", "true").lower() == "true"
+INTENT_CLASSIFIER_MIN_SCORE = float(os.getenv("INTENT_CLASSIFIER_MIN_SCORE", 0.35))
+INTENT_CLASSIFIER_MIN_MARGIN = float(os.getenv("INTENT_CLASSIFIER_MIN_MARGIN", 0.05))
+
+# Intentions whose handlers need nothing else from the intent LLM call. The LLM
+# also writes the reply for "none" and identifies the vehicle for "financing", and
+# only it can tell whether "episodic_memory" is needed given the working memory.
+# "exit" closes the conversation, so a misclassification is too costly to skip
+# the LLM; its centroid still keeps farewells from being taken for other intents.
+LOCAL_INTENTS = frozenset({"kavak_info", "search"})
+
+
+def _normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """Scales every row to unit length, leaving zero rows untouched."""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+class IntentPrediction:
+    """Best intention for a message, with its similarity and margin over the runner-up."""
+
+    def __init__(self, intent: str, score: float, margin: float):
+        """
+        Initializes the prediction.
+
+        Args:
+            intent (str): Intention with the most similar centroid.
+            score (float): Cosine similarity to that centroid.
+            margin (float): Difference with the second best similarity.
+        """
+        self.intent = intent
+        self.score = score
+        self.margin = margin
+
+    def __repr__(self) -> str:
+        return f"IntentPrediction({self.intent!r}, score={self.score:.3f}, margin={self.margin:.3f})"
+
+
+class IntentClassifier:
+    """Nearest-centroid intent classifier over OpenAI embeddings."""
+
+    def __init__(
+        self,
+        examples: Dict[str, Sequence[str]] = INTENT_EXAMPLES,
+        min_score: float = INTENT_CLASSIFIER_MIN_SCORE,
+        min_margin: float = INTENT_CLASSIFIER_MIN_MARGIN,
+        model: str = EMBEDDING_MODEL,
+    ):
+        """
+        Initializes the classifier. Centroids are computed on first use.
+
+        Args:
+            examples (Dict[str, Sequence[str]]): Sample messages per intention.
+            min_score (float): Lowest similarity accepted for a prediction.
+            min_margin (float): Lowest lead over the second intention accepted.
+            model (str): Embedding model; must match the one used for messages.
+        """
+        self.examples = examples
+        self.min_score = min_score
+        self.min_margin = min_margin
+        self.model = model
+        self.labels: List[str] = list(examples)
+        self.centroids: np.ndarray | None = None
+        self._lock = asyncio.Lock()
+        self.counters = {"local": 0, "low_confidence": 0, "not_local": 0, "errors": 0}
+
+    def fit(self, vectors: Dict[str, Sequence[Sequence[float]]]) -> None:
+        """
+        Builds the centroid matrix from example embeddings.
+
+        Args:
+            vectors (Dict[str, Sequence[Sequence[float]]]): Embeddings of the examples per intention.
+        """
+        self.labels = list(vectors)
+        centroids = [
+            _normalize_rows(np.asarray(vectors[label], dtype=np.float32)).mean(axis=0)
+            for label in self.labels
+        ]
+        self.centroids = _normalize_rows(np.vstack(centroids))
+
+    async def load(self) -> None:
+        """Embeds the examples and builds the centroids, once."""
+        if self.centroids is not None:
+            return
+        async with self._lock:
+            if self.centroids is not None:
+                return
+            texts = [text for label in self.labels for text in self.examples[label]]
+            embeddings = iter(await get_embeddings(texts, model=self.model))
+            self.fit(
+                {
+                    label: [next(embeddings) for _ in self.examples[label]]
+                    for label in self.labels
+                }
+            )
+
+    def predict_many(self, vectors: Sequence[Sequence[float]]) -> List[IntentPrediction]:
+        """
+        Scores several message embeddings against every centroid at once.
+
+        Args:
+            vectors (Sequence[Sequence[float]]): Message embeddings.
+
+        Returns:
+            List[IntentPrediction]: One prediction per vector, in the same order.
+        """
+        queries = _normalize_rows(np.asarray(vectors, dtype=np.float32))
+        scores = queries @ self.centroids.T
+        best = scores.argmax(axis=1)
+        top_two = np.sort(scores, axis=1)[:, -2:] if scores.shape[1] > 1 else None
+        predictions = []
+        for row, index in enumerate(best):
+            score = float(scores[row, index])
+            margin = float(top_two[row, 1] - top_two[row, 0]) if top_two is not None else score
+            predictions.append(IntentPrediction(self.labels[index], score, margin))
+        return predictions
+
+    def predict(self, vector: Sequence[float]) -> IntentPrediction:
+        """
+        Scores a message embedding against every centroid.
+
+        Args:
+            vector (Sequence[float]): Message embedding.
+
+        Returns:
+            IntentPrediction: The most similar intention.
+        """
+        return self.predict_many([vector])[0]
+
+    def is_confident(self, prediction: IntentPrediction) -> bool:
+        """
+        Tells whether a prediction clears the score and margin thresholds.
+
+        Args:
+            prediction (IntentPrediction): The prediction.
+
+        Returns:
+            bool: True if the prediction can be trusted.
+        """
+        return prediction.score >= self.min_score and prediction.margin >= self.min_margin
+
+    async def classify(self, text: str) -> str | None:
+        """
+        Classifies a message locally when the answer is clear and needs no LLM output.
+
+        Args:
+            text (str): The user's message.
+
+        Returns:
+            str | None: One of `LOCAL_INTENTS`, or None to fall back to the LLM.
+        """
+        try:
+            await self.load()
+            prediction = self.predict(await get_embedding(text, model=self.model))
+        except Exception as e:
+            print(f"Local intent classification failed: {e!r}")
+            self.counters["errors"] += 1
+            return None
+        if not self.is_confident(prediction):
+            self.counters["low_confidence"] += 1
+            return None
+        if prediction.intent not in LOCAL_INTENTS:
+            self.counters["not_local"] += 1
+            return None
+        self.counters["local"] += 1
+        return prediction.intent
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns how many messages were classified locally and why others were not.
+
+        Returns:
+            Dict[str, int]: Counters of local predictions and fallbacks.
+        """
+        return dict(self.counters)
+
+
+intent_classifier = IntentClassifier()
@@ -0,0 +1,70 @@
+"""Sample messages per intention, used to build the centroids of the local intent classifier.
+
+Editing this file changes the centroids on the next start. Keep every list varied
+(short and long, formal and informal) and free of overlap with the other intentions.
+"""
+
+INTENT_EXAMPLES = {
+    "exit": [
+        "gracias, eso es todo",
+        "muchas gracias por tu ayuda, hasta luego",
+        "nos vemos",
+        "adiós",
+        "ya no necesito nada más, bye",
+        "perfecto, gracias, que tengas buen día",
+        "hasta pronto",
+        "listo, me despido",
+    ],
+    "kavak_info": [
+        "¿qué es Kavak?",
+        "¿cómo funciona Kavak?",
+        "¿dónde están sus sucursales?",
+        "¿qué garantía ofrece Kavak?",
+        "¿Kavak compra autos usados?",
+        "¿cuál es el horario de atención?",
+        "¿tienen periodo de prueba si no me gusta el auto?",
+        "¿qué incluye la inspección de Kavak?",
+        "¿en qué ciudades tienen sede?",
+    ],
+    "search": [
+        "busco un mazda 3",
+        "quiero un auto con carplay de menos de 300 mil",
+        "¿tienen jetta 2019?",
+        "muéstrame SUVs familiares",
+        "autos con bluetooth y menos de 50 mil km",
+        "¿qué autos tienen entre 200 y 250 mil pesos?",
+        "busco un sedán automático económico",
+        "quiero ver camionetas del 2020 en adelante",
+        "¿hay algún nissan versa disponible?",
+    ],
+    "financing": [
+        "¿cuánto pagaría al mes?",
+        "¿puedo comprarlo a crédito?",
+        "¿qué opciones de financiamiento tienen?",
+        "¿de cuánto sería el enganche?",
+        "quiero pagarlo a 48 meses",
+        "¿cuál es la tasa de interés del crédito?",
+        "¿cuánto quedaría la mensualidad con 20% de enganche?",
+        "¿puedo pagarlo en mensualidades?",
+    ],
+    "episodic_memory": [
+        "¿qué auto te había dicho que me gustaba?",
+        "¿recuerdas lo que hablamos la otra vez?",
+        "¿cuál era el primer auto que me mostraste?",
+        "la semana pasada te pregunté por un coche, ¿cuál era?",
+        "¿qué presupuesto te dije antes?",
+        "¿te acuerdas de mi nombre?",
+        "regresemos al auto que vimos ayer",
+    ],
+    "none": [
+        "hola",
+        "buenos días",
+        "¿cómo estás?",
+        "¿quién eres?",
+        "cuéntame un chiste",
+        "¿qué clima hace hoy?",
+        "ok",
+        "jajaja",
+        "¿eres un robot?",
+    ],
+}
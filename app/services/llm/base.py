@@ -1,5 +1,5 @@
 from abc import ABC, abstractmethod
-from typing import Dict
+from typing import AsyncIterator, Dict
 
 
 class LLMBase(ABC):
@@ -19,15 +19,35 @@ class LLMBase(ABC):
         pass
 
     @abstractmethod
-    async def generate_response(self, messages: list) -> str:
+    async def generate_response(self, messages: list, task: str | None = None) -> str:
         """
         Generate a response based on a list of structured chat messages.
 
         Args:
             messages (list): A list of messages, where each message is a dictionary 
                              containing 'role' and 'content' keys.
+            task (str, optional): Kind of call (e.g. "intent", "finance"), which
+                                  implementations may use to pick a model.
 
         Returns:
             str: The generated response.
         """
         pass
+
+    async def stream_response(
+        self, messages: list, task: str | None = None
+    ) -> AsyncIterator[str]:
+        """
+        Generate a response and yield it in pieces as soon as they are available.
+
+        Models that cannot stream yield the whole response at once.
+
+        Args:
+            messages (list): A list of messages, where each message is a dictionary
+                             containing 'role' and 'content' keys.
+            task (str, optional): Kind of call, as in `generate_response`.
+
+        Yields:
+            str: Consecutive fragments of the generated response.
+        """
+        yield await self.generate_response(messages, task=task)
@@ -0,0 +1,89 @@
+"""Per-task model selection for chat completions.
+
+Every LLM call names its task. A task may override the model, temperature and
+answer length with `OPENAI_<TASK>_MODEL`, `OPENAI_<TASK>_TEMPERATURE` and
+`OPENAI_<TASK>_MAX_TOKENS` (e.g. `OPENAI_INTENT_MODEL`). Settings that are not
+overridden fall back to `OPENAI_MODEL`, `OPENAI_TEMPERATURE` and no token limit,
+so classification and JSON extraction can run on a small fast model while the
+answers keep the bigger one.
+"""
+
+import os
+from typing import Any, Dict
+
+TASK_INTENT = "intent"
+TASK_FILTERS = "filters"
+TASK_SUMMARY_MERGE = "summary_merge"
+TASK_FACT_MERGE = "fact_merge"
+TASK_VEHICLE_SUMMARY = "vehicle_summary"
+TASK_FINANCE = "finance"
+TASK_KAVAK_INFO = "kavak_info"
+TASK_EXIT = "exit"
+
+TASKS = (
+    TASK_INTENT,
+    TASK_FILTERS,
+    TASK_SUMMARY_MERGE,
+    TASK_FACT_MERGE,
+    TASK_VEHICLE_SUMMARY,
+    TASK_FINANCE,
+    TASK_KAVAK_INFO,
+    TASK_EXIT,
+)
+
+
+class ModelRoute:
+    """Model, temperature and answer length used for one kind of LLM call."""
+
+    def __init__(self, model: str | None, temperature: float, max_tokens: int | None = None):
+        """
+        Initializes the route.
+
+        Args:
+            model (str | None): Chat model name.
+            temperature (float): Sampling temperature.
+            max_tokens (int | None): Maximum tokens of the answer, or None for no limit.
+        """
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+
+    def request_params(self) -> Dict[str, Any]:
+        """
+        Returns the parameters of a chat completion request for this route.
+
+        Returns:
+            Dict[str, Any]: `model`, `temperature` and, when set, `max_tokens`.
+        """
+        params = {"model": self.model, "temperature": self.temperature}
+        if self.max_tokens is not None:
+            params["max_tokens"] = self.max_tokens
+        return params
+
+    def __repr__(self) -> str:
+        return (
+            f"ModelRoute(model={self.model!r}, temperature={self.temperature}, "
+            f"max_tokens={self.max_tokens})"
+        )
+
+
+def get_model_route(task: str | None = None) -> ModelRoute:
+    """
+    Resolves the model settings of a task from the environment.
+
+    Args:
+        task (str, optional): Task name such as `TASK_INTENT`. None returns the defaults.
+
+    Returns:
+        ModelRoute: The settings to use for the call.
+    """
+    model = os.getenv("OPENAI_MODEL")
+    temperature = float(os.getenv("OPENAI_TEMPERATURE", 0.7))
+    max_tokens = None
+    if task:
+        prefix = f"OPENAI_{task.upper()}_"
+        model = os.getenv(f"{prefix}MODEL") or model
+        temperature = float(os.getenv(f"{prefix}TEMPERATURE") or temperature)
+        if os.getenv(f"{prefix}MAX_TOKENS"):
+            max_tokens = int(os.getenv(f"{prefix}MAX_TOKENS"))
+    return ModelRoute(model, temperature, max_tokens)
@@ -1,9 +1,56 @@
+import asyncio
+import hashlib
+import json
 import os
-from typing import Dict, List
+import time
+from typing import AsyncIterator, Dict, List
+
+import openai
 
 from app.services.llm.base import LLMBase
+from app.services.llm.model_routing import ModelRoute, get_model_route
+from app.services.llm.rate_limiter import (
+    PRIORITY_INTERACTIVE,
+    Lease,
+    chat_limiter,
+    estimate_tokens,
+    parse_retry_after,
+)
+from app.services.llm.resilience import (
+    RETRYABLE_ERRORS,
+    CircuitBreaker,
+    CircuitOpenError,
+    LatencyHistogram,
+    QueueDeadlineError,
+    backoff_delay,
+)
+from app.services.llm.single_flight import SingleFlight
 from app.services.storage.connections import get_openai_client
 
+# Tokens reserved for the answer on top of the prompt estimate, unless the task sets max_tokens.
+CHAT_COMPLETION_TOKENS = int(os.getenv("OPENAI_CHAT_COMPLETION_TOKENS", 300))
+
+OPENAI_CHAT_TIMEOUT = float(os.getenv("OPENAI_CHAT_TIMEOUT", 20))
+OPENAI_CHAT_DEADLINE = float(os.getenv("OPENAI_CHAT_DEADLINE", 45))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", 2))
+OPENAI_RETRY_BASE_DELAY = float(os.getenv("OPENAI_RETRY_BASE_DELAY", 0.5))
+OPENAI_RETRY_MAX_DELAY = float(os.getenv("OPENAI_RETRY_MAX_DELAY", 8))
+
+FALLBACK_RESPONSE = (
+    "Lo siento, en este momento no puedo responder. "
+    "Por favor intenta de nuevo en unos minutos."
+)
+
+# Shared by every client, so identical concurrent prompts reach OpenAI only once.
+chat_flight = SingleFlight("chat")
+chat_breaker = CircuitBreaker(
+    "chat",
+    failure_threshold=int(os.getenv("OPENAI_BREAKER_FAILURES", 5)),
+    reset_timeout=float(os.getenv("OPENAI_BREAKER_RESET_SECONDS", 30)),
+)
+chat_latency = LatencyHistogram()
+chat_call_counters = {"retries": 0, "timeouts": 0, "fallbacks": 0}
+
 
 class OpenAIClient(LLMBase):
     """Asynchronous OpenAI client that implements the LLMBase interface.
@@ -12,10 +59,35 @@ class OpenAIClient(LLMBase):
     and interpreting user input.
     """
 
-    def __init__(self):
-        """Initializes the OpenAIClient with model parameters from environment variables."""
-        self.model = os.getenv("OPENAI_MODEL")
-        self.temperature = float(os.getenv("OPENAI_TEMPERATURE", 0.7))
+    def __init__(
+        self,
+        priority: int = PRIORITY_INTERACTIVE,
+        fallback_response: str | None = FALLBACK_RESPONSE,
+        timeout: float = OPENAI_CHAT_TIMEOUT,
+        deadline: float = OPENAI_CHAT_DEADLINE,
+        max_retries: int = OPENAI_MAX_RETRIES,
+    ):
+        """Initializes the OpenAIClient with model parameters from environment variables.
+
+        The model and temperature are the defaults for calls without a task; calls
+        that name a task use the settings routed to it (see `model_routing`).
+
+        Args:
+            priority (int, optional): Queue priority in the shared chat rate limiter.
+            fallback_response (str | None, optional): Returned when the call fails or the
+                provider is unhealthy. None raises the error instead.
+            timeout (float, optional): Seconds allowed for a single attempt.
+            deadline (float, optional): Seconds allowed for all attempts together.
+            max_retries (int, optional): Extra attempts after a transient failure.
+        """
+        default_route = get_model_route()
+        self.model = default_route.model
+        self.temperature = default_route.temperature
+        self.priority = priority
+        self.fallback_response = fallback_response
+        self.timeout = timeout
+        self.deadline = deadline
+        self.max_retries = max_retries
         self.client = None
 
     async def get_client(self):
@@ -28,24 +100,251 @@ class OpenAIClient(LLMBase):
             self.client = await get_openai_client()
         return self.client
 
-    async def generate_response(self, messages: List[Dict]) -> str:
+    def route(self, task: str | None = None) -> ModelRoute:
+        """Returns the model settings for a task.
+
+        Args:
+            task (str, optional): Task name. None uses the client's model and temperature.
+
+        Returns:
+            ModelRoute: The settings to use for the call.
+        """
+        if task is None:
+            return ModelRoute(self.model, self.temperature)
+        return get_model_route(task)
+
+    async def generate_response(self, messages: List[Dict], task: str | None = None) -> str:
         """Generates a response from the language model based on the given message history.
 
+        Identical requests in flight at the same time share one upstream call.
+        Transient failures are retried with jittered exponential backoff within the
+        deadline. Once the circuit breaker opens, calls fail fast.
+
         Args:
             messages (List[Dict]): A list of message dictionaries representing the conversation history.
+            task (str, optional): Kind of call, used to pick the model settings.
 
         Returns:
-            str: The generated response from the language model.
+            str: The generated response from the language model, or the fallback
+                response if the call failed.
+
+        Raises:
+            Exception: The last error, when the client has no fallback response.
         """
         if not self.client:
             self.client = await self.get_client()
-        response = await self.client.chat.completions.create(
-            model=self.model,
-            temperature=self.temperature,
-            messages=messages,
+        route = self.route(task)
+        payload = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+        key = (
+            route.model,
+            route.temperature,
+            route.max_tokens,
+            hashlib.sha256(payload.encode("utf-8")).hexdigest(),
         )
+        tokens = estimate_tokens(payload) + (route.max_tokens or CHAT_COMPLETION_TOKENS)
+        try:
+            return await chat_flight.do(
+                key, lambda: self._complete_with_retries(messages, tokens, route)
+            )
+        except (CircuitOpenError, *RETRYABLE_ERRORS) as e:
+            if self.fallback_response is None:
+                raise
+            print(f"LLM unavailable, using fallback response: {e!r}")
+            chat_call_counters["fallbacks"] += 1
+            return self.fallback_response
+
+    async def _complete_with_retries(
+        self, messages: List[Dict], tokens: int, route: ModelRoute
+    ) -> str:
+        """Runs attempts until one succeeds, the error is permanent or time runs out.
+
+        The timeout of an attempt starts once the rate limiter grants it, so time spent
+        queued is neither a timeout nor a failure recorded by the circuit breaker.
+        """
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            if not chat_breaker.allow():
+                raise CircuitOpenError("OpenAI chat circuit is open")
+            attempt += 1
+            delay = None
+            async with chat_limiter.limit(tokens, self.priority) as lease:
+                remaining = self._remaining_after_queue(deadline)
+                try:
+                    result = await asyncio.wait_for(
+                        self._create_completion(messages, route, lease),
+                        timeout=min(self.timeout, remaining),
+                    )
+                except RETRYABLE_ERRORS as e:
+                    delay = self._retry_delay(e, attempt, deadline)
+                    if delay is None:
+                        raise
+                except Exception:
+                    # Requests the provider rejects are not a sign of an outage.
+                    chat_breaker.record_success()
+                    raise
+            if delay is not None:
+                # Backs off without holding the rate limiter slot.
+                await asyncio.sleep(delay)
+                continue
+            chat_breaker.record_success()
+            return result
+
+    @staticmethod
+    def _remaining_after_queue(deadline: float) -> float:
+        """Returns the time left once a rate limiter slot is granted.
+
+        Raises:
+            QueueDeadlineError: If the deadline passed while queued. The provider was
+                not called, so the circuit breaker does not count it.
+        """
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            chat_call_counters["timeouts"] += 1
+            raise QueueDeadlineError("Deadline passed while waiting for the chat rate limit")
+        return remaining
+
+    def _retry_delay(self, error: Exception, attempt: int, deadline: float) -> float | None:
+        """Records a transient failure and tells how long to wait before the next attempt.
+
+        Args:
+            error (Exception): The retryable error of the last attempt.
+            attempt (int): Number of attempts made so far.
+            deadline (float): Monotonic time by which all attempts must be done.
+
+        Returns:
+            float | None: Seconds to sleep, or None when retries or time are exhausted.
+        """
+        chat_breaker.record_failure()
+        if isinstance(error, asyncio.TimeoutError):
+            chat_call_counters["timeouts"] += 1
+        delay = backoff_delay(attempt, OPENAI_RETRY_BASE_DELAY, OPENAI_RETRY_MAX_DELAY)
+        if isinstance(error, openai.RateLimitError):
+            delay = max(delay, parse_retry_after(error.response.headers) or 0)
+        if attempt > self.max_retries or time.monotonic() + delay >= deadline:
+            return None
+        chat_call_counters["retries"] += 1
+        return delay
+
+    async def _create_completion(
+        self, messages: List[Dict], route: ModelRoute, lease: Lease
+    ) -> str:
+        """Sends a chat completion request holding a chat rate limiter lease."""
+        started = time.monotonic()
+        try:
+            response = await self.client.chat.completions.create(
+                messages=messages, **route.request_params()
+            )
+        except openai.RateLimitError as e:
+            chat_limiter.on_rate_limited(parse_retry_after(e.response.headers))
+            raise
+        finally:
+            chat_latency.observe(time.monotonic() - started)
+        chat_limiter.on_success()
+        used = getattr(getattr(response, "usage", None), "total_tokens", None)
+        if isinstance(used, int):
+            lease.used_tokens = used
         return response.choices[0].message.content.strip()
 
+    async def stream_response(
+        self, messages: List[Dict], task: str | None = None
+    ) -> AsyncIterator[str]:
+        """Streams the response of the language model token by token.
+
+        Streams are not shared between identical requests. Failures before the first
+        token are retried like `generate_response`; once text has been sent the stream
+        can only be cut short, so a later failure ends it with the text produced so far.
+
+        Args:
+            messages (List[Dict]): A list of message dictionaries representing the conversation history.
+            task (str, optional): Kind of call, used to pick the model settings.
+
+        Yields:
+            str: Fragments of the response as they arrive, or the fallback response if
+                the call failed before producing any text.
+
+        Raises:
+            Exception: The last error, when the client has no fallback response.
+        """
+        if not self.client:
+            self.client = await self.get_client()
+        route = self.route(task)
+        payload = json.dumps(messages, sort_keys=True, ensure_ascii=False)
+        tokens = estimate_tokens(payload) + (route.max_tokens or CHAT_COMPLETION_TOKENS)
+        deadline = time.monotonic() + self.deadline
+        attempt = 0
+        while True:
+            emitted = False
+            try:
+                if not chat_breaker.allow():
+                    raise CircuitOpenError("OpenAI chat circuit is open")
+                attempt += 1
+                async with chat_limiter.limit(tokens, self.priority):
+                    first_token_timeout = min(
+                        self.timeout, self._remaining_after_queue(deadline)
+                    )
+                    started = time.monotonic()
+                    try:
+                        async for text in self._stream_chunks(messages, route, first_token_timeout):
+                            emitted = True
+                            yield text
+                    except openai.RateLimitError as e:
+                        chat_limiter.on_rate_limited(parse_retry_after(e.response.headers))
+                        raise
+                    finally:
+                        chat_latency.observe(time.monotonic() - started)
+                    chat_limiter.on_success()
+                chat_breaker.record_success()
+                return
+            except (CircuitOpenError, *RETRYABLE_ERRORS) as e:
+                delay = None
+                if emitted:
+                    chat_breaker.record_failure()
+                elif not isinstance(e, (CircuitOpenError, QueueDeadlineError)):
+                    delay = self._retry_delay(e, attempt, deadline)
+                if delay is not None:
+                    await asyncio.sleep(delay)
+                    continue
+                if self.fallback_response is None:
+                    raise
+                chat_call_counters["fallbacks"] += 1
+                if emitted:
+                    print(f"LLM stream interrupted, ending reply early: {e!r}")
+                    return
+                print(f"LLM unavailable, using fallback response: {e!r}")
+                yield self.fallback_response
+                return
+            except Exception:
+                chat_breaker.record_success()
+                raise
+
+    async def _stream_chunks(
+        self, messages: List[Dict], route: ModelRoute, first_token_timeout: float
+    ) -> AsyncIterator[str]:
+        """Opens a streamed completion and yields its text, bounding every wait by a timeout."""
+        stream = await asyncio.wait_for(
+            self.client.chat.completions.create(
+                messages=messages, stream=True, **route.request_params()
+            ),
+            timeout=first_token_timeout,
+        )
+        chunks = stream.__aiter__()
+        started = False
+        while True:
+            try:
+                chunk = await asyncio.wait_for(chunks.__anext__(), timeout=self.timeout)
+            except StopAsyncIteration:
+                return
+            if not chunk.choices:
+                continue
+            text = chunk.choices[0].delta.content or ""
+            if not started:
+                # Match generate_response, which strips the finished text.
+                text = text.lstrip()
+                started = bool(text)
+            if text:
+                yield text
+
     async def interpret(self, user_input: str) -> Dict:
         """Interprets user input and returns a basic intent response.
 
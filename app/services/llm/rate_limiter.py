@@ -0,0 +1,269 @@
+"""Client-side rate limiting of OpenAI calls.
+
+Each limiter owns a request budget (RPM), a token budget (TPM) and a maximum
+number of calls in flight. Callers wait in a priority queue, so interactive
+traffic (chat replies, query embeddings) is always served before bulk work
+such as ingestion. When OpenAI answers 429 the limiter pauses for the
+`Retry-After` window and halves its refill rate, then recovers it gradually with
+every successful call.
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, Mapping
+
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BULK = 1
+PRIORITY_NAMES = {PRIORITY_INTERACTIVE: "interactive", PRIORITY_BULK: "bulk"}
+
+DEFAULT_RETRY_AFTER = 1.0
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count of a text, about four characters per token.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: Estimated tokens, at least 1.
+    """
+    return max(1, len(text) // 4)
+
+
+def parse_retry_after(headers: Mapping[str, str] | None) -> float | None:
+    """Reads the wait suggested by a 429 response.
+
+    Args:
+        headers (Mapping[str, str] | None): Response headers.
+
+    Returns:
+        float | None: Seconds to wait, or None if the headers do not say.
+    """
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms") is not None:
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after") is not None:
+            return float(headers["retry-after"])
+    except ValueError:
+        return None
+    return None
+
+
+class Lease:
+    """A granted slot. The caller may report the real token usage once known."""
+
+    def __init__(self, tokens: int):
+        """
+        Initializes the lease.
+
+        Args:
+            tokens (int): Tokens reserved for the call.
+        """
+        self.tokens = tokens
+        self.used_tokens: int | None = None
+
+
+class RateLimiter:
+    """Token-bucket limiter for requests and tokens per minute with priorities."""
+
+    def __init__(
+        self,
+        name: str,
+        requests_per_minute: int,
+        tokens_per_minute: int,
+        max_concurrency: int,
+        min_scale: float = 0.1,
+        recovery_step: float = 0.05,
+    ):
+        """
+        Initializes the limiter with full buckets.
+
+        Args:
+            name (str): Label used in metrics.
+            requests_per_minute (int): Request budget.
+            tokens_per_minute (int): Token budget.
+            max_concurrency (int): Maximum number of calls in flight.
+            min_scale (float): Lowest fraction of the budget used after repeated 429s.
+            recovery_step (float): Fraction of the budget regained per successful call.
+        """
+        self.name = name
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self.max_concurrency = max_concurrency
+        self.min_scale = min_scale
+        self.recovery_step = recovery_step
+
+        self._requests = float(requests_per_minute)
+        self._tokens = float(tokens_per_minute)
+        self._updated_at = time.monotonic()
+        self._scale = 1.0
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._waiters: list = []
+        self._sequence = itertools.count()
+        self._timer: asyncio.TimerHandle | None = None
+
+        self.counters = {"granted": 0, "rate_limited": 0}
+        self._waits = {
+            name: {"count": 0, "total": 0.0, "max": 0.0} for name in PRIORITY_NAMES.values()
+        }
+
+    def _refill(self) -> None:
+        """Adds the budget accrued since the last refill."""
+        now = time.monotonic()
+        elapsed = now - self._updated_at
+        self._updated_at = now
+        self._requests = min(
+            self.requests_per_minute,
+            self._requests + elapsed * self.requests_per_minute * self._scale / 60,
+        )
+        self._tokens = min(
+            self.tokens_per_minute,
+            self._tokens + elapsed * self.tokens_per_minute * self._scale / 60,
+        )
+
+    def _seconds_until_available(self, tokens: int) -> float:
+        """Time until both buckets can pay for a call and no pause is active."""
+        pause = self._paused_until - time.monotonic()
+        missing_requests = (1 - self._requests) * 60 / (self.requests_per_minute * self._scale)
+        missing_tokens = (tokens - self._tokens) * 60 / (self.tokens_per_minute * self._scale)
+        return max(0.0, pause, missing_requests, missing_tokens)
+
+    def _dispatch(self) -> None:
+        """Grants slots to waiters in priority order while the budget allows."""
+        self._refill()
+        while self._waiters:
+            _, _, tokens, future = self._waiters[0]
+            if future.done():
+                heapq.heappop(self._waiters)
+                continue
+            if self._in_flight >= self.max_concurrency:
+                return
+            wait = self._seconds_until_available(tokens)
+            if wait > 0:
+                self._schedule(wait)
+                return
+            heapq.heappop(self._waiters)
+            self._requests -= 1
+            self._tokens -= tokens
+            self._in_flight += 1
+            future.set_result(None)
+
+    def _schedule(self, delay: float) -> None:
+        """Re-runs the dispatcher once the head of the queue can be served."""
+        if self._timer is not None:
+            self._timer.cancel()
+        self._timer = asyncio.get_running_loop().call_later(delay, self._dispatch)
+
+    def _release(self, lease: Lease) -> None:
+        """Frees the slot of a finished call and settles its real token usage."""
+        self._in_flight -= 1
+        if lease.used_tokens is not None:
+            self._tokens += lease.tokens - lease.used_tokens
+        self._dispatch()
+
+    @asynccontextmanager
+    async def limit(
+        self, tokens: int = 1, priority: int = PRIORITY_INTERACTIVE
+    ) -> AsyncIterator[Lease]:
+        """
+        Waits for budget, then holds a slot for the duration of the block.
+
+        Args:
+            tokens (int): Estimated tokens of the call.
+            priority (int): `PRIORITY_INTERACTIVE` or `PRIORITY_BULK`.
+
+        Yields:
+            Lease: Set `used_tokens` on it to correct the estimate.
+        """
+        lease = Lease(min(tokens, self.tokens_per_minute))
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), lease.tokens, future))
+        started = time.monotonic()
+        self._dispatch()
+        try:
+            await future
+        except asyncio.CancelledError:
+            if future.done() and not future.cancelled():
+                # The slot was granted right as the caller was cancelled.
+                self._release(lease)
+            raise
+        self._record_wait(priority, time.monotonic() - started)
+        try:
+            yield lease
+        finally:
+            self._release(lease)
+
+    def _record_wait(self, priority: int, seconds: float) -> None:
+        """Accumulates queue wait time per priority."""
+        self.counters["granted"] += 1
+        waits = self._waits[PRIORITY_NAMES.get(priority, "bulk")]
+        waits["count"] += 1
+        waits["total"] += seconds
+        waits["max"] = max(waits["max"], seconds)
+
+    def on_success(self) -> None:
+        """Regains part of the budget after a successful call."""
+        self._scale = min(1.0, self._scale + self.recovery_step)
+
+    def on_rate_limited(self, retry_after: float | None = None) -> None:
+        """
+        Backs off after a 429: pauses for the suggested window and halves the rate.
+
+        Args:
+            retry_after (float, optional): Seconds suggested by the provider.
+        """
+        self.counters["rate_limited"] += 1
+        self._refill()
+        self._scale = max(self.min_scale, self._scale / 2)
+        pause = retry_after if retry_after is not None else DEFAULT_RETRY_AFTER
+        self._paused_until = max(self._paused_until, time.monotonic() + pause)
+        self._requests = min(self._requests, 0.0)
+        self._tokens = min(self._tokens, 0.0)
+        if self._waiters:
+            self._dispatch()
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Returns queue and budget metrics.
+
+        Returns:
+            Dict[str, Any]: Granted calls, 429s, current rate scale, calls in flight,
+                queue length and queue wait times (in ms) per priority.
+        """
+        return {
+            **self.counters,
+            "scale": round(self._scale, 3),
+            "in_flight": self._in_flight,
+            "queued": sum(1 for *_, future in self._waiters if not future.done()),
+            "wait_ms": {
+                name: {
+                    "count": waits["count"],
+                    "avg": round(waits["total"] / waits["count"] * 1000, 1) if waits["count"] else 0.0,
+                    "max": round(waits["max"] * 1000, 1),
+                }
+                for name, waits in self._waits.items()
+            },
+        }
+
+
+chat_limiter = RateLimiter(
+    "chat",
+    requests_per_minute=int(os.getenv("OPENAI_CHAT_RPM", 500)),
+    tokens_per_minute=int(os.getenv("OPENAI_CHAT_TPM", 200_000)),
+    max_concurrency=int(os.getenv("OPENAI_CHAT_MAX_CONCURRENCY", 32)),
+)
+
+embedding_limiter = RateLimiter(
+    "embeddings",
+    requests_per_minute=int(os.getenv("OPENAI_EMBEDDING_RPM", 3_000)),
+    tokens_per_minute=int(os.getenv("OPENAI_EMBEDDING_TPM", 1_000_000)),
+    max_concurrency=int(os.getenv("OPENAI_EMBEDDING_MAX_CONCURRENCY", 16)),
+)
@@ -0,0 +1,164 @@
+"""Failure handling for OpenAI calls: retry backoff, circuit breaker and latency metrics."""
+
+import asyncio
+import bisect
+import random
+import time
+from typing import Dict, Sequence
+
+import openai
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+# Transient failures worth another attempt. Other API errors are the caller's fault.
+RETRYABLE_ERRORS = (
+    asyncio.TimeoutError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError,
+)
+
+
+class CircuitOpenError(RuntimeError):
+    """Raised when a call is rejected because the provider is considered unhealthy."""
+
+
+class QueueDeadlineError(asyncio.TimeoutError):
+    """Raised when the deadline of a call passes before a rate limiter slot is granted."""
+
+
+def backoff_delay(attempt: int, base: float, cap: float) -> float:
+    """Exponential backoff with full jitter.
+
+    Args:
+        attempt (int): Number of attempts already made, starting at 1.
+        base (float): Delay in seconds after the first attempt, before jitter.
+        cap (float): Maximum delay in seconds.
+
+    Returns:
+        float: Seconds to sleep, uniformly drawn from [0, min(cap, base * 2^(attempt-1))].
+    """
+    return random.uniform(0, min(cap, base * 2 ** (attempt - 1)))
+
+
+class CircuitBreaker:
+    """Stops calling a provider after consecutive failures, then probes it again.
+
+    Closed: calls go through. After `failure_threshold` consecutive failures the
+    breaker opens and rejects calls for `reset_timeout` seconds. Then it lets a
+    single probe through (half open): success closes it, failure opens it again.
+    """
+
+    def __init__(self, name: str, failure_threshold: int = 5, reset_timeout: float = 30):
+        """
+        Initializes a closed breaker.
+
+        Args:
+            name (str): Label used in metrics.
+            failure_threshold (int): Consecutive failures that open the breaker.
+            reset_timeout (float): Seconds the breaker stays open before probing.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probing = False
+        self._probe_started_at = 0.0
+        self.counters = {"rejected": 0, "opened": 0}
+
+    def allow(self) -> bool:
+        """
+        Tells whether a call may be attempted now.
+
+        Returns:
+            bool: False while the breaker is open or a probe is already running.
+        """
+        now = time.monotonic()
+        if self.state == OPEN and now - self._opened_at >= self.reset_timeout:
+            self.state = HALF_OPEN
+            self._probing = False
+        if self.state == CLOSED:
+            return True
+        # A probe that never reported back (e.g. cancelled) is replaced after a while.
+        if self.state == HALF_OPEN and (
+            not self._probing or now - self._probe_started_at >= self.reset_timeout
+        ):
+            self._probing = True
+            self._probe_started_at = now
+            return True
+        self.counters["rejected"] += 1
+        return False
+
+    def record_success(self) -> None:
+        """Closes the breaker and resets the failure count."""
+        self.state = CLOSED
+        self._failures = 0
+        self._probing = False
+
+    def record_failure(self) -> None:
+        """Counts a failure, opening the breaker at the threshold or after a failed probe."""
+        self._failures += 1
+        if self.state == HALF_OPEN or self._failures >= self.failure_threshold:
+            if self.state != OPEN:
+                self.counters["opened"] += 1
+            self.state = OPEN
+            self._opened_at = time.monotonic()
+            self._probing = False
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Returns the breaker state and counters.
+
+        Returns:
+            Dict[str, object]: State, consecutive failures, rejected calls and times opened.
+        """
+        return {"state": self.state, "failures": self._failures, **self.counters}
+
+
+class LatencyHistogram:
+    """Counts call latencies in fixed millisecond buckets."""
+
+    def __init__(
+        self, bounds_ms: Sequence[float] = (100, 250, 500, 1000, 2500, 5000, 10000, 30000)
+    ):
+        """
+        Initializes empty buckets.
+
+        Args:
+            bounds_ms (Sequence[float]): Upper bounds of the buckets; a last bucket catches the rest.
+        """
+        self.bounds_ms = list(bounds_ms)
+        self.buckets = [0] * (len(self.bounds_ms) + 1)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def observe(self, seconds: float) -> None:
+        """
+        Records one latency.
+
+        Args:
+            seconds (float): Observed latency.
+        """
+        ms = seconds * 1000
+        self.buckets[bisect.bisect_left(self.bounds_ms, ms)] += 1
+        self.count += 1
+        self.total_ms += ms
+
+    def stats(self) -> Dict[str, object]:
+        """
+        Returns bucket counts keyed by upper bound, plus count and average.
+
+        Returns:
+            Dict[str, object]: e.g. `{"count": 3, "avg_ms": 420.0, "buckets": {"<=500": 2, ...}}`.
+        """
+        labels = [f"<={bound:g}" for bound in self.bounds_ms] + [f">{self.bounds_ms[-1]:g}"]
+        return {
+            "count": self.count,
+            "avg_ms": round(self.total_ms / self.count, 1) if self.count else 0.0,
+            "buckets": dict(zip(labels, self.buckets)),
+        }
@@ -0,0 +1,55 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Hashable, TypeVar
+
+T = TypeVar("T")
+
+
+class SingleFlight:
+    """Coalesces identical concurrent calls into a single upstream call.
+
+    The first caller for a key starts the call; callers arriving while it is in
+    flight await the same result (or exception) instead of starting their own.
+    The call runs in its own task, so a cancelled caller does not cancel it for
+    the others.
+    """
+
+    def __init__(self, name: str):
+        """
+        Initializes the group.
+
+        Args:
+            name (str): Label used in metrics.
+        """
+        self.name = name
+        self._in_flight: Dict[Hashable, asyncio.Task] = {}
+        self.counters = {"calls": 0, "coalesced": 0}
+
+    async def do(self, key: Hashable, call: Callable[[], Awaitable[T]]) -> T:
+        """
+        Runs `call` unless an identical call is already in flight.
+
+        Args:
+            key (Hashable): Identity of the call.
+            call (Callable[[], Awaitable[T]]): Starts the upstream call.
+
+        Returns:
+            T: The shared result.
+        """
+        self.counters["calls"] += 1
+        task = self._in_flight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(call())
+            self._in_flight[key] = task
+            task.add_done_callback(lambda _: self._in_flight.pop(key, None))
+        else:
+            self.counters["coalesced"] += 1
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns how many calls were made and how many shared an in-flight call.
+
+        Returns:
+            Dict[str, int]: Calls, coalesced calls and calls currently in flight.
+        """
+        return {**self.counters, "in_flight": len(self._in_flight)}
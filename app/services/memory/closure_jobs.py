@@ -0,0 +1,265 @@
+"""Durable background jobs that move closed conversations to long-term memory.
+
+Closing a conversation stores a snapshot of its working memory in the Redis hash
+`closure_job:<user_id>` and lists the user in `closure_job:active`, then returns
+so the farewell goes out right away. The job writes episodic, summary and fact
+memory concurrently, records each write that succeeded so a retry only repeats
+the failed ones, and removes the snapshot's messages from working memory once
+all three are stored. A job that fails every attempt, or hits an error that is
+not transient, keeps working memory and the user is tracked again by the idle
+sweeper, which closes the conversation later.
+Jobs left unfinished by a restart are resumed on startup, once the lease of the
+stopped worker expires.
+"""
+
+import asyncio
+import json
+import os
+from datetime import datetime
+from typing import Any, Dict, List
+
+from redis.exceptions import ConnectionError as RedisConnectionError
+from redis.exceptions import TimeoutError as RedisTimeoutError
+
+from app.services.llm.resilience import backoff_delay
+from app.services.memory.compaction import conversation_locks
+from app.services.storage.cache_storage import CacheStorage
+
+CLOSURE_JOB_MAX_ATTEMPTS = int(os.getenv("CLOSURE_JOB_MAX_ATTEMPTS", 5))
+CLOSURE_JOB_RETRY_BASE_DELAY = float(os.getenv("CLOSURE_JOB_RETRY_BASE_DELAY", 5))
+CLOSURE_JOB_RETRY_MAX_DELAY = float(os.getenv("CLOSURE_JOB_RETRY_MAX_DELAY", 300))
+CLOSURE_JOB_LEASE_SECONDS = int(os.getenv("CLOSURE_JOB_LEASE_SECONDS", 120))
+
+ACTIVE_JOBS_KEY = "active"
+
+# Errors that interrupt an attempt but may go away, e.g. a Redis outage. Any other
+# error, such as a malformed job, fails the job right away.
+TRANSIENT_ERRORS = (RedisConnectionError, RedisTimeoutError, ConnectionError, TimeoutError)
+
+# Long-term memory writes of a closure, in the order they are reported.
+CLOSURE_STEPS = ("episodic", "summary", "facts")
+
+# Keeps strong references so running jobs are not garbage collected.
+_running_closures: Dict[str, asyncio.Task] = {}
+
+
+class ClosureJobQueue:
+    """Runs at most one closure job per user in the background."""
+
+    def __init__(
+        self,
+        storage: CacheStorage | None = None,
+        max_attempts: int = CLOSURE_JOB_MAX_ATTEMPTS,
+        retry_base_delay: float = CLOSURE_JOB_RETRY_BASE_DELAY,
+        retry_max_delay: float = CLOSURE_JOB_RETRY_MAX_DELAY,
+        lease_seconds: int = CLOSURE_JOB_LEASE_SECONDS,
+    ):
+        """
+        Initializes the queue.
+
+        Args:
+            storage (CacheStorage, optional): Redis backend. Defaults to the "closure_job" namespace.
+            max_attempts (int): Attempts before a job is marked as failed.
+            retry_base_delay (float): Backoff after the first failed attempt, in seconds.
+            retry_max_delay (float): Maximum backoff between attempts, in seconds.
+            lease_seconds (int): Lease duration; expires if the worker dies.
+        """
+        self.storage = storage or CacheStorage(namespace="closure_job")
+        self.max_attempts = max_attempts
+        self.retry_base_delay = retry_base_delay
+        self.retry_max_delay = retry_max_delay
+        self.lease_seconds = lease_seconds
+        self.counters = {"enqueued": 0, "completed": 0, "retries": 0, "interrupted": 0, "failed": 0}
+
+    async def enqueue(self, user_id: str, messages: List[Dict[str, Any]]) -> bool:
+        """
+        Stores a closure job for a conversation and starts it in the background.
+
+        Args:
+            user_id (str): The ID of the user.
+            messages (List[Dict[str, Any]]): The working memory being closed.
+
+        Returns:
+            bool: False if the user already has a pending closure, which is left as is.
+        """
+        if not await self.storage.add_to_set(ACTIVE_JOBS_KEY, user_id):
+            return False
+        # Drops the outcome of an earlier failed closure.
+        await self.storage.delete(user_id)
+        await self.storage.set_hash_fields(
+            user_id,
+            {
+                "status": "queued",
+                "messages": json.dumps(messages),
+                "done": "",
+                "attempts": 0,
+                "created_at": datetime.utcnow().isoformat(),
+            },
+        )
+        self.counters["enqueued"] += 1
+        self.launch(user_id)
+        return True
+
+    async def is_pending(self, user_id: str) -> bool:
+        """
+        Checks whether a user's conversation is being closed.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            bool: True while the closure job is queued, running or waiting to retry.
+        """
+        return await self.storage.is_set_member(ACTIVE_JOBS_KEY, user_id)
+
+    def launch(self, user_id: str) -> None:
+        """Runs a user's closure job in the background, keeping a reference until it finishes."""
+        if user_id in _running_closures:
+            return
+        task = asyncio.create_task(self.run(user_id))
+        _running_closures[user_id] = task
+        task.add_done_callback(lambda _: _running_closures.pop(user_id, None))
+
+    async def resume(self) -> None:
+        """Restarts every closure job that was pending when the process stopped."""
+        for user_id in await self.storage.get_set_members(ACTIVE_JOBS_KEY):
+            if user_id not in _running_closures:
+                print(f"Resuming conversation closure of {user_id}")
+                self.launch(user_id)
+
+    async def _keep_lease(self, user_id: str) -> None:
+        """Renews the job lease while the job runs."""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            await self.storage.expire(f"{user_id}:lease", self.lease_seconds)
+
+    async def _acquire_lease(self, user_id: str) -> bool:
+        """Waits for the job lease, e.g. until a crashed worker's lease expires; False once the job is gone."""
+        while not await self.storage.set_if_absent(f"{user_id}:lease", str(os.getpid()), self.lease_seconds):
+            if not await self.is_pending(user_id):
+                return False
+            await asyncio.sleep(self.lease_seconds / 3)
+        return True
+
+    async def run(self, user_id: str) -> None:
+        """
+        Writes a closed conversation to long-term memory, retrying failed writes.
+
+        Waits while another worker holds the job lease. An attempt interrupted by a
+        transient error, e.g. a Redis outage, is started again after a backoff, up
+        to `max_attempts` times. Any other error marks the job as failed.
+
+        Args:
+            user_id (str): The ID of the user.
+        """
+        interruptions = 0
+        while True:
+            try:
+                await self._run_leased(user_id)
+                return
+            except TRANSIENT_ERRORS as e:
+                interruptions += 1
+                self.counters["interrupted"] += 1
+                if interruptions >= self.max_attempts:
+                    await self._fail(user_id, f"interrupted: {e!r}")
+                    return
+                print(f"Closure job of {user_id} interrupted, retrying: {e!r}")
+            except Exception as e:
+                await self._fail(user_id, repr(e))
+                return
+            await asyncio.sleep(
+                backoff_delay(interruptions, self.retry_base_delay, self.retry_max_delay)
+            )
+
+    async def _fail(self, user_id: str, error: str, session_sweeper: Any = None) -> None:
+        """
+        Marks a job as failed and stops tracking it, keeping working memory.
+
+        The user is tracked again by the idle sweeper, which closes the conversation
+        later with a fresh snapshot.
+
+        Args:
+            user_id (str): The ID of the user.
+            error (str): Why the job failed.
+            session_sweeper (IdleSessionSweeper, optional): Defaults to the shared sweeper.
+        """
+        print(f"Closure job of {user_id} failed: {error}")
+        self.counters["failed"] += 1
+        try:
+            await self.storage.set_hash_fields(
+                user_id,
+                {
+                    "status": "failed",
+                    "error": error,
+                    "finished_at": datetime.utcnow().isoformat(),
+                },
+            )
+            await self.storage.remove_from_set(ACTIVE_JOBS_KEY, user_id)
+            if session_sweeper is None:
+                from app.services.memory import session_sweeper as sweeper_module
+
+                session_sweeper = sweeper_module.session_sweeper
+            await session_sweeper.touch(user_id)
+        except Exception as e:
+            # Still active, so it is resumed on the next startup.
+            print(f"Could not record the failure of the closure job of {user_id}: {e!r}")
+
+    async def _run_leased(self, user_id: str) -> None:
+        """Runs a closure job while holding its lease."""
+        from app.services.memory.cognitive_orchestrator import CognitiveOrchestrator
+
+        if not await self._acquire_lease(user_id):
+            return
+        heartbeat = asyncio.create_task(self._keep_lease(user_id))
+        try:
+            job = await self.storage.get_hash(user_id)
+            if not job:
+                await self.storage.remove_from_set(ACTIVE_JOBS_KEY, user_id)
+                return
+            messages = json.loads(job["messages"])
+            done = [step for step in job.get("done", "").split(",") if step]
+            attempts = int(job.get("attempts", 0))
+            orchestrator = await CognitiveOrchestrator.from_defaults()
+            await self.storage.set_hash_fields(user_id, {"status": "running"})
+
+            while True:
+                pending = [step for step in CLOSURE_STEPS if step not in done]
+                errors = await orchestrator.write_long_term_memory(user_id, messages, pending)
+                done += [step for step in pending if step not in errors]
+                attempts += 1
+                await self.storage.set_hash_fields(
+                    user_id, {"done": ",".join(done), "attempts": attempts}
+                )
+                if not errors:
+                    break
+                error = "; ".join(f"{step}: {e!r}" for step, e in errors.items())
+                print(f"Closure of {user_id} failed (attempt {attempts}): {error}")
+                if attempts >= self.max_attempts:
+                    await self._fail(user_id, error, orchestrator.session_sweeper)
+                    return
+                self.counters["retries"] += 1
+                await asyncio.sleep(
+                    backoff_delay(attempts, self.retry_base_delay, self.retry_max_delay)
+                )
+
+            async with conversation_locks.hold(user_id):
+                await orchestrator.release_working_memory(user_id, messages)
+            await self.storage.delete(user_id)
+            await self.storage.remove_from_set(ACTIVE_JOBS_KEY, user_id)
+            self.counters["completed"] += 1
+        finally:
+            heartbeat.cancel()
+            await self.storage.delete(f"{user_id}:lease")
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the job counters of this process.
+
+        Returns:
+            Dict[str, int]: Enqueued, completed and failed jobs, retried attempts and
+                interrupted attempts.
+        """
+        return dict(self.counters)
+
+
+closure_jobs = ClosureJobQueue()
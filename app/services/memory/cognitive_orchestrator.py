@@ -1,14 +1,63 @@
+import asyncio
 import json
-from typing import Any, Dict, List
+import re
+from typing import Any, AsyncIterator, Dict, List, Sequence, Tuple
 
 from app.prompts.conversation import build_intention_prompt_messages
 from app.prompts.exit import EXIT_PROMPT
-from app.prompts.finance import FINANCE_PROMPT
+from app.prompts.finance import FINANCE_PROMPT, render_financing_quotes
 from app.prompts.kavak import KAVAK_INFO_PROMPT
 from app.prompts.summary import summarize_vehicle_results
+from app.services.finance.finande_handler import (
+    FINANCE_REPLY_MODE,
+    financing_explanation_messages,
+    quote_financing,
+)
+from app.services.llm.model_routing import (
+    TASK_EXIT,
+    TASK_FINANCE,
+    TASK_INTENT,
+    TASK_KAVAK_INFO,
+    TASK_VEHICLE_SUMMARY,
+)
+from app.services.memory.closure_jobs import CLOSURE_STEPS
+from app.services.memory.compaction import conversation_locks
+from app.services.memory.context_builder import HISTORY_TOKEN_BUDGET, build_history
 from app.services.search.search_handler import perform_vehicle_search
 from app.prompts.conversation import build_intention_prompt_instruction
 
+EMPTY_REPLY = "Lo siento, no tengo una respuesta para eso en este momento."
+
+
+def _vehicle_from_llm(vehicle: Any) -> Dict[str, Any] | None:
+    """
+    Reads the vehicle the intent LLM identified, given as a dict or as
+    `<vehiculo><precio>..</precio><marca>..</marca>..</vehiculo>` XML.
+
+    Args:
+        vehicle (Any): The `vehicle_data` or `vehicle` field of the LLM answer.
+
+    Returns:
+        Dict[str, Any] | None: The vehicle with a `price`, or None if it has no price.
+    """
+    if isinstance(vehicle, dict):
+        price = vehicle.get("price") or vehicle.get("precio")
+        return {**vehicle, "price": price} if price else None
+    if not isinstance(vehicle, str):
+        return None
+    fields = dict(re.findall(r"<(\w+)>\s*([^<]+?)\s*</\1>", vehicle))
+    price = re.sub(r"[^\d.]", "", fields.get("precio", ""))
+    if not price:
+        return None
+    return {
+        "price": float(price),
+        "make": fields.get("marca"),
+        "model": fields.get("modelo"),
+        "year": fields.get("año"),
+        "version": fields.get("version"),
+    }
+
+
 class CognitiveOrchestrator:
     """
     Orchestrates the cognitive processes for handling user conversations,
@@ -21,6 +70,11 @@ class CognitiveOrchestrator:
         self.episodic_memory = None
         self.summary_memory = None
         self.llm = None
+        self.intent_classifier = None
+        self.kavak_answer_cache = None
+        self.compactor = None
+        self.session_sweeper = None
+        self.closure_jobs = None
 
     async def load_initial_context(self, user_id: str) -> List[Dict[str, str]]:
         """
@@ -78,6 +132,9 @@ class CognitiveOrchestrator:
         """
         Handles an incoming message from the user, determines the intention, and generates an appropriate response.
 
+        Messages of the same user are handled one at a time; long conversations are
+        compacted in the background afterwards.
+
         Args:
             user_id (str): The ID of the user.
             user_msg (str): The user's input message.
@@ -85,25 +142,144 @@ class CognitiveOrchestrator:
         Returns:
             str: The assistant's response.
         """
-        context = await self.working_memory.retrieve_from_memory(user_id)
-        if not context:
+        async with conversation_locks.hold(user_id):
+            await self._touch_session(user_id)
+            intention, parsed, llm_reply = await self._resolve_intention(user_id, user_msg)
+            llm_reply = await self._dispatch_intention(
+                user_id, user_msg, intention, parsed, llm_reply
+            )
+        self._schedule_compaction(user_id)
+        if not llm_reply.strip():
+            llm_reply = EMPTY_REPLY
+        return llm_reply
+
+    async def _touch_session(self, user_id: str) -> None:
+        """Records the user's activity so the conversation is not closed as idle."""
+        if self.session_sweeper is not None:
+            await self.session_sweeper.touch(user_id)
+
+    def _schedule_compaction(self, user_id: str) -> None:
+        """Folds the oldest messages into the summary in the background if the conversation is long."""
+        if self.compactor is not None:
+            self.compactor.schedule(user_id)
+
+    async def stream_incoming_message(
+        self, user_id: str, user_msg: str
+    ) -> AsyncIterator[str]:
+        """
+        Like `handle_incoming_message`, but yields the response as it is generated.
+
+        Financing and Kavak-info answers are streamed token by token from the LLM and
+        stored in working memory once complete. Other intentions yield their full
+        response in one piece. Like `handle_incoming_message`, it holds the user's
+        lock until the response is complete.
+
+        Args:
+            user_id (str): The ID of the user.
+            user_msg (str): The user's input message.
+
+        Yields:
+            str: Consecutive fragments of the assistant's response.
+        """
+        async with conversation_locks.hold(user_id):
+            await self._touch_session(user_id)
+            intention, parsed, llm_reply = await self._resolve_intention(user_id, user_msg)
+            if intention == "financing":
+                quote_reply, messages = await self._prepare_financing(user_id, user_msg, parsed)
+                if quote_reply is not None:
+                    await self._store_dialogue(user_id, user_msg, quote_reply)
+                    chunks = self._single_chunk(quote_reply)
+                else:
+                    chunks = self._stream_and_store(user_id, user_msg, messages, TASK_FINANCE)
+            elif intention == "kavak_info":
+                cached = await self._cached_kavak_answer(user_msg)
+                if cached is not None:
+                    await self._store_dialogue(user_id, user_msg, cached)
+                    chunks = self._single_chunk(cached)
+                else:
+                    # Not cached: a stream cut short would look like a complete answer.
+                    chunks = self._stream_and_store(
+                        user_id, user_msg, self._kavak_info_messages(user_msg), TASK_KAVAK_INFO
+                    )
+            else:
+                llm_reply = await self._dispatch_intention(
+                    user_id, user_msg, intention, parsed, llm_reply
+                )
+                chunks = self._single_chunk(llm_reply)
+
+            has_text = False
+            async for chunk in chunks:
+                if chunk:
+                    has_text = has_text or bool(chunk.strip())
+                    yield chunk
+            if not has_text:
+                yield EMPTY_REPLY
+        self._schedule_compaction(user_id)
+
+    async def _resolve_intention(
+        self, user_id: str, user_msg: str
+    ) -> Tuple[str, Dict[str, Any], str]:
+        """
+        Determines the intention behind the message.
+
+        Clear-cut messages are classified locally by embedding similarity; the
+        rest are sent to the LLM with the user's context.
+
+        Args:
+            user_id (str): The ID of the user.
+            user_msg (str): The user's input message.
+
+        Returns:
+            Tuple[str, Dict[str, Any], str]: The intention, the parsed LLM answer and
+                the reply the LLM proposed for intentions that need no further work.
+        """
+        if not await self.working_memory.retrieve_from_memory(user_id, last=1):
             context = await self.load_initial_context(user_id)
             await self.working_memory.store_in_memory(user_id, context)
 
+        if self.intent_classifier is not None:
+            intention = await self.intent_classifier.classify(user_msg)
+            if intention is not None:
+                return intention, {}, ""
+
         working_context = await self.working_memory.retrieve_from_memory(user_id) or []
         history_text = self._format_history(working_context)
         facts, summary = await self._load_fact_and_summary_context(user_id)
         prompt_messages = build_intention_prompt_messages(
             facts, summary, history_text.strip(), user_msg
         )
-        llm_raw = await self.llm.generate_response(prompt_messages)
+        llm_raw = await self.llm.generate_response(prompt_messages, task=TASK_INTENT)
         try:
             parsed = json.loads(llm_raw)
             intention = parsed.get("intention", "none")
             llm_reply = parsed.get("response", "")
         except Exception:
+            parsed = {}
             intention = "none"
             llm_reply = llm_raw
+        return intention, parsed, llm_reply
+
+    async def _dispatch_intention(
+        self,
+        user_id: str,
+        user_msg: str,
+        intention: str,
+        parsed: Dict[str, Any],
+        llm_reply: str,
+    ) -> str:
+        """
+        Runs the handler of an intention and returns its complete response.
+
+        Args:
+            user_id (str): The ID of the user.
+            user_msg (str): The user's input message.
+            intention (str): The intention resolved by the LLM.
+            parsed (Dict[str, Any]): The parsed LLM answer.
+            llm_reply (str): The reply proposed by the LLM.
+
+        Returns:
+            str: The assistant's response.
+        """
         if intention == "episodic_memory":
             raw_response = await self._handle_episodic_memory_intention(user_id, user_msg)
             try:
@@ -127,26 +303,55 @@ class CognitiveOrchestrator:
             llm_reply = await self._handle_exit_intention(user_id, user_msg)
         else:
             await self._store_dialogue(user_id, user_msg, llm_reply)
-
-        if not llm_reply.strip():
-            llm_reply = "Lo siento, no tengo una respuesta para eso en este momento."
         return llm_reply
 
+    async def _stream_and_store(
+        self, user_id: str, user_msg: str, messages: List[Dict[str, str]], task: str
+    ) -> AsyncIterator[str]:
+        """
+        Streams an LLM reply and stores the dialogue once the reply is complete.
+
+        Args:
+            user_id (str): The ID of the user.
+            user_msg (str): The user's input message.
+            messages (List[Dict[str, str]]): Prompt messages for the LLM.
+            task (str): Kind of LLM call, used to pick the model.
+
+        Yields:
+            str: Fragments of the LLM reply.
+        """
+        chunks = []
+        async for chunk in self.llm.stream_response(messages, task=task):
+            chunks.append(chunk)
+            yield chunk
+        await self._store_dialogue(user_id, user_msg, "".join(chunks).strip())
+
+    @staticmethod
+    async def _single_chunk(text: str) -> AsyncIterator[str]:
+        """Yields an already complete response as a single fragment."""
+        yield text
+
     async def _load_fact_and_summary_context(self, user_id: str) -> tuple[str, str]:
         facts = await self.fact_memory.retrieve_from_memory(user_id) or ""
         summary = await self.summary_memory.retrieve_from_memory(user_id) or ""
         return facts, summary
 
-    def _format_history(self, messages: List[Dict[str, str]]) -> str:
+    def _format_history(
+        self, messages: List[Dict[str, str]], token_budget: int | None = HISTORY_TOKEN_BUDGET
+    ) -> str:
         """
         Formats a list of messages as XML blocks for the prompt.
 
         Args:
             messages (List[Dict[str, str]]): List of message dicts with 'role' and 'content'.
+            token_budget (int | None): Maximum tokens of the history, keeping the newest
+                messages and collapsing older vehicle results. None keeps every message verbatim.
 
         Returns:
             str: Formatted history string.
         """
+        if token_budget is not None:
+            return build_history(messages, token_budget)
         history_text = ""
         for msg in messages:
             role = msg["role"]
@@ -166,20 +371,81 @@ class CognitiveOrchestrator:
         """
         return await self.episodic_memory.retrieve_from_memory(user_id) or []
 
-    async def persist_conversation_closure(self, user_id: str) -> None:
+    async def persist_conversation_closure(self, user_id: str) -> bool:
         """
-        Persists working memory into long-term storage and clears working memory.
+        Moves working memory into long-term storage.
+
+        With a closure job queue the conversation is snapshotted into a durable job and
+        this returns right away; otherwise the writes happen before returning. Either
+        way, the messages leave working memory only after every write succeeded.
 
         Args:
             user_id (str): The ID of the user.
+
+        Returns:
+            bool: False if an earlier closure of the user is still pending, in which
+                case the conversation is left as is.
+
+        Raises:
+            RuntimeError: If a write fails while closing without a job queue.
         """
         data = await self.working_memory.retrieve_from_memory(user_id)
         if data:
-            filtered = [msg for msg in data if msg.get("content")]
-            await self.episodic_memory.store_in_memory(user_id, filtered)
-            await self.summary_memory.store_in_memory(user_id, filtered)
-            await self.fact_memory.store_in_memory(user_id, filtered)
+            if self.closure_jobs is not None:
+                if not await self.closure_jobs.enqueue(user_id, data):
+                    return False
+            else:
+                errors = await self.write_long_term_memory(user_id, data, CLOSURE_STEPS)
+                if errors:
+                    raise RuntimeError(f"Could not close the conversation of {user_id}: {errors}")
+                await self.release_working_memory(user_id, data)
+        if self.session_sweeper is not None:
+            await self.session_sweeper.forget(user_id)
+        return True
+
+    async def write_long_term_memory(
+        self, user_id: str, messages: List[Dict[str, Any]], steps: Sequence[str]
+    ) -> Dict[str, Exception]:
+        """
+        Writes a conversation to episodic, summary and fact memory concurrently.
+
+        Args:
+            user_id (str): The ID of the user.
+            messages (List[Dict[str, Any]]): The conversation.
+            steps (Sequence[str]): Writes to run, out of `CLOSURE_STEPS`.
+
+        Returns:
+            Dict[str, Exception]: The error of every write that failed.
+        """
+        memories = {
+            "episodic": self.episodic_memory,
+            "summary": self.summary_memory,
+            "facts": self.fact_memory,
+        }
+        filtered = [msg for msg in messages if msg.get("content")]
+        results = await asyncio.gather(
+            *(memories[step].store_in_memory(user_id, filtered) for step in steps),
+            return_exceptions=True,
+        )
+        return {
+            step: result for step, result in zip(steps, results) if isinstance(result, Exception)
+        }
+
+    async def release_working_memory(self, user_id: str, messages: List[Dict[str, Any]]) -> None:
+        """
+        Removes persisted messages from working memory, keeping any that arrived later.
+
+        Args:
+            user_id (str): The ID of the user.
+            messages (List[Dict[str, Any]]): The persisted messages, oldest first.
+        """
+        current = await self.working_memory.retrieve_from_memory(user_id) or []
+        if current[: len(messages)] != messages:
+            print(f"Working memory of {user_id} changed while closing; keeping it")
+        elif len(current) == len(messages):
             await self.working_memory.delete_from_memory(user_id)
+        else:
+            await self.working_memory.trim_oldest(user_id, len(messages))
 
     async def generate_and_merge_summary(self, user_id: str) -> None:
         """
@@ -210,13 +476,42 @@ class CognitiveOrchestrator:
         from app.services.memory.episodic_memory import EpisodicMemory
         from app.services.memory.summary_memory import SummaryMemory
         from app.services.llm.openai_client import OpenAIClient
+        from app.services.llm.rate_limiter import PRIORITY_BULK
+        from app.services.cache.answer_cache import kavak_answer_cache
+        from app.services.memory.compaction import MEMORY_COMPACTION_ENABLED, MemoryCompactor
+        from app.services.memory.session_sweeper import session_sweeper
+        from app.services.memory.closure_jobs import closure_jobs
+        from app.services.intent.intent_classifier import (
+            INTENT_CLASSIFIER_ENABLED,
+            intent_classifier,
+        )
 
         orchestrator = cls.__new__(cls)
         orchestrator.llm = OpenAIClient()
+        # Memory consolidation is not user-facing: it yields to chat traffic and must
+        # not store the canned fallback reply as a summary or as facts.
+        memory_llm = OpenAIClient(priority=PRIORITY_BULK, fallback_response=None)
         orchestrator.working_memory = WorkingMemory()
-        orchestrator.fact_memory = FactMemory(orchestrator.llm)
+        orchestrator.fact_memory = FactMemory(memory_llm)
         orchestrator.episodic_memory = EpisodicMemory()
-        orchestrator.summary_memory = SummaryMemory(orchestrator.llm)
+        orchestrator.summary_memory = SummaryMemory(memory_llm)
+        orchestrator.intent_classifier = (
+            intent_classifier if INTENT_CLASSIFIER_ENABLED else None
+        )
+        orchestrator.kavak_answer_cache = kavak_answer_cache
+        orchestrator.compactor = (
+            MemoryCompactor(
+                orchestrator.working_memory,
+                orchestrator.summary_memory,
+                orchestrator.episodic_memory,
+                orchestrator.fact_memory,
+                closure_jobs=closure_jobs,
+            )
+            if MEMORY_COMPACTION_ENABLED
+            else None
+        )
+        orchestrator.session_sweeper = session_sweeper
+        orchestrator.closure_jobs = closure_jobs
 
         return orchestrator
 
@@ -241,7 +536,7 @@ class CognitiveOrchestrator:
         self, user_id: str, user_msg: str
     ) -> str:
         history = await self.expand_context_from_long_term(user_id)
-        history_text = self._format_history(history)
+        history_text = self._format_history(history, token_budget=None)
         facts, summary = await self._load_fact_and_summary_context(user_id)
         context_with_history = [
             {
@@ -262,7 +557,7 @@ class CognitiveOrchestrator:
             *context_with_history,
             {"role": "user", "content": f"<user_input>{user_msg}</user_input>"},
         ]
-        return await self.llm.generate_response(extended_messages)
+        return await self.llm.generate_response(extended_messages, task=TASK_INTENT)
 
     async def _handle_search_intention(self, user_id: str, user_msg: str) -> str:
         """
@@ -279,7 +574,7 @@ class CognitiveOrchestrator:
         results = await perform_vehicle_search(user_msg, k=5)
         summary_prompt = await summarize_vehicle_results(results)
         llm_reply = await self.llm.generate_response(
-            [{"role": "user", "content": summary_prompt}]
+            [{"role": "user", "content": summary_prompt}], task=TASK_VEHICLE_SUMMARY
         )
         await self.working_memory.store_in_memory(
             user_id,
@@ -303,28 +598,78 @@ class CognitiveOrchestrator:
         """
         Handles the 'financing' intention using provided vehicle data.
 
+        Payments are computed locally for the price the user mentions, the vehicle
+        the LLM identified or the last search results. The LLM only computes them
+        itself when no price is known.
+
         Args:
             user_id (str): The ID of the user.
             user_msg (str): The user's message.
             parsed (dict): Parsed JSON response with vehicle data.
 
         Returns:
-            str: LLM's response regarding financing options.
+            str: The response regarding financing options.
         """
-        vehicle_data = parsed.get("vehicle_data", {})
-        financing_prompt = FINANCE_PROMPT.format(
-            user_input=user_msg, vehicle_data=vehicle_data
-        )
-        llm_reply = await self.llm.generate_response(
-            [{"role": "user", "content": financing_prompt}]
-        )
+        llm_reply, messages = await self._prepare_financing(user_id, user_msg, parsed)
+        if llm_reply is None:
+            llm_reply = await self.llm.generate_response(messages, task=TASK_FINANCE)
         await self._store_dialogue(user_id, user_msg, llm_reply)
         return llm_reply
 
+    async def _prepare_financing(
+        self, user_id: str, user_msg: str, parsed: dict
+    ) -> Tuple[str | None, List[Dict[str, str]]]:
+        """
+        Quotes the vehicles the financing question is about.
+
+        Args:
+            user_id (str): The ID of the user.
+            user_msg (str): The user's message.
+            parsed (dict): Parsed JSON response with vehicle data.
+
+        Returns:
+            Tuple[str | None, List[Dict[str, str]]]: The finished reply when it can be
+                rendered without the LLM; otherwise None and the prompt for the LLM.
+        """
+        vehicles = await self._financing_vehicles(user_id, parsed)
+        quotes = quote_financing(user_msg, vehicles)
+        if not quotes:
+            return None, self._financing_messages(user_msg, parsed)
+        if FINANCE_REPLY_MODE == "llm":
+            return None, financing_explanation_messages(user_msg, quotes)
+        return render_financing_quotes(quotes), []
+
+    async def _financing_vehicles(self, user_id: str, parsed: dict) -> List[Dict[str, Any]]:
+        """
+        Finds the vehicles to quote: the one the LLM identified, or the last search results.
+
+        Args:
+            user_id (str): The ID of the user.
+            parsed (dict): Parsed JSON response with vehicle data.
+
+        Returns:
+            List[Dict[str, Any]]: Vehicles with a price, possibly empty.
+        """
+        vehicle = _vehicle_from_llm(parsed.get("vehicle_data") or parsed.get("vehicle"))
+        if vehicle:
+            return [vehicle]
+        history = await self.working_memory.retrieve_from_memory(user_id) or []
+        for message in reversed(history):
+            content = message.get("content") or ""
+            if content.startswith("<vehicle_results>"):
+                try:
+                    return json.loads(content[len("<vehicle_results>"):-len("</vehicle_results>")])
+                except ValueError:
+                    return []
+        return []
+
     async def _handle_kavak_info_intention(self, user_id: str, user_msg: str) -> str:
         """
         Handles the 'kavak_info' intention by querying the Kavak prompt.
 
+        The answer to a question similar enough to one answered before is taken
+        from the answer cache instead.
+
         Args:
             user_id (str): The ID of the user.
             user_msg (str): The user's input message.
@@ -332,13 +677,43 @@ class CognitiveOrchestrator:
         Returns:
             str: The assistant's Kavak-related response.
         """
-        kavak_prompt = KAVAK_INFO_PROMPT.format(user_input=user_msg)
-        llm_reply = await self.llm.generate_response(
-            [{"role": "user", "content": kavak_prompt}]
-        )
+        llm_reply = await self._cached_kavak_answer(user_msg)
+        if llm_reply is None:
+            llm_reply = await self.llm.generate_response(
+                self._kavak_info_messages(user_msg), task=TASK_KAVAK_INFO
+            )
+            await self._remember_kavak_answer(user_msg, llm_reply)
         await self._store_dialogue(user_id, user_msg, llm_reply)
         return llm_reply
 
+    async def _cached_kavak_answer(self, user_msg: str) -> str | None:
+        """Returns a cached answer to a similar Kavak question, if any."""
+        if self.kavak_answer_cache is None:
+            return None
+        return await self.kavak_answer_cache.get(user_msg)
+
+    async def _remember_kavak_answer(self, user_msg: str, llm_reply: str) -> None:
+        """Caches a Kavak answer, unless it is empty or the LLM's fallback reply."""
+        if self.kavak_answer_cache is None or not llm_reply.strip():
+            return
+        if llm_reply == getattr(self.llm, "fallback_response", None):
+            return
+        await self.kavak_answer_cache.set(user_msg, llm_reply)
+
+    @staticmethod
+    def _financing_messages(user_msg: str, parsed: dict) -> List[Dict[str, str]]:
+        """Builds the prompt for a financing answer from the vehicle data the LLM extracted."""
+        vehicle_data = parsed.get("vehicle_data", {})
+        financing_prompt = FINANCE_PROMPT.format(
+            user_input=user_msg, vehicle_data=vehicle_data
+        )
+        return [{"role": "user", "content": financing_prompt}]
+
+    @staticmethod
+    def _kavak_info_messages(user_msg: str) -> List[Dict[str, str]]:
+        """Builds the prompt for a question about Kavak."""
+        return [{"role": "user", "content": KAVAK_INFO_PROMPT.format(user_input=user_msg)}]
+
     async def _handle_exit_intention(self, user_id: str, user_msg: str) -> str:
         """
         Handles the 'exit' intention by summarizing the conversation and persisting it to memory.
@@ -360,7 +735,7 @@ class CognitiveOrchestrator:
             summary=summary,
         )
         llm_reply = await self.llm.generate_response(
-            [{"role": "user", "content": prompt}]
+            [{"role": "user", "content": prompt}], task=TASK_EXIT
         )
         await self._store_dialogue(user_id, user_msg, llm_reply)
         await self.persist_conversation_closure(user_id)
@@ -0,0 +1,188 @@
+"""Rolling summarization of long conversations.
+
+When a conversation in working memory grows past `MEMORY_COMPACTION_MAX_MESSAGES`
+messages or `MEMORY_COMPACTION_MAX_TOKENS` tokens, a background task folds every
+message but the newest `MEMORY_COMPACTION_KEEP_MESSAGES` into the summary, moves
+them to episodic memory and trims them from the list.
+
+Incoming messages of a user are handled while holding that user's lock in
+`conversation_locks`. Compaction takes the same lock only to read the
+conversation and to trim it, not while the LLM writes the summary and facts, and trims
+only if the folded messages are still the oldest ones.
+"""
+
+import asyncio
+import os
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Dict, List
+
+from app.services.memory.context_builder import compact_vehicle_results, count_tokens
+from app.services.memory.memory import Memory
+from app.services.memory.working_memory import WorkingMemory
+
+MEMORY_COMPACTION_ENABLED = os.getenv("MEMORY_COMPACTION_ENABLED", "true").lower() == "true"
+MEMORY_COMPACTION_MAX_MESSAGES = int(os.getenv("MEMORY_COMPACTION_MAX_MESSAGES", 40))
+MEMORY_COMPACTION_MAX_TOKENS = int(os.getenv("MEMORY_COMPACTION_MAX_TOKENS", 6000))
+MEMORY_COMPACTION_KEEP_MESSAGES = int(os.getenv("MEMORY_COMPACTION_KEEP_MESSAGES", 12))
+
+
+class KeyedLocks:
+    """Asyncio locks created on demand per key and dropped once nobody uses them."""
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._holders: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def hold(self, key: str) -> AsyncIterator[None]:
+        """
+        Holds the lock of a key, waiting for the current holder if any.
+
+        Args:
+            key (str): The key, e.g. a user ID.
+        """
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._holders[key] = self._holders.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._holders[key] -= 1
+            if not self._holders[key]:
+                del self._holders[key]
+                del self._locks[key]
+
+
+conversation_locks = KeyedLocks()
+
+# Keeps strong references so running compactions are not garbage collected.
+_running_compactions: Dict[str, asyncio.Task] = {}
+
+compaction_counters = {"runs": 0, "compacted": 0, "messages_folded": 0, "aborted": 0, "errors": 0}
+
+
+class MemoryCompactor:
+    """Folds the oldest part of long conversations into the user's summary."""
+
+    def __init__(
+        self,
+        working_memory: WorkingMemory,
+        summary_memory: Memory,
+        episodic_memory: Memory,
+        fact_memory: Memory,
+        max_messages: int = MEMORY_COMPACTION_MAX_MESSAGES,
+        max_tokens: int = MEMORY_COMPACTION_MAX_TOKENS,
+        keep_messages: int = MEMORY_COMPACTION_KEEP_MESSAGES,
+        closure_jobs: Any = None,
+    ):
+        """
+        Initializes the compactor.
+
+        Args:
+            working_memory (WorkingMemory): Where conversations are compacted.
+            summary_memory (Memory): Receives the folded messages to merge into the summary.
+            episodic_memory (Memory): Receives the folded messages verbatim.
+            fact_memory (Memory): Receives the folded messages to merge into the user's facts.
+            max_messages (int): Compact conversations with more messages than this.
+            max_tokens (int): Compact conversations with more tokens than this.
+            keep_messages (int): Newest messages left in working memory.
+            closure_jobs (ClosureJobQueue, optional): Conversations it is closing are not compacted.
+        """
+        self.working_memory = working_memory
+        self.summary_memory = summary_memory
+        self.episodic_memory = episodic_memory
+        self.fact_memory = fact_memory
+        self.max_messages = max_messages
+        self.max_tokens = max_tokens
+        self.keep_messages = keep_messages
+        self.closure_jobs = closure_jobs
+
+    def needs_compaction(self, messages: List[Dict[str, Any]]) -> bool:
+        """
+        Checks whether a conversation is over the message or token threshold.
+
+        Args:
+            messages (List[Dict[str, Any]]): The conversation, oldest first.
+
+        Returns:
+            bool: True if its oldest messages should be folded into the summary.
+        """
+        if len(messages) <= self.keep_messages:
+            return False
+        if len(messages) > self.max_messages:
+            return True
+        return sum(count_tokens(message.get("content") or "") for message in messages) > self.max_tokens
+
+    async def _closing(self, user_id: str) -> bool:
+        """Returns True if the conversation is being moved to long-term memory."""
+        return self.closure_jobs is not None and await self.closure_jobs.is_pending(user_id)
+
+    async def compact(self, user_id: str) -> int:
+        """
+        Folds the oldest messages of a conversation into the summary and trims them.
+
+        Args:
+            user_id (str): The ID of the user.
+
+        Returns:
+            int: The number of messages removed from working memory.
+        """
+        async with conversation_locks.hold(user_id):
+            if await self._closing(user_id):
+                return 0
+            messages = await self.working_memory.retrieve_from_memory(user_id) or []
+        if not self.needs_compaction(messages):
+            return 0
+
+        segment = messages[: len(messages) - self.keep_messages]
+        dialogue = [
+            message
+            for message in segment
+            if message.get("role") != "system" and message.get("content")
+        ]
+        if dialogue:
+            # Closure only sees what is left in working memory, so facts are taken now.
+            folded = [
+                {**message, "content": compact_vehicle_results(message["content"])}
+                for message in dialogue
+            ]
+            await asyncio.gather(
+                self.summary_memory.store_in_memory(user_id, folded),
+                self.fact_memory.store_in_memory(user_id, folded),
+            )
+
+        async with conversation_locks.hold(user_id):
+            current = await self.working_memory.retrieve_from_memory(user_id) or []
+            if current[: len(segment)] != segment or await self._closing(user_id):
+                # The conversation was closed or trimmed while summarizing.
+                compaction_counters["aborted"] += 1
+                return 0
+            if dialogue:
+                await self.episodic_memory.store_in_memory(user_id, dialogue)
+            await self.working_memory.trim_oldest(user_id, len(segment))
+
+        compaction_counters["compacted"] += 1
+        compaction_counters["messages_folded"] += len(segment)
+        return len(segment)
+
+    async def _run(self, user_id: str) -> None:
+        """Compacts a conversation, logging instead of raising."""
+        compaction_counters["runs"] += 1
+        try:
+            await self.compact(user_id)
+        except Exception as e:
+            print(f"Working memory compaction failed for {user_id}: {e!r}")
+            compaction_counters["errors"] += 1
+
+    def schedule(self, user_id: str) -> None:
+        """
+        Compacts a conversation in the background, unless a compaction is already running.
+
+        Args:
+            user_id (str): The ID of the user.
+        """
+        if user_id in _running_compactions:
+            return
+        task = asyncio.create_task(self._run(user_id))
+        _running_compactions[user_id] = task
+        task.add_done_callback(lambda _: _running_compactions.pop(user_id, None))
@@ -0,0 +1,145 @@
+"""Token-budgeted conversation history for prompts.
+
+The newest messages are kept first, until the budget runs out. Vehicle search
+results older than the last few user turns are collapsed to the stock ids they
+listed, and so is a recent one that does not fit verbatim. Tokens are counted
+with `tiktoken` once `load_tokenizer` has loaded its vocabulary at startup, and
+estimated from the length until then or when it is unavailable. The count of
+each message is cached.
+"""
+
+import asyncio
+import json
+import os
+from functools import lru_cache
+from typing import Any, Dict, List
+
+from app.services.llm.rate_limiter import estimate_tokens
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - depends on the environment
+    tiktoken = None
+
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 2000))
+HISTORY_VERBATIM_TURNS = int(os.getenv("HISTORY_VERBATIM_TURNS", 2))
+HISTORY_TOKENIZER = os.getenv("HISTORY_TOKENIZER", "o200k_base")
+
+VEHICLE_RESULTS_OPEN = "<vehicle_results>"
+VEHICLE_RESULTS_CLOSE = "</vehicle_results>"
+
+
+_tokenizer = None
+
+
+async def load_tokenizer() -> bool:
+    """
+    Loads the tokenizer in a worker thread. Called once at startup.
+
+    tiktoken downloads the vocabulary on first use unless `TIKTOKEN_CACHE_DIR`
+    already holds it, so it is never loaded on the request path.
+
+    Returns:
+        bool: True if tokens are counted with tiktoken from now on.
+    """
+    global _tokenizer
+    if tiktoken is None:
+        return False
+    try:
+        _tokenizer = await asyncio.to_thread(tiktoken.get_encoding, HISTORY_TOKENIZER)
+    except Exception as e:
+        print(f"Tokenizer {HISTORY_TOKENIZER} unavailable, estimating tokens: {e!r}")
+        return False
+    # Drops the estimates cached before the tokenizer was ready.
+    count_tokens.cache_clear()
+    return True
+
+
+def _encoding():
+    """Returns the tokenizer loaded by `load_tokenizer`, or None before that."""
+    return _tokenizer
+
+
+@lru_cache(maxsize=4096)
+def count_tokens(text: str) -> int:
+    """
+    Counts the tokens of a text, caching the result.
+
+    Args:
+        text (str): The text.
+
+    Returns:
+        int: The number of tokens.
+    """
+    encoding = _encoding()
+    if encoding is None:
+        return estimate_tokens(text)
+    return len(encoding.encode(text, disallowed_special=()))
+
+
+def compact_vehicle_results(content: str) -> str:
+    """
+    Replaces a `<vehicle_results>` JSON dump with the stock ids it listed.
+
+    Args:
+        content (str): A message content.
+
+    Returns:
+        str: The compact reference, or the content unchanged if it holds no results.
+    """
+    if not (content.startswith(VEHICLE_RESULTS_OPEN) and content.endswith(VEHICLE_RESULTS_CLOSE)):
+        return content
+    try:
+        results = json.loads(content[len(VEHICLE_RESULTS_OPEN):-len(VEHICLE_RESULTS_CLOSE)])
+    except ValueError:
+        return content
+    stock_ids = [
+        str(vehicle["stock_id"])
+        for vehicle in results
+        if isinstance(vehicle, dict) and vehicle.get("stock_id") is not None
+    ]
+    return f'<vehicle_results stock_ids="{",".join(stock_ids)}"/>'
+
+
+def _render(message: Dict[str, Any]) -> str:
+    """Formats a message as an XML block named after its role."""
+    role = message["role"]
+    return f"<{role}>{message['content']}</{role}>"
+
+
+def build_history(
+    messages: List[Dict[str, Any]],
+    token_budget: int = HISTORY_TOKEN_BUDGET,
+    verbatim_turns: int = HISTORY_VERBATIM_TURNS,
+) -> str:
+    """
+    Formats the newest messages that fit in a token budget as XML blocks.
+
+    Args:
+        messages (List[Dict[str, Any]]): Messages with 'role' and 'content', oldest first.
+        token_budget (int): Maximum tokens of the returned history.
+        verbatim_turns (int): Number of most recent user turns whose vehicle results are
+            kept in full if they fit.
+
+    Returns:
+        str: The history, oldest first, one block per line.
+    """
+    user_turns = 0
+    used = 0
+    lines: List[str] = []
+    for message in reversed(messages):
+        content = message["content"] or ""
+        if user_turns >= verbatim_turns:
+            content = compact_vehicle_results(content)
+        line = _render({"role": message["role"], "content": content})
+        tokens = count_tokens(line)
+        if used + tokens > token_budget:
+            line = _render({"role": message["role"], "content": compact_vehicle_results(content)})
+            tokens = count_tokens(line)
+            if used + tokens > token_budget:
+                break
+        lines.append(line)
+        used += tokens
+        if message["role"] == "user":
+            user_turns += 1
+    return "\n".join(reversed(lines))
@@ -4,6 +4,7 @@ import json
 
 from app.prompts.facts import build_fact_merge_prompt
 from app.services.llm.base import LLMBase
+from app.services.llm.model_routing import TASK_FACT_MERGE
 from app.services.memory.memory import Memory
 from app.services.storage.non_relational_storage import NonRelationalStorage
 
@@ -39,7 +40,7 @@ class FactMemory(Memory):
         prompt = await build_fact_merge_prompt(
             recent_messages=data, previous_facts=old_facts or {}
         )
-        raw = await self.llm.generate_response([prompt])
+        raw = await self.llm.generate_response([prompt], task=TASK_FACT_MERGE)
         updated_facts = json.loads(raw)
         await self.storage.save({"whatsapp_id": key, "data": updated_facts})
 
@@ -0,0 +1,150 @@
+"""Closes conversations whose users stopped replying.
+
+Every handled message records the time in the `session:last_activity` sorted set.
+Every `SESSION_SWEEP_INTERVAL_SECONDS` a background task closes the
+conversations idle for longer than `SESSION_IDLE_SECONDS` with
+`persist_conversation_closure`, a batch of `SESSION_SWEEP_BATCH_SIZE` users at a
+time and at most `SESSION_SWEEP_CONCURRENCY` at once. Closing a conversation
+enqueues a closure job that writes episodic, summary and fact memory at bulk
+priority and then frees its working memory.
+"""
+
+import asyncio
+import os
+import time
+from typing import Dict
+
+from app.services.memory.compaction import conversation_locks
+from app.services.storage.cache_storage import CacheStorage
+
+SESSION_IDLE_SECONDS = int(os.getenv("SESSION_IDLE_SECONDS", 30 * 60))
+SESSION_SWEEP_INTERVAL_SECONDS = float(os.getenv("SESSION_SWEEP_INTERVAL_SECONDS", 60))
+SESSION_SWEEP_BATCH_SIZE = int(os.getenv("SESSION_SWEEP_BATCH_SIZE", 50))
+SESSION_SWEEP_CONCURRENCY = int(os.getenv("SESSION_SWEEP_CONCURRENCY", 4))
+
+LAST_ACTIVITY_KEY = "last_activity"
+SWEEP_LEASE_KEY = "sweep_lease"
+
+
+class IdleSessionSweeper:
+    """Tracks the last activity of every user and closes idle conversations."""
+
+    def __init__(
+        self,
+        storage: CacheStorage | None = None,
+        idle_seconds: int = SESSION_IDLE_SECONDS,
+        batch_size: int = SESSION_SWEEP_BATCH_SIZE,
+        concurrency: int = SESSION_SWEEP_CONCURRENCY,
+    ):
+        """
+        Initializes the sweeper.
+
+        Args:
+            storage (CacheStorage, optional): Redis backend. Defaults to the "session" namespace.
+            idle_seconds (int): Seconds without messages after which a conversation is closed.
+            batch_size (int): Users read from Redis per batch.
+            concurrency (int): Conversations closed at the same time.
+        """
+        self.storage = storage or CacheStorage(namespace="session")
+        self.idle_seconds = idle_seconds
+        self.batch_size = batch_size
+        self.concurrency = concurrency
+        self.counters = {"sweeps": 0, "closed": 0, "skipped": 0, "errors": 0}
+
+    async def touch(self, user_id: str) -> None:
+        """
+        Records that a user just sent a message.
+
+        Args:
+            user_id (str): The ID of the user.
+        """
+        await self.storage.add_to_sorted_set(LAST_ACTIVITY_KEY, {user_id: time.time()})
+
+    async def forget(self, user_id: str) -> None:
+        """
+        Stops tracking a user whose conversation was closed.
+
+        Args:
+            user_id (str): The ID of the user.
+        """
+        await self.storage.remove_from_sorted_set(LAST_ACTIVITY_KEY, user_id)
+
+    async def _close(self, orchestrator, user_id: str, cutoff: float, semaphore: asyncio.Semaphore) -> bool:
+        """Closes a conversation unless its user became active again; True if closed."""
+        async with semaphore, conversation_locks.hold(user_id):
+            last_activity = await self.storage.get_sorted_set_score(LAST_ACTIVITY_KEY, user_id)
+            if last_activity is None or last_activity > cutoff:
+                self.counters["skipped"] += 1
+                return True
+            try:
+                if await orchestrator.persist_conversation_closure(user_id):
+                    await self.forget(user_id)
+                else:
+                    # An earlier closure is still running; check again after another idle period.
+                    await self.touch(user_id)
+                    self.counters["skipped"] += 1
+                    return True
+            except Exception as e:
+                print(f"Could not close idle conversation of {user_id}: {e!r}")
+                self.counters["errors"] += 1
+                return False
+        self.counters["closed"] += 1
+        return True
+
+    async def sweep(self) -> int:
+        """
+        Closes every conversation idle for longer than `idle_seconds`.
+
+        Conversations that fail to close stay tracked and are retried on the next sweep.
+
+        Returns:
+            int: The number of conversations closed.
+        """
+        from app.services.memory.cognitive_orchestrator import CognitiveOrchestrator
+
+        self.counters["sweeps"] += 1
+        orchestrator = await CognitiveOrchestrator.from_defaults()
+        semaphore = asyncio.Semaphore(self.concurrency)
+        cutoff = time.time() - self.idle_seconds
+        closed_before = self.counters["closed"]
+        failed = 0
+        while True:
+            user_ids = await self.storage.get_sorted_set_range_by_score(
+                LAST_ACTIVITY_KEY, "-inf", cutoff, offset=failed, count=self.batch_size
+            )
+            results = await asyncio.gather(
+                *(self._close(orchestrator, user_id, cutoff, semaphore) for user_id in user_ids)
+            )
+            failed += results.count(False)
+            if len(user_ids) < self.batch_size:
+                break
+        return self.counters["closed"] - closed_before
+
+    async def run(self, interval: float = SESSION_SWEEP_INTERVAL_SECONDS) -> None:
+        """
+        Sweeps forever, every `interval` seconds. Only one process sweeps at a time.
+
+        Args:
+            interval (float): Seconds between sweeps.
+        """
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                if await self.storage.set_if_absent(SWEEP_LEASE_KEY, str(os.getpid()), int(interval)):
+                    await self.sweep()
+            except Exception as e:
+                print(f"Idle session sweep failed: {e!r}")
+                self.counters["errors"] += 1
+
+    def stats(self) -> Dict[str, int]:
+        """
+        Returns the sweep counters.
+
+        Returns:
+            Dict[str, int]: Sweeps, closed conversations, conversations skipped because
+                their user came back or a closure was pending, and errors.
+        """
+        return dict(self.counters)
+
+
+session_sweeper = IdleSessionSweeper()
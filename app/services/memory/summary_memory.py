@@ -2,6 +2,7 @@ from typing import Any
 
 from app.prompts.summary import build_summary_merge_prompt
 from app.services.llm.base import LLMBase
+from app.services.llm.model_routing import TASK_SUMMARY_MERGE
 from app.services.memory.memory import Memory
 from app.services.storage.non_relational_storage import NonRelationalStorage
 
@@ -25,7 +26,7 @@ class SummaryMemory(Memory):
         prompt = await build_summary_merge_prompt(
             recent_messages=data, previous_summary=old_summary or ""
         )
-        merged_summary = await self.llm.generate_response([prompt])
+        merged_summary = await self.llm.generate_response([prompt], task=TASK_SUMMARY_MERGE)
         await self.storage.save({"whatsapp_id": key, "data": merged_summary})
 
     async def retrieve_from_memory(self, key: str) -> Any:
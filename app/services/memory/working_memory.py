@@ -1,50 +1,84 @@
-import json
+import os
+from typing import Any, Awaitable, Callable, List, Optional, TypeVar
+
+from redis.exceptions import ResponseError
+
 from app.services.memory.memory import Memory
 from app.services.storage.cache_storage import CacheStorage
-from typing import Any
 
+WORKING_MEMORY_MAX_MESSAGES = int(os.getenv("WORKING_MEMORY_MAX_MESSAGES", 200))
+
+T = TypeVar("T")
 
 
 class WorkingMemory(Memory):
-    """Handles temporary memory using a caching layer."""
+    """Handles temporary memory using a caching layer.
+
+    Each conversation is a Redis list with one JSON message per item, so a turn
+    is appended without reading the conversation back and concurrent turns of
+    the same user do not overwrite each other. Conversations stored before as a
+    single JSON array are converted the first time they are touched.
+    """
+
+    def __init__(self, max_messages: int = WORKING_MEMORY_MAX_MESSAGES):
+        """Initializes the WorkingMemory with a CacheStorage instance.
 
-    def __init__(self):
-        """Initializes the WorkingMemory with a CacheStorage instance."""
+        Args:
+            max_messages (int): Newest messages kept per conversation; 0 keeps them all.
+        """
         self.storage = CacheStorage()
+        self.max_messages = max_messages
+
+    async def _with_legacy_conversion(self, key: str, operation: Callable[[], Awaitable[T]]) -> T:
+        """Runs a list operation, converting a legacy JSON-array key and retrying once."""
+        try:
+            return await operation()
+        except ResponseError as e:
+            if "WRONGTYPE" not in str(e):
+                raise
+        await self.storage.convert_to_list(key)
+        return await operation()
 
     async def store_in_memory(self, key: str, data: Any) -> None:
-        """Stores data in memory, appending to any existing list.
+        """Appends data to the conversation stored under a key.
 
         Args:
             key (str): The key under which to store the data.
-            data (Any): The data to be stored. Must not be a pre-serialized string.
+            data (Any): A message or a list of messages. Must not be a pre-serialized string.
         """
         if isinstance(data, str):
             raise ValueError("Data should not be a pre-serialized string.")
-        existing_data = await self.retrieve_from_memory(key)
-        if not isinstance(existing_data, list):
-            existing_data = []
-        if isinstance(data, list):
-            existing_data.extend(data)
-        else:
-            existing_data.append(data)
-        await self.storage.set(key, existing_data)
-
-    async def retrieve_from_memory(self, key: str) -> Any:
-        """Retrieves and deserializes data from memory by key.
+        items = data if isinstance(data, list) else [data]
+        if not items:
+            return
+        await self._with_legacy_conversion(
+            key, lambda: self.storage.push_to_list(key, items, max_length=self.max_messages)
+        )
+
+    async def retrieve_from_memory(self, key: str, last: Optional[int] = None) -> Optional[List[Any]]:
+        """Retrieves the conversation stored under a key.
 
         Args:
             key (str): The key associated with the stored data.
+            last (int, optional): Only return the newest `last` messages.
 
         Returns:
-            Any: The retrieved data, or None if not found.
+            Optional[List[Any]]: The messages, oldest first, or None if not found.
         """
-        raw = await self.storage.get(key)
-        if raw is None:
-            return None
-        if isinstance(raw, (list, dict)):
-            return raw
-        return json.loads(raw)
+        start = -last if last else 0
+        items = await self._with_legacy_conversion(
+            key, lambda: self.storage.get_list_range(key, start, -1)
+        )
+        return items or None
+
+    async def trim_oldest(self, key: str, count: int) -> None:
+        """Removes the oldest messages of the conversation stored under a key.
+
+        Args:
+            key (str): The key associated with the stored data.
+            count (int): Number of messages to remove.
+        """
+        await self._with_legacy_conversion(key, lambda: self.storage.trim_list(key, count, -1))
 
     async def delete_from_memory(self, key: str) -> None:
         """Deletes data from memory by key.
@@ -53,3 +87,14 @@ class WorkingMemory(Memory):
             key (str): The key of the data to delete.
         """
         await self.storage.delete(key)
+
+    async def convert_legacy_keys(self) -> int:
+        """Converts every conversation still stored as a JSON array into a Redis list.
+
+        Returns:
+            int: The number of converted conversations.
+        """
+        converted = 0
+        for key in await self.storage.scan_keys():
+            converted += await self.storage.convert_to_list(key)
+        return converted
@@ -0,0 +1,244 @@
+"""Rule-based extraction of search filters for common queries.
+
+Most searches are a make or model plus a few constraints written the same way
+("mazda con car play y menos de 400 mil", "jetta 2018 en adelante"). Those are
+parsed locally into the same bool block that `FILTER_EXTRACTION_PROMPT` asks the
+LLM for. The parser only answers when every word of the query is understood;
+anything else returns None so the caller falls back to the LLM.
+"""
+
+import os
+import re
+import time
+from typing import Any, Dict, Iterable, List, Tuple
+
+from app.services.storage.relational_storage import RelationalStorage
+from app.utils.helpers import fold_text
+
+CATALOG_VOCABULARY_TTL = int(os.getenv("CATALOG_VOCABULARY_TTL", 300))
+
+# Words that carry no filter on their own.
+STOPWORDS = frozenset(
+    """
+    a al algun alguna alguno auto autos busco buscando carro carros coche coches
+    con cuesten cueste de del dame el en es este esta favor hay la las los me mi
+    modelo muestrame necesito o para por precio quiero que se sea sean tenga
+    tengan tienen tienes un una unas uno unos ver vehiculo vehiculos y ano anos
+    km kms kilometros kilometraje pesos mxn
+    """.split()
+)
+
+AMOUNT_PATTERN = r"\$?\s*(\d+(?:[.,]\d+)*)\s*(millones|millon|mil|mdp|k)?\b"
+_UNIT = r"(?:\s*(km|kms|kilometros|pesos|mxn))?"
+_FIELD = r"(?:(kilometraje|kilometros|kms|km|precio|ano|modelo)\s+(?:de\s+)?)?"
+_UPPER = r"menos de|hasta|maximo|max|no mas de|por debajo de|debajo de|abajo de|menor a|menores a|inferior a"
+_LOWER = r"mas de|minimo|desde|arriba de|por encima de|mayor a|mayores a|superior a|a partir de"
+
+_BETWEEN_RE = re.compile(rf"\b{_FIELD}entre\s+{AMOUNT_PATTERN}{_UNIT}\s+y\s+{AMOUNT_PATTERN}{_UNIT}")
+_BOUND_RE = re.compile(rf"\b{_FIELD}({_UPPER}|{_LOWER})\s+{AMOUNT_PATTERN}{_UNIT}")
+_YEAR_FROM_RE = re.compile(
+    r"\b(19[89]\d|20[0-4]\d)\s+(?:en adelante|o mas nuevo|o mas reciente|para arriba|o posterior)\b"
+)
+_YEAR_RE = re.compile(r"\b(19[89]\d|20[0-4]\d)\b")
+_YEAR_SPAN_RE = re.compile(
+    r"\b(?:(?:del?|desde)\s+)?(19[89]\d|20[0-4]\d)\s*(?:-|a|al|hasta)\s*(19[89]\d|20[0-4]\d)\b"
+)
+_FLAG_RES = {
+    "bluetooth": re.compile(r"\b(?:(con|sin)\s+)?blue\s?tooth\b"),
+    "car_play": re.compile(r"\b(?:(con|sin)\s+)?(?:apple\s+)?car\s?play\b"),
+}
+_MULTIPLIERS = {"mil": 1_000, "k": 1_000, "millon": 1_000_000, "millones": 1_000_000, "mdp": 1_000_000}
+_KM_WORDS = {"km", "kms", "kilometros", "kilometraje"}
+_PRICE_WORDS = {"pesos", "mxn", "precio"}
+_YEAR_WORDS = {"ano", "modelo"}
+_UPPER_WORDS = frozenset(_UPPER.split("|"))
+
+
+def parse_amount(number: str, multiplier: str | None) -> float:
+    """Reads "400", "400,000", "1.5" plus an optional "mil"/"millones" multiplier."""
+    if re.fullmatch(r"\d{1,3}(?:[.,]\d{3})+", number):
+        value = float(re.sub(r"[.,]", "", number))
+    else:
+        value = float(number.replace(",", "."))
+    return value * _MULTIPLIERS.get(multiplier, 1)
+
+
+def _phrase_pattern(phrase: str) -> str:
+    """Regex matching a folded catalog phrase, tolerant to spaces and hyphens."""
+    words = re.split(r"[\s-]+", fold_text(phrase))
+    return r"\b" + r"[\s-]*".join(re.escape(word) for word in words) + r"\b"
+
+
+class RuleBasedFilterParser:
+    """Turns common search phrasings into OpenSearch bool clauses without an LLM."""
+
+    def __init__(self, catalog: Iterable[Tuple[str, str]]):
+        """
+        Compiles the catalog vocabulary.
+
+        Args:
+            catalog (Iterable[Tuple[str, str]]): The (make, model) pairs of the catalog.
+        """
+        makes: Dict[str, str] = {}
+        models: Dict[str, Tuple[str, str]] = {}
+        for make, model in catalog:
+            makes.setdefault(fold_text(make), make)
+            models.setdefault(fold_text(model), (make, model))
+
+        # Longest phrases first so "cx 30" wins over "cx 3".
+        self._makes = [
+            (re.compile(f"(?P<phrase>{_phrase_pattern(folded)})"), make)
+            for folded, make in sorted(makes.items(), key=lambda item: -len(item[0]))
+        ]
+        self._models = []
+        for folded, (make, model) in sorted(models.items(), key=lambda item: -len(item[0])):
+            pattern = f"(?P<phrase>{_phrase_pattern(folded)})"
+            if folded.replace(" ", "").isdigit():
+                # Numeric models ("3", "2008") are only recognized right after their make.
+                pattern = _phrase_pattern(make) + r"\s+" + pattern
+            self._models.append((re.compile(pattern), (make, model)))
+
+    def parse(self, query: str) -> Dict[str, Any] | None:
+        """
+        Extracts filters from a query.
+
+        Args:
+            query (str): User query in natural language.
+
+        Returns:
+            Dict[str, Any] | None: A bool block with `should`, `filter` and
+                `minimum_should_match`, or None when the query is not fully understood.
+        """
+        text = fold_text(query)
+        should: List[Dict[str, Any]] = []
+        flags: List[Dict[str, Any]] = []
+        ranges: Dict[str, Dict[str, float]] = {}
+
+        def consume(match: re.Match, group: int | str = 0) -> None:
+            nonlocal text
+            start, end = match.span(group)
+            text = text[:start] + " " * (end - start) + text[end:]
+
+        for field, pattern in _FLAG_RES.items():
+            for match in list(pattern.finditer(text)):
+                flags.append({"term": {f"metadata.{field}": match.group(1) != "sin"}})
+                consume(match)
+
+        # Models before makes so "mazda 3" is read as one vehicle line.
+        models = set()
+        for pattern, line in self._models:
+            for match in list(pattern.finditer(text)):
+                models.add(line)
+                consume(match, "phrase")
+        makes = set()
+        for pattern, make in self._makes:
+            for match in list(pattern.finditer(text)):
+                makes.add(make)
+                consume(match, "phrase")
+        # Several vehicle lines ("mazda o jetta") need an OR that only the LLM builds.
+        if len(models) > 1 or len(makes) > 1:
+            return None
+        if models and makes and next(iter(models))[0] not in makes:
+            return None
+        if makes:
+            should.append({"match": {"metadata.make": next(iter(makes))}})
+        if models:
+            should.append({"match": {"metadata.model": next(iter(models))[1]}})
+
+        # "de 2015 a 2018" before the bounds, which would read "hasta 2018" alone.
+        for match in list(_YEAR_SPAN_RE.finditer(text)):
+            years = [int(match.group(1)), int(match.group(2))]
+            ranges.setdefault("year", {}).update({"gte": min(years), "lte": max(years)})
+            consume(match)
+
+        for match in list(_BETWEEN_RE.finditer(text)):
+            field_word, low, low_mult, low_unit, high, high_mult, high_unit = match.groups()
+            unit = high_unit or low_unit
+            # "entre 300 y 400 mil" shares the multiplier.
+            values = [parse_amount(low, low_mult or high_mult), parse_amount(high, high_mult)]
+            field = self._resolve_field(field_word, unit, high_mult, values[1])
+            if field is None:
+                return None
+            ranges.setdefault(field, {}).update({"gte": min(values), "lte": max(values)})
+            consume(match)
+
+        for match in list(_BOUND_RE.finditer(text)):
+            field_word, operator, number, multiplier, unit = match.groups()
+            value = parse_amount(number, multiplier)
+            field = self._resolve_field(field_word, unit, multiplier, value)
+            if field is None:
+                return None
+            bound = "lte" if operator in _UPPER_WORDS else "gte"
+            ranges.setdefault(field, {})[bound] = value
+            consume(match)
+
+        for match in list(_YEAR_FROM_RE.finditer(text)):
+            ranges.setdefault("year", {})["gte"] = int(match.group(1))
+            consume(match)
+
+        years = list(_YEAR_RE.finditer(text))
+        # "mazda 2019 2021" or a year next to a year range: only the LLM can tell what is meant.
+        if len(years) > 1 or (years and "year" in ranges):
+            return None
+        for match in years:
+            year = int(match.group(1))
+            ranges["year"] = {"gte": year, "lte": year}
+            consume(match)
+
+        if any(word not in STOPWORDS for word in re.findall(r"\w+", text)):
+            return None
+
+        filters = flags + [
+            {"range": {f"metadata.{field}": {k: _as_number(v) for k, v in bounds.items()}}}
+            for field, bounds in ranges.items()
+        ]
+        result: Dict[str, Any] = {}
+        if should:
+            result["should"] = should
+            result["minimum_should_match"] = len(should)
+        if filters:
+            result["filter"] = filters
+        return result
+
+    @staticmethod
+    def _resolve_field(
+        field_word: str | None, unit: str | None, multiplier: str | None, value: float
+    ) -> str | None:
+        """Decides whether an amount is a price, a mileage or a year."""
+        words = {field_word, unit}
+        if words & _KM_WORDS:
+            return "km"
+        if words & _YEAR_WORDS or (not multiplier and not unit and 1980 <= value < 2050):
+            return "year"
+        if words & _PRICE_WORDS or multiplier or value >= 10_000:
+            return "price"
+        # Bare small amounts such as "menos de 400" are ambiguous.
+        return None
+
+
+def _as_number(value: float) -> int | float:
+    """Keeps whole amounts as integers, like the examples given to the LLM."""
+    return int(value) if float(value).is_integer() else value
+
+
+_parser: RuleBasedFilterParser | None = None
+_parser_loaded_at = 0.0
+
+
+async def get_filter_parser() -> RuleBasedFilterParser:
+    """Returns a parser built from the catalog vocabulary, refreshed every `CATALOG_VOCABULARY_TTL` seconds.
+
+    Returns:
+        RuleBasedFilterParser: The shared parser. Without a catalog it still
+            handles queries that name no make or model.
+    """
+    global _parser, _parser_loaded_at
+    if _parser is None or time.monotonic() - _parser_loaded_at > CATALOG_VOCABULARY_TTL:
+        try:
+            catalog = await RelationalStorage().get_make_models()
+            _parser = RuleBasedFilterParser(catalog)
+        except Exception as e:
+            print(f"Could not load catalog vocabulary: {e}")
+            _parser = _parser or RuleBasedFilterParser([])
+        _parser_loaded_at = time.monotonic()
+    return _parser
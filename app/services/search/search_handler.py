@@ -1,27 +1,129 @@
+import asyncio
 import json
-from typing import List
+from typing import Awaitable, List, TypeVar
 from app.prompts.filters import FILTER_EXTRACTION_PROMPT
+from app.services.cache.filter_cache import filter_cache
+from app.services.cache.search_cache import search_result_cache
+from app.services.llm.model_routing import TASK_FILTERS
 from app.services.llm.openai_client import OpenAIClient
+from app.services.llm.resilience import RETRYABLE_ERRORS, CircuitOpenError
+from app.services.search.filter_parser import get_filter_parser
 from app.services.storage.search_engine_storage import SearchEngineStorage
+from app.utils.helpers import fold_text
 from app.utils.openai_utils import get_embedding
+from app.utils.timing import StageTimer
 
+T = TypeVar("T")
 
-async def perform_vehicle_search(query: str, k: int = 5) -> List[dict]:
-    """Realiza una búsqueda de vehículos utilizando búsqueda vectorial y filtros extraídos por LLM.
+# Without a fallback reply an outage raises instead of looking like an invalid answer.
+llm = OpenAIClient(fallback_response=None)
+search_engine_storage = SearchEngineStorage()
+
+
+async def extract_filters(query: str) -> dict:
+    """Extrae filtros estructurados de la consulta.
+
+    Las consultas comunes se resuelven con reglas locales; solo se llama al LLM
+    cuando el parser no entiende la consulta completa, y su respuesta se guarda en
+    caché por consulta normalizada.
 
     Args:
         query (str): Consulta en lenguaje natural del usuario.
-        k (int, optional): Número de resultados a retornar. Por defecto es 5.
 
     Returns:
-        List[dict]: Lista de vehículos que coinciden con la búsqueda y los filtros.
+        dict: Filtros a aplicar en la búsqueda.
+
+    Raises:
+        CircuitOpenError: Si el LLM no está disponible; no se guarda nada en caché.
+    """
+    parser = await get_filter_parser()
+    filters = parser.parse(query)
+    if filters is not None:
+        return filters
+
+    cached = await filter_cache.get(query)
+    if cached is not None:
+        return cached.get("filters", {})
+
+    try:
+        filters = await extract_filters_with_llm(query)
+    except ValueError as e:
+        # Searching without filters beats failing; remember it briefly to spare the LLM.
+        print(f"Invalid filters for query {query!r}: {e}")
+        await filter_cache.set_invalid(query)
+        return {}
+    await filter_cache.set(query, filters)
+    return filters
+
+
+async def extract_filters_with_llm(query: str) -> dict:
+    """Extrae filtros estructurados de la consulta usando el LLM.
+
+    Args:
+        query (str): Consulta en lenguaje natural del usuario.
+
+    Returns:
+        dict: Filtros a aplicar en la búsqueda.
+
+    Raises:
+        ValueError: Si la respuesta del LLM no es un objeto JSON.
+        CircuitOpenError: Si el LLM no está disponible, o uno de `RETRYABLE_ERRORS`.
     """
-    search_engine_storage = SearchEngineStorage()
     prompt = FILTER_EXTRACTION_PROMPT.format(query=query)
-    openai_client = OpenAIClient()
     messages = [{"role": "user", "content": prompt}]
-    response = await openai_client.generate_response(messages)
+    response = await llm.generate_response(messages, task=TASK_FILTERS)
     filters = json.loads(response)
-    vector = await get_embedding(query)
-    results = await search_engine_storage.knn_search(vector, k=k, filters=filters)
+    if not isinstance(filters, dict):
+        raise ValueError(f"Expected a JSON object, got: {response}")
+    return filters
+
+
+async def _filters_or_none(query: str) -> dict | None:
+    """Extrae los filtros de la consulta, o None mientras el LLM no está disponible."""
+    try:
+        return await extract_filters(query)
+    except (CircuitOpenError, *RETRYABLE_ERRORS) as e:
+        print(f"Filter extraction unavailable, searching without filters: {e!r}")
+        return None
+
+
+async def _timed(timer: StageTimer, name: str, awaitable: Awaitable[T]) -> T:
+    """Awaits a coroutine while measuring it as a stage."""
+    with timer.stage(name):
+        return await awaitable
+
+
+async def perform_vehicle_search(
+    query: str, k: int = 5, timer: StageTimer | None = None
+) -> List[dict]:
+    """Realiza una búsqueda de vehículos utilizando búsqueda vectorial y filtros extraídos por LLM.
+
+    La extracción de filtros y el embedding de la consulta son independientes, así que
+    se ejecutan de forma concurrente. Una consulta repetida con el catálogo sin cambios
+    se responde desde la caché sin llamar al LLM ni a OpenSearch. Si el LLM de filtros
+    no está disponible se busca sin filtros y el resultado no se guarda en caché.
+
+    Args:
+        query (str): Consulta en lenguaje natural del usuario.
+        k (int, optional): Número de resultados a retornar. Por defecto es 5.
+        timer (StageTimer, optional): Recibe la duración de cada etapa.
+
+    Returns:
+        List[dict]: Lista de vehículos que coinciden con la búsqueda y los filtros.
+    """
+    timer = timer or StageTimer()
+    cache_parts = {"query": fold_text(query), "k": k}
+    with timer.stage("total"):
+        with timer.stage("cache"):
+            results = await search_result_cache.get(cache_parts)
+        if results is None:
+            filters, vector = await asyncio.gather(
+                _timed(timer, "filters", _filters_or_none(query)),
+                _timed(timer, "embedding", get_embedding(query)),
+            )
+            with timer.stage("knn"):
+                results = await search_engine_storage.knn_search(vector, k=k, filters=filters or {})
+            if filters is not None:
+                await search_result_cache.set(cache_parts, results)
+    print(f"search_timings: {timer.as_dict()}")
     return results
@@ -1,5 +1,7 @@
 import json
-from typing import Any
+from typing import Any, Dict, List
+
+from redis.exceptions import WatchError
 
 from app.services.storage.connections import get_redis_client
 
@@ -83,6 +85,361 @@ class CacheStorage:
         redis = await self._get_redis()
         await redis.delete(self._make_key(key))
 
+    async def get_hash_fields(self, key: str, fields: List[str]) -> List[str | None]:
+        """
+        Retrieves several fields of a Redis hash in a single round trip.
+
+        Args:
+            key (str): The hash key.
+            fields (List[str]): The fields to read.
+
+        Returns:
+            List[str | None]: The field values, None for missing fields.
+        """
+        if not fields:
+            return []
+        redis = await self._get_redis()
+        return await redis.hmget(self._make_key(key), fields)
+
+    async def set_hash_fields(self, key: str, mapping: Dict[str, str]) -> None:
+        """
+        Stores several fields of a Redis hash in a single round trip.
+
+        Args:
+            key (str): The hash key.
+            mapping (Dict[str, str]): Field names and their values.
+        """
+        if not mapping:
+            return
+        redis = await self._get_redis()
+        await redis.hset(self._make_key(key), mapping=mapping)
+
+    async def delete_hash_fields(self, key: str, fields: List[str]) -> None:
+        """
+        Removes fields from a Redis hash.
+
+        Args:
+            key (str): The hash key.
+            fields (List[str]): The fields to remove.
+        """
+        if not fields:
+            return
+        redis = await self._get_redis()
+        await redis.hdel(self._make_key(key), *fields)
+
+    async def get_hash_keys(self, key: str) -> List[str]:
+        """
+        Lists the field names of a Redis hash.
+
+        Args:
+            key (str): The hash key.
+
+        Returns:
+            List[str]: The field names.
+        """
+        redis = await self._get_redis()
+        return await redis.hkeys(self._make_key(key))
+
+    async def get_hash(self, key: str) -> Dict[str, str]:
+        """
+        Retrieves every field of a Redis hash.
+
+        Args:
+            key (str): The hash key.
+
+        Returns:
+            Dict[str, str]: The hash fields, empty if the key does not exist.
+        """
+        redis = await self._get_redis()
+        return await redis.hgetall(self._make_key(key))
+
+    async def increment(self, key: str, amount: int = 1) -> int:
+        """
+        Atomically increments an integer counter.
+
+        Args:
+            key (str): The counter key.
+            amount (int): The increment.
+
+        Returns:
+            int: The new value.
+        """
+        redis = await self._get_redis()
+        return await redis.incrby(self._make_key(key), amount)
+
+    async def increment_hash_field(self, key: str, field: str, amount: int = 1) -> int:
+        """
+        Atomically increments an integer field of a Redis hash.
+
+        Args:
+            key (str): The hash key.
+            field (str): The field to increment.
+            amount (int): The increment.
+
+        Returns:
+            int: The new value.
+        """
+        redis = await self._get_redis()
+        return await redis.hincrby(self._make_key(key), field, amount)
+
+    async def add_to_set(self, key: str, *members: str) -> int:
+        """
+        Adds members to a Redis set.
+
+        Args:
+            key (str): The set key.
+            *members (str): The members to add.
+
+        Returns:
+            int: The number of members that were not in the set yet.
+        """
+        redis = await self._get_redis()
+        return await redis.sadd(self._make_key(key), *members)
+
+    async def is_set_member(self, key: str, member: str) -> bool:
+        """
+        Checks whether a value is a member of a Redis set.
+
+        Args:
+            key (str): The set key.
+            member (str): The value.
+
+        Returns:
+            bool: True if the value is in the set.
+        """
+        redis = await self._get_redis()
+        return bool(await redis.sismember(self._make_key(key), member))
+
+    async def remove_from_set(self, key: str, *members: str) -> None:
+        """
+        Removes members from a Redis set.
+
+        Args:
+            key (str): The set key.
+            *members (str): The members to remove.
+        """
+        redis = await self._get_redis()
+        await redis.srem(self._make_key(key), *members)
+
+    async def get_set_members(self, key: str) -> List[str]:
+        """
+        Lists the members of a Redis set.
+
+        Args:
+            key (str): The set key.
+
+        Returns:
+            List[str]: The set members.
+        """
+        redis = await self._get_redis()
+        return list(await redis.smembers(self._make_key(key)))
+
+    async def add_to_sorted_set(self, key: str, mapping: Dict[str, float]) -> None:
+        """
+        Adds members to a Redis sorted set, updating the score of existing ones.
+
+        Args:
+            key (str): The sorted set key.
+            mapping (Dict[str, float]): Members and their scores.
+        """
+        if not mapping:
+            return
+        redis = await self._get_redis()
+        await redis.zadd(self._make_key(key), mapping)
+
+    async def get_sorted_set_range_by_score(
+        self,
+        key: str,
+        min_score: float | str = "-inf",
+        max_score: float | str = "+inf",
+        offset: int = 0,
+        count: int | None = None,
+    ) -> List[str]:
+        """
+        Lists the members of a Redis sorted set within a score range, lowest first.
+
+        Args:
+            key (str): The sorted set key.
+            min_score (float | str): Lowest score, inclusive.
+            max_score (float | str): Highest score, inclusive.
+            offset (int): Number of matching members to skip.
+            count (int, optional): Maximum number of members returned.
+
+        Returns:
+            List[str]: The members.
+        """
+        redis = await self._get_redis()
+        if count is None:
+            return await redis.zrangebyscore(self._make_key(key), min_score, max_score)
+        return await redis.zrangebyscore(
+            self._make_key(key), min_score, max_score, start=offset, num=count
+        )
+
+    async def get_sorted_set_score(self, key: str, member: str) -> float | None:
+        """
+        Retrieves the score of a member of a Redis sorted set.
+
+        Args:
+            key (str): The sorted set key.
+            member (str): The member.
+
+        Returns:
+            float | None: The score, or None if the member is not in the set.
+        """
+        redis = await self._get_redis()
+        return await redis.zscore(self._make_key(key), member)
+
+    async def remove_from_sorted_set(self, key: str, *members: str) -> None:
+        """
+        Removes members from a Redis sorted set.
+
+        Args:
+            key (str): The sorted set key.
+            *members (str): The members to remove.
+        """
+        redis = await self._get_redis()
+        await redis.zrem(self._make_key(key), *members)
+
+    async def set_if_absent(self, key: str, value: str, ttl: int) -> bool:
+        """
+        Stores a raw value only if the key does not exist yet, e.g. to take a lease.
+
+        Args:
+            key (str): The key.
+            value (str): The value to store.
+            ttl (int): Time to live in seconds.
+
+        Returns:
+            bool: True if the value was stored.
+        """
+        redis = await self._get_redis()
+        return bool(await redis.set(self._make_key(key), value, ex=ttl, nx=True))
+
+    async def expire(self, key: str, ttl: int) -> None:
+        """
+        Sets the time to live of a key.
+
+        Args:
+            key (str): The key.
+            ttl (int): Time to live in seconds.
+        """
+        redis = await self._get_redis()
+        await redis.expire(self._make_key(key), ttl)
+
+    async def push_to_list(self, key: str, values: List[Any], max_length: int = 0) -> int:
+        """
+        Appends values to a Redis list, each serialized on its own.
+
+        Args:
+            key (str): The list key.
+            values (List[Any]): The values to append.
+            max_length (int): If positive, only the newest `max_length` items are kept.
+
+        Returns:
+            int: The length of the list after appending.
+        """
+        if not values:
+            return await self.get_list_length(key)
+        redis = await self._get_redis()
+        namespaced_key = self._make_key(key)
+        async with redis.pipeline(transaction=True) as pipe:
+            pipe.rpush(namespaced_key, *[json.dumps(value) for value in values])
+            if max_length > 0:
+                pipe.ltrim(namespaced_key, -max_length, -1)
+            length = (await pipe.execute())[0]
+        return min(length, max_length) if max_length > 0 else length
+
+    async def get_list_range(self, key: str, start: int = 0, end: int = -1) -> List[Any]:
+        """
+        Retrieves and deserializes a slice of a Redis list.
+
+        Args:
+            key (str): The list key.
+            start (int): Index of the first item; negative indexes count from the end.
+            end (int): Index of the last item, inclusive.
+
+        Returns:
+            List[Any]: The items, empty if the key does not exist.
+        """
+        redis = await self._get_redis()
+        return [json.loads(item) for item in await redis.lrange(self._make_key(key), start, end)]
+
+    async def trim_list(self, key: str, start: int, end: int) -> None:
+        """
+        Keeps only a slice of a Redis list.
+
+        Args:
+            key (str): The list key.
+            start (int): Index of the first item kept; negative indexes count from the end.
+            end (int): Index of the last item kept, inclusive.
+        """
+        redis = await self._get_redis()
+        await redis.ltrim(self._make_key(key), start, end)
+
+    async def get_list_length(self, key: str) -> int:
+        """
+        Counts the items of a Redis list.
+
+        Args:
+            key (str): The list key.
+
+        Returns:
+            int: The number of items, 0 if the key does not exist.
+        """
+        redis = await self._get_redis()
+        return await redis.llen(self._make_key(key))
+
+    async def convert_to_list(self, key: str) -> bool:
+        """
+        Rewrites a key holding a JSON array as a Redis list with one item per element.
+
+        The key is watched, so a concurrent conversion or write makes this one a no-op.
+
+        Args:
+            key (str): The key to convert.
+
+        Returns:
+            bool: True if the key was converted.
+        """
+        redis = await self._get_redis()
+        namespaced_key = self._make_key(key)
+        async with redis.pipeline(transaction=True) as pipe:
+            try:
+                await pipe.watch(namespaced_key)
+                if await pipe.type(namespaced_key) != "string":
+                    return False
+                try:
+                    items = json.loads(await pipe.get(namespaced_key))
+                except json.JSONDecodeError:
+                    return False
+                if not isinstance(items, list):
+                    return False
+                pipe.multi()
+                pipe.delete(namespaced_key)
+                if items:
+                    pipe.rpush(namespaced_key, *[json.dumps(item) for item in items])
+                await pipe.execute()
+            except WatchError:
+                return False
+        return True
+
+    async def scan_keys(self, pattern: str = "*") -> List[str]:
+        """
+        Lists the keys of this namespace matching a pattern, without blocking Redis.
+
+        Args:
+            pattern (str): Glob-style pattern, relative to the namespace.
+
+        Returns:
+            List[str]: The matching keys, without the namespace prefix.
+        """
+        redis = await self._get_redis()
+        prefix = self._make_key("")
+        return [
+            key[len(prefix):]
+            async for key in redis.scan_iter(match=self._make_key(pattern), count=500)
+        ]
+
     async def append_interaction(
         self, key: str, user_msg: str, assistant_msg: str
     ) -> None:
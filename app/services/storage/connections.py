@@ -5,6 +5,7 @@ from openai import AsyncOpenAI
 
 
 _redis_client = None
+_redis_binary_client = None
 _mongo_client = None
 _open_search_client: AsyncOpenSearch = None
 _openai_client = None
@@ -25,6 +26,21 @@ async def get_redis_client(redis_url="redis://redis:6379"):
     return _redis_client
 
 
+async def get_redis_binary_client(redis_url="redis://redis:6379"):
+    """Initialize and return a singleton Redis client that returns raw bytes.
+
+    Args:
+        redis_url (str): Redis connection URL.
+
+    Returns:
+        Redis: A Redis client instance without response decoding.
+    """
+    global _redis_binary_client
+    if _redis_binary_client is None:
+        _redis_binary_client = aioredis.from_url(redis_url, decode_responses=False)
+    return _redis_binary_client
+
+
 async def get_mongo_client(mongo_url="mongodb://mongo:27017/kabot"):
     """Initialize and return a singleton MongoDB client.
 
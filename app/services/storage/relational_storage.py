@@ -1,11 +1,13 @@
 import os
-from typing import Any, Dict
+from typing import Any, Dict, Iterable, List, Tuple
 
 from sqlalchemy.ext.asyncio import (
     AsyncEngine,
     AsyncSession,
     create_async_engine,
 )
+from sqlalchemy import delete, literal_column
+from sqlalchemy.dialects.postgresql import insert
 from sqlalchemy.orm import sessionmaker
 from sqlmodel import SQLModel, select
 
@@ -23,6 +25,13 @@ engine: AsyncEngine = create_async_engine(
     future=True,
 )
 
+# From this many rows the upsert goes through COPY into a staging table. A full
+# ingestion batch (INGESTION_BATCH_SIZE) reaches it.
+COPY_THRESHOLD = int(os.getenv("POSTGRES_COPY_THRESHOLD", 1000))
+
+# asyncpg accepts at most 32767 bind parameters per statement.
+UPSERT_BATCH_SIZE = 32767 // len(Vehicle.__table__.columns)
+
 AsyncSessionLocal = sessionmaker(
     bind=engine,
     class_=AsyncSession,
@@ -80,7 +89,7 @@ class RelationalStorage(Storage):
             return [vehicle.model_dump() for vehicle in vehicles]
 
     async def bulk_load(self, data: Dict) -> list[Dict[str, Any]]:
-        """Bulk load multiple vehicle records into the database asynchronously.
+        """Bulk upsert multiple vehicle records into the database asynchronously.
 
         Args:
             data (Dict): A dictionary containing a 'records' key with a list of vehicle data.
@@ -89,9 +98,126 @@ class RelationalStorage(Storage):
             List[Dict[str, Any]]: The list of loaded vehicle records.
         """
         records = data.get("records", [])
+        await self.bulk_upsert(records)
+        return records
+
+    async def bulk_upsert(self, records: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Insert or update vehicle records keyed by stock_id.
+
+        Small loads use multi-row `INSERT ... ON CONFLICT (stock_id) DO UPDATE`
+        statements. Loads of at least `COPY_THRESHOLD` rows are copied into a
+        staging table with asyncpg and merged with a single statement.
+
+        Args:
+            records (List[Dict[str, Any]]): Vehicle records.
+
+        Returns:
+            Dict[str, int]: Number of inserted and updated rows.
+        """
+        # A single statement cannot touch the same row twice, so keep the last duplicate.
+        unique_records = list({item["stock_id"]: item for item in records}.values())
+        if not unique_records:
+            return {"inserted": 0, "updated": 0}
+        if len(unique_records) >= COPY_THRESHOLD:
+            return await self._copy_upsert(unique_records)
+
+        inserted_flags = []
         async with self.session_local() as session:
             async with session.begin():
-                for item in records:
-                    vehicle = Vehicle(**item)
-                    await session.merge(vehicle)
-        return records
+                for start in range(0, len(unique_records), UPSERT_BATCH_SIZE):
+                    statement = self._build_upsert_statement(
+                        unique_records[start : start + UPSERT_BATCH_SIZE]
+                    )
+                    result = await session.execute(statement)
+                    inserted_flags.extend(result.scalars().all())
+        inserted = sum(1 for flag in inserted_flags if flag)
+        return {"inserted": inserted, "updated": len(inserted_flags) - inserted}
+
+    def _build_upsert_statement(self, records: List[Dict[str, Any]]):
+        """Build a multi-row upsert that reports whether each row was inserted.
+
+        Args:
+            records (List[Dict[str, Any]]): Vehicle records without duplicate stock_ids.
+
+        Returns:
+            Insert: The `INSERT ... ON CONFLICT DO UPDATE ... RETURNING` statement.
+        """
+        statement = insert(Vehicle).values(records)
+        update_columns = {
+            column.name: statement.excluded[column.name]
+            for column in Vehicle.__table__.columns
+            if column.name != "stock_id"
+        }
+        # xmax is 0 only for freshly inserted tuples.
+        return statement.on_conflict_do_update(
+            index_elements=["stock_id"], set_=update_columns
+        ).returning(literal_column("(xmax = 0)").label("inserted"))
+
+    async def _copy_upsert(self, records: List[Dict[str, Any]]) -> Dict[str, int]:
+        """Upsert a large set of records through COPY into a temporary staging table.
+
+        Args:
+            records (List[Dict[str, Any]]): Vehicle records without duplicate stock_ids.
+
+        Returns:
+            Dict[str, int]: Number of inserted and updated rows.
+        """
+        table = Vehicle.__tablename__
+        columns = [column.name for column in Vehicle.__table__.columns]
+        column_list = ", ".join(columns)
+        update_list = ", ".join(
+            f"{column} = EXCLUDED.{column}" for column in columns if column != "stock_id"
+        )
+
+        async with self.engine.connect() as conn:
+            raw_connection = await conn.get_raw_connection()
+            driver = raw_connection.driver_connection
+            async with driver.transaction():
+                await driver.execute(
+                    f"CREATE TEMP TABLE {table}_staging "
+                    f"(LIKE {table} INCLUDING DEFAULTS) ON COMMIT DROP"
+                )
+                await driver.copy_records_to_table(
+                    f"{table}_staging",
+                    records=[tuple(item[column] for column in columns) for item in records],
+                    columns=columns,
+                )
+                rows = await driver.fetch(
+                    f"INSERT INTO {table} ({column_list}) "
+                    f"SELECT {column_list} FROM {table}_staging "
+                    f"ON CONFLICT (stock_id) DO UPDATE SET {update_list} "
+                    f"RETURNING (xmax = 0) AS inserted"
+                )
+        inserted = sum(1 for row in rows if row["inserted"])
+        return {"inserted": inserted, "updated": len(rows) - inserted}
+
+    async def delete_many(self, stock_ids: Iterable[int]) -> int:
+        """Delete vehicle records by stock_id asynchronously.
+
+        Args:
+            stock_ids (Iterable[int]): The stock_ids of the vehicles to delete.
+
+        Returns:
+            int: Number of deleted rows.
+        """
+        ids = list(stock_ids)
+        if not ids:
+            return 0
+        async with self.session_local() as session:
+            async with session.begin():
+                result = await session.execute(
+                    delete(Vehicle).where(Vehicle.stock_id.in_(ids))
+                )
+        return result.rowcount
+
+    async def get_make_models(self) -> List[Tuple[str, str]]:
+        """Return the distinct (make, model) pairs of the catalog.
+
+        Returns:
+            List[Tuple[str, str]]: The make and model of every distinct vehicle line.
+        """
+        async with self.session_local() as session:
+            result = await session.execute(
+                select(Vehicle.make, Vehicle.model).distinct()
+            )
+            return [(make, model) for make, model in result.all()]
@@ -1,11 +1,21 @@
-from typing import Any, Dict, List
+import hashlib
+import os
+from typing import Any, Dict, Iterable, List, Tuple
+from opensearchpy import AsyncOpenSearch
 from opensearchpy.exceptions import RequestError
-from opensearchpy.helpers import async_bulk
+from opensearchpy.helpers import async_bulk, async_streaming_bulk
+from app.services.cache.embedding_cache import encode_vector
+from app.services.cache.search_cache import SearchResultCache, search_result_cache
 from app.services.storage.base import Storage
 from app.services.storage.connections import get_open_search_client
 
 INDEX_NAME = "vehicles"
 
+BULK_CHUNK_SIZE = int(os.getenv("OPENSEARCH_BULK_CHUNK_SIZE", 500))
+BULK_MAX_CHUNK_BYTES = int(
+    os.getenv("OPENSEARCH_BULK_MAX_CHUNK_BYTES", 10 * 1024 * 1024)
+)
+
 MAPPING = {
     "settings": {
         "index": {"knn": True, "number_of_shards": 1, "number_of_replicas": 0}
@@ -43,6 +53,15 @@ MAPPING = {
 class SearchEngineStorage(Storage):
     """Asynchronous storage implementation for OpenSearch using a singleton client."""
 
+    def __init__(self, result_cache: SearchResultCache | None = search_result_cache):
+        """
+        Initializes the storage.
+
+        Args:
+            result_cache (SearchResultCache, optional): Cache of kNN results. None disables it.
+        """
+        self.result_cache = result_cache
+
     async def setup(self) -> None:
         """Asynchronously create the index with mapping if it doesn't exist."""
         client = await get_open_search_client()
@@ -90,7 +109,10 @@ class SearchEngineStorage(Storage):
         self, text: str, metadata: dict, vector: list[float]
     ) -> None:
         """
-        Indexes a document with a vector embedding into OpenSearch.
+        Upserts a document with a vector embedding into OpenSearch.
+
+        The document is keyed by `metadata["stock_id"]`, so indexing the same
+        vehicle twice updates it instead of creating a duplicate.
 
         Args:
             text (str): Textual content of the document.
@@ -99,7 +121,127 @@ class SearchEngineStorage(Storage):
         """
         client = await get_open_search_client()
         body = {"text": text, "embedding": vector, "metadata": metadata}
-        await client.index(index=INDEX_NAME, body=body)
+        await client.update(
+            index=INDEX_NAME,
+            id=metadata["stock_id"],
+            body={"doc": body, "doc_as_upsert": True},
+        )
+
+    async def bulk_index_with_embedding(
+        self,
+        documents: Iterable[Tuple[str, dict, list[float]]],
+        chunk_size: int = BULK_CHUNK_SIZE,
+        max_chunk_bytes: int = BULK_MAX_CHUNK_BYTES,
+        disable_refresh: bool = False,
+    ) -> Dict[str, Any]:
+        """
+        Upserts many documents with vector embeddings through the bulk API.
+
+        Documents are keyed by `metadata["stock_id"]`, so re-ingesting the same
+        catalog is idempotent.
+
+        Args:
+            documents (Iterable[Tuple[str, dict, list[float]]]): (text, metadata, vector) tuples.
+            chunk_size (int, optional): Maximum number of documents per bulk request.
+            max_chunk_bytes (int, optional): Maximum size in bytes of a bulk request.
+            disable_refresh (bool, optional): Turns off `refresh_interval` during the load
+                and restores it afterwards. Useful for large catalog loads.
+
+        Returns:
+            Dict[str, Any]: Counts of created, updated and unchanged documents and
+                the per-item errors.
+        """
+        client = await get_open_search_client()
+        actions = (
+            {
+                "_op_type": "update",
+                "_index": INDEX_NAME,
+                "_id": metadata["stock_id"],
+                "doc": {"text": text, "embedding": vector, "metadata": metadata},
+                "doc_as_upsert": True,
+            }
+            for text, metadata, vector in documents
+        )
+
+        previous_refresh = None
+        if disable_refresh:
+            previous_refresh = await self._get_refresh_interval(client)
+            await self._set_refresh_interval(client, "-1")
+
+        counts = {"created": 0, "updated": 0, "unchanged": 0}
+        errors = []
+        try:
+            async for ok, item in async_streaming_bulk(
+                client,
+                actions,
+                chunk_size=chunk_size,
+                max_chunk_bytes=max_chunk_bytes,
+                raise_on_error=False,
+            ):
+                if not ok:
+                    errors.append(item)
+                    continue
+                result = item.get("update", {}).get("result")
+                if result == "created":
+                    counts["created"] += 1
+                elif result == "noop":
+                    counts["unchanged"] += 1
+                else:
+                    counts["updated"] += 1
+        finally:
+            if disable_refresh:
+                await self._set_refresh_interval(client, previous_refresh)
+                await client.indices.refresh(index=INDEX_NAME)
+
+        return {**counts, "errors": errors}
+
+    async def bulk_delete(self, stock_ids: Iterable[int]) -> int:
+        """
+        Deletes vehicle documents by stock_id through the bulk API.
+
+        Args:
+            stock_ids (Iterable[int]): The stock_ids of the documents to delete.
+
+        Returns:
+            int: Number of deleted documents. Missing documents are ignored.
+        """
+        client = await get_open_search_client()
+        actions = (
+            {"_op_type": "delete", "_index": INDEX_NAME, "_id": stock_id}
+            for stock_id in stock_ids
+        )
+        deleted, _ = await async_bulk(client, actions, raise_on_error=False)
+        return deleted
+
+    async def _get_refresh_interval(self, client: AsyncOpenSearch) -> str | None:
+        """
+        Reads the explicit `refresh_interval` of the index.
+
+        Args:
+            client (AsyncOpenSearch): OpenSearch client.
+
+        Returns:
+            str | None: The configured interval, or None if the index uses the default.
+        """
+        settings = await client.indices.get_settings(
+            index=INDEX_NAME, name="index.refresh_interval"
+        )
+        index_settings = settings.get(INDEX_NAME, {}).get("settings", {})
+        return index_settings.get("index", {}).get("refresh_interval")
+
+    async def _set_refresh_interval(
+        self, client: AsyncOpenSearch, interval: str | None
+    ) -> None:
+        """
+        Updates the `refresh_interval` of the index. None restores the default.
+
+        Args:
+            client (AsyncOpenSearch): OpenSearch client.
+            interval (str | None): New refresh interval, e.g. "1s" or "-1".
+        """
+        await client.indices.put_settings(
+            index=INDEX_NAME, body={"index": {"refresh_interval": interval}}
+        )
 
     async def knn_search(
         self, vector: list[float], k: int = 5, filters: dict = None
@@ -107,6 +249,8 @@ class SearchEngineStorage(Storage):
         """
         Performs a k-Nearest Neighbors (k-NN) search on OpenSearch.
 
+        Results are cached by vector, filters and k until the catalog changes.
+
         Args:
             vector (list[float]): Query embedding vector.
             k (int, optional): Number of nearest neighbors to retrieve. Defaults to 5.
@@ -115,6 +259,16 @@ class SearchEngineStorage(Storage):
         Returns:
             List[Dict[str, Any]]: List of documents matching the vector and filters.
         """
+        cache_parts = {
+            "vector": hashlib.sha256(encode_vector(vector)).hexdigest(),
+            "filters": filters,
+            "k": k,
+        }
+        if self.result_cache is not None:
+            cached = await self.result_cache.get(cache_parts)
+            if cached is not None:
+                return cached
+
         client = await get_open_search_client()
         knn_clause = {"knn": {"embedding": {"vector": vector, "k": k}}}
 
@@ -132,7 +286,10 @@ class SearchEngineStorage(Storage):
 
         print(f"query: {query}")
         response = await client.search(index=INDEX_NAME, body=query)
-        return [hit["_source"] for hit in response["hits"]["hits"]]
+        results = [hit["_source"] for hit in response["hits"]["hits"]]
+        if self.result_cache is not None:
+            await self.result_cache.set(cache_parts, results)
+        return results
 
 
 # Helper function to convert filters dict to OpenSearch clauses
@@ -1,5 +1,6 @@
 import asyncio
 
+from app.services.memory.working_memory import WorkingMemory
 from app.services.storage.relational_storage import RelationalStorage
 from app.services.storage.search_engine_storage import SearchEngineStorage
 
@@ -8,13 +9,17 @@ async def setup_all() -> None:
     """Initialize all storage backends asynchronously.
 
     This function initializes the relational and search engine storage
-    components concurrently using asyncio.
+    components concurrently using asyncio, and converts conversations still
+    stored in working memory as JSON arrays into Redis lists.
     """
     print("Initializing PostgreSQL...")
     relational_storage = RelationalStorage()
     print("Initializing OpenSearch...")
     search_engine_storage = SearchEngineStorage()
     await asyncio.gather(relational_storage.setup(), search_engine_storage.setup())
+    print("Converting working memory to Redis lists...")
+    converted = await WorkingMemory().convert_legacy_keys()
+    print(f"Converted {converted} conversations")
 
 
 if __name__ == "__main__":
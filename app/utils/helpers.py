@@ -1,3 +1,4 @@
+import unicodedata
 from typing import List, Generator, TypeVar
 
 T = TypeVar("T")
@@ -56,3 +57,17 @@ def parse_float(value: str, default: float = 0.0) -> float:
         return float(value)
     except (ValueError, TypeError):
         return default
+
+
+def fold_text(text: str) -> str:
+    """Fold text for matching: lowercase, without accents and with collapsed whitespace.
+
+    Args:
+        text (str): The text to fold.
+
+    Returns:
+        str: Folded text, e.g. "Año  Económico" -> "ano economico".
+    """
+    decomposed = unicodedata.normalize("NFKD", text.casefold())
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.split())
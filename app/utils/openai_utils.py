@@ -1,8 +1,87 @@
+import os
+import openai
 from openai import AsyncOpenAI
+from app.services.cache.embedding_cache import embedding_cache, normalize_text
+from app.services.llm.rate_limiter import (
+    PRIORITY_INTERACTIVE,
+    embedding_limiter,
+    estimate_tokens,
+    parse_retry_after,
+)
+from app.services.llm.single_flight import SingleFlight
 from app.services.storage.connections import get_openai_client
 from typing import List
 
-async def get_embedding(text: str) -> List[float]:
+EMBEDDING_MODEL = os.getenv("OPENAI_EMBEDDING_MODEL", "text-embedding-3-small")
+
+embedding_flight = SingleFlight("embeddings")
+
+
+async def get_embedding(text: str, model: str = EMBEDDING_MODEL) -> List[float]:
+    """Embeds a single text, going through the embedding cache.
+
+    Concurrent calls for the same text share one lookup and upstream request.
+
+    Args:
+        text (str): Text to embed.
+        model (str, optional): Embedding model name.
+
+    Returns:
+        List[float]: The embedding vector.
+    """
+    key = (model, normalize_text(text))
+    vectors = await embedding_flight.do(key, lambda: get_embeddings([text], model=model))
+    return vectors[0]
+
+
+async def get_embeddings(
+    texts: List[str], model: str = EMBEDDING_MODEL, priority: int = PRIORITY_INTERACTIVE
+) -> List[List[float]]:
+    """Embeds several texts, requesting only cache misses in a single multi-input call.
+
+    Args:
+        texts (List[str]): Texts to embed.
+        model (str, optional): Embedding model name.
+        priority (int, optional): Queue priority in the embedding rate limiter.
+
+    Returns:
+        List[List[float]]: One embedding per input text, in the same order.
+    """
+    normalized = [normalize_text(text) for text in texts]
+    vectors = await embedding_cache.get_many(model, normalized)
+    missing = list(dict.fromkeys(t for t, v in zip(normalized, vectors) if v is None))
+    if missing:
+        fetched = dict(
+            zip(missing, await fetch_embeddings(missing, model=model, priority=priority))
+        )
+        await embedding_cache.set_many(model, fetched)
+        vectors = [v if v is not None else fetched[t] for t, v in zip(normalized, vectors)]
+    return vectors
+
+
+async def fetch_embeddings(
+    texts: List[str], model: str = EMBEDDING_MODEL, priority: int = PRIORITY_INTERACTIVE
+) -> List[List[float]]:
+    """Embeds several texts with a single multi-input embeddings request, bypassing the cache.
+
+    Args:
+        texts (List[str]): Texts to embed.
+        model (str, optional): Embedding model name.
+        priority (int, optional): Queue priority in the embedding rate limiter.
+
+    Returns:
+        List[List[float]]: One embedding per input text, in the same order.
+    """
     client = await get_openai_client()
-    response = await client.embeddings.create(input=[text], model="text-embedding-3-small")
-    return response.data[0].embedding
\ No newline at end of file
+    tokens = sum(estimate_tokens(text) for text in texts)
+    async with embedding_limiter.limit(tokens, priority) as lease:
+        try:
+            response = await client.embeddings.create(input=texts, model=model)
+        except openai.RateLimitError as e:
+            embedding_limiter.on_rate_limited(parse_retry_after(e.response.headers))
+            raise
+        embedding_limiter.on_success()
+        used = getattr(getattr(response, "usage", None), "total_tokens", None)
+        if isinstance(used, int):
+            lease.used_tokens = used
+    return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
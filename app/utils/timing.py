@@ -0,0 +1,42 @@
+import time
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+
+class StageTimer:
+    """Collects wall-clock durations of the named stages of a request."""
+
+    def __init__(self):
+        """Initializes an empty timer."""
+        self.durations: Dict[str, float] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        """Measures the duration of the enclosed block.
+
+        Stages may overlap, e.g. when they run concurrently.
+
+        Args:
+            name (str): Stage name.
+        """
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.durations[name] = (time.perf_counter() - start) * 1000
+
+    def as_dict(self) -> Dict[str, float]:
+        """Returns the stage durations in milliseconds, rounded to 0.1 ms.
+
+        Returns:
+            Dict[str, float]: Duration per stage.
+        """
+        return {name: round(ms, 1) for name, ms in self.durations.items()}
+
+    def server_timing(self) -> str:
+        """Formats the durations as a `Server-Timing` HTTP header value.
+
+        Returns:
+            str: e.g. `filters;dur=412.3, embedding;dur=95.1`.
+        """
+        return ", ".join(f"{name};dur={ms}" for name, ms in self.as_dict().items())
@@ -0,0 +1,86 @@
+"""Latency of the rule-based filter parser against the LLM filter extraction.
+
+Usage:
+    python3 -m benchmarks.filter_extraction            # rule-based parser only
+    python3 -m benchmarks.filter_extraction --llm      # also call the LLM (needs OPENAI_API_KEY)
+"""
+
+import argparse
+import asyncio
+import time
+from typing import Callable, List
+
+import dotenv
+
+from app.services.search.filter_parser import RuleBasedFilterParser
+from app.services.search.search_handler import extract_filters_with_llm
+from benchmarks.reporting import report
+
+CATALOG = [
+    ("Mazda", "3"),
+    ("Mazda", "CX-3"),
+    ("Mazda", "CX-30"),
+    ("Volkswagen", "Jetta"),
+    ("Volkswagen", "Vento"),
+    ("Nissan", "Versa"),
+    ("Nissan", "Sentra"),
+    ("Chevrolet", "Aveo"),
+    ("Honda", "Civic"),
+    ("Toyota", "Corolla"),
+    ("Kia", "Rio"),
+    ("Ford", "Figo"),
+]
+
+QUERIES = [
+    "mazda con car play y menos de 400 mil",
+    "jetta 2018 en adelante",
+    "nissan versa entre 200 y 250 mil",
+    "autos con bluetooth de menos de 50 mil km",
+    "honda civic del 2020",
+    "toyota corolla con precio maximo $350,000",
+    "mazda 3 desde 2019 hasta 2021",
+    "busco un aveo sin car play",
+    "suv familiar barata",
+    "algo deportivo para mi hijo",
+]
+
+
+def time_calls(call: Callable[[str], object], repeat: int) -> List[float]:
+    """Times `call` over every query, `repeat` times."""
+    samples = []
+    for _ in range(repeat):
+        for query in QUERIES:
+            start = time.perf_counter()
+            call(query)
+            samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+async def time_llm() -> List[float]:
+    """Times the LLM extraction once per query."""
+    samples = []
+    for query in QUERIES:
+        start = time.perf_counter()
+        await extract_filters_with_llm(query)
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--llm", action="store_true", help="Also benchmark the LLM path.")
+    parser.add_argument("--repeat", type=int, default=1000, help="Rule-based iterations.")
+    args = parser.parse_args()
+
+    rules = RuleBasedFilterParser(CATALOG)
+    handled = sum(rules.parse(query) is not None for query in QUERIES)
+    print(f"rule-based parser handles {handled}/{len(QUERIES)} sample queries")
+    report("rule-based", time_calls(rules.parse, args.repeat))
+
+    if args.llm:
+        dotenv.load_dotenv()
+        report("llm", asyncio.run(time_llm()))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Accuracy and latency of the local intent classifier on labeled messages.
+
+Reports the nearest-centroid accuracy, how many messages would be answered
+locally at the configured thresholds and how often those local answers are
+right, plus embedding and scoring latency. Optionally compares with the intent
+LLM call. Needs OPENAI_API_KEY for the embeddings.
+
+Usage:
+    python3 -m benchmarks.intent_classification            # local classifier only
+    python3 -m benchmarks.intent_classification --llm      # also call the intent LLM
+"""
+
+import argparse
+import asyncio
+import json
+import time
+from collections import Counter
+from typing import List, Tuple
+
+import dotenv
+
+from benchmarks.reporting import report
+
+# Held-out messages: none of them is in INTENT_EXAMPLES.
+LABELED_MESSAGES: List[Tuple[str, str]] = [
+    ("muchas gracias, hasta luego", "exit"),
+    ("eso sería todo, gracias", "exit"),
+    ("bye, buen día", "exit"),
+    ("me tengo que ir, nos vemos", "exit"),
+    ("¿Kavak tiene sucursal en Monterrey?", "kavak_info"),
+    ("¿qué pasa si el auto me sale con fallas?", "kavak_info"),
+    ("¿cómo le hago para vender mi coche con ustedes?", "kavak_info"),
+    ("¿los autos de Kavak están certificados?", "kavak_info"),
+    ("quiero un toyota corolla", "search"),
+    ("¿tienen autos con quemacocos?", "search"),
+    ("busco algo para la familia con tercera fila", "search"),
+    ("honda civic 2021 de menos de 400 mil", "search"),
+    ("¿qué autos baratos tienen?", "search"),
+    ("¿me lo pueden financiar?", "financing"),
+    ("¿cuánto tendría que dar de enganche?", "financing"),
+    ("¿a cuántos meses me lo dan?", "financing"),
+    ("¿aceptan crédito para ese auto?", "financing"),
+    ("¿cuál era el auto rojo que me enseñaste?", "episodic_memory"),
+    ("¿qué te dije que buscaba la vez pasada?", "episodic_memory"),
+    ("¿te acuerdas qué presupuesto tenía?", "episodic_memory"),
+    ("hola, ¿qué tal?", "none"),
+    ("buenas tardes", "none"),
+    ("¿con quién hablo?", "none"),
+    ("jeje ok", "none"),
+]
+
+
+async def evaluate_local(repeat: int) -> None:
+    """Classifies every labeled message locally and prints accuracy and latency."""
+    from app.services.intent.intent_classifier import LOCAL_INTENTS, IntentClassifier
+    from app.utils.openai_utils import get_embedding
+
+    classifier = IntentClassifier()
+    start = time.perf_counter()
+    await classifier.load()
+    print(f"centroids built in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    embed_samples, vectors = [], []
+    for text, _ in LABELED_MESSAGES:
+        start = time.perf_counter()
+        vectors.append(await get_embedding(text, model=classifier.model))
+        embed_samples.append((time.perf_counter() - start) * 1000)
+
+    predictions = classifier.predict_many(vectors)
+    labels = [label for _, label in LABELED_MESSAGES]
+    correct = sum(p.intent == label for p, label in zip(predictions, labels))
+    local = [
+        (p, label)
+        for p, label in zip(predictions, labels)
+        if classifier.is_confident(p) and p.intent in LOCAL_INTENTS
+    ]
+    local_correct = sum(p.intent == label for p, label in local)
+
+    print(f"nearest-centroid accuracy: {correct}/{len(labels)} ({correct / len(labels):.0%})")
+    print(
+        f"handled locally: {len(local)}/{len(labels)}, of which correct: "
+        f"{local_correct}/{len(local) or 1} "
+        f"(min_score={classifier.min_score}, min_margin={classifier.min_margin})"
+    )
+    confusions = Counter(
+        (label, p.intent) for p, label in zip(predictions, labels) if p.intent != label
+    )
+    for (expected, got), count in confusions.most_common():
+        print(f"  {expected} -> {got}: {count}")
+
+    scoring_samples = []
+    for _ in range(repeat):
+        for vector in vectors:
+            start = time.perf_counter()
+            classifier.predict(vector)
+            scoring_samples.append((time.perf_counter() - start) * 1000)
+    report("embedding", embed_samples)
+    report("scoring", scoring_samples)
+
+
+async def evaluate_llm() -> None:
+    """Asks the intent LLM for every labeled message and prints accuracy and latency."""
+    from app.prompts.conversation import build_intention_prompt_messages
+    from app.services.llm.model_routing import TASK_INTENT
+    from app.services.llm.openai_client import OpenAIClient
+
+    llm = OpenAIClient()
+    samples, correct = [], 0
+    for text, label in LABELED_MESSAGES:
+        start = time.perf_counter()
+        raw = await llm.generate_response(
+            build_intention_prompt_messages("", "", "", text), task=TASK_INTENT
+        )
+        samples.append((time.perf_counter() - start) * 1000)
+        try:
+            intention = json.loads(raw).get("intention", "none")
+        except ValueError:
+            intention = "none"
+        correct += intention == label
+    print(f"llm accuracy: {correct}/{len(LABELED_MESSAGES)}")
+    report("llm", samples)
+
+
+async def run(repeat: int, llm: bool) -> None:
+    """Runs the local evaluation and, if asked, the LLM one on the same event loop."""
+    await evaluate_local(repeat)
+    if llm:
+        await evaluate_llm()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--llm", action="store_true", help="Also benchmark the intent LLM call.")
+    parser.add_argument("--repeat", type=int, default=1000, help="Scoring iterations.")
+    args = parser.parse_args()
+
+    # Load .env before the app modules read their settings at import time.
+    dotenv.load_dotenv()
+    asyncio.run(run(args.repeat, args.llm))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,22 @@
+"""Latency statistics shared by the benchmarks.
+
+Imports nothing from `app`, so a benchmark can load `.env` before the app
+modules read their settings.
+"""
+
+import statistics
+from typing import List
+
+
+def percentile(samples: List[float], pct: float) -> float:
+    """Returns the nearest-rank percentile of the samples."""
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+def report(name: str, samples: List[float]) -> None:
+    """Prints latency statistics in milliseconds."""
+    print(
+        f"{name:<12} n={len(samples):<6} mean={statistics.mean(samples):9.3f} ms "
+        f"p50={percentile(samples, 50):9.3f} ms p95={percentile(samples, 95):9.3f} ms"
+    )
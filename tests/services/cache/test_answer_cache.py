@@ -0,0 +1,117 @@
+import json
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.services.cache import answer_cache as module
+from app.services.cache.answer_cache import SemanticAnswerCache
+
+EMBEDDINGS = {
+    "¿Dónde están?": [1.0, 0.0],
+    "¿Dónde están ubicados?": [0.95, 0.05],
+    "¿Qué garantía dan?": [0.0, 1.0],
+}
+
+
+async def fake_embedding(text):
+    return EMBEDDINGS[text]
+
+
+@pytest.fixture
+def storage():
+    storage = AsyncMock()
+    storage.get_hash_keys.return_value = []
+    storage.get_hash_fields.return_value = []
+    return storage
+
+
+@pytest.fixture(autouse=True)
+def embeddings():
+    with patch.object(module, "get_embedding", side_effect=fake_embedding) as mock_embedding:
+        yield mock_embedding
+
+
+@pytest.mark.asyncio
+async def test_similar_question_reuses_the_answer(storage):
+    cache = SemanticAnswerCache("answers", prompt="p", storage=storage, threshold=0.9)
+
+    assert await cache.get("¿Dónde están?") is None
+    await cache.set("¿Dónde están?", "En CDMX")
+
+    assert await cache.get("¿Dónde están ubicados?") == "En CDMX"
+    assert await cache.get("¿Qué garantía dan?") is None
+    assert cache.stats() == {
+        "hits": 1, "misses": 2, "stored": 1, "evicted": 0, "errors": 0, "hit_rate": 1 / 3, "entries": 1,
+    }
+    storage.set_hash_fields.assert_awaited_once()
+    storage.expire.assert_awaited_once_with(cache.version, cache.redis_ttl)
+
+
+@pytest.mark.asyncio
+async def test_prompt_change_uses_a_new_version(storage):
+    first = SemanticAnswerCache("answers", prompt="v1", storage=storage)
+    second = SemanticAnswerCache("answers", prompt="v2", storage=storage)
+
+    assert first.version != second.version
+
+
+@pytest.mark.asyncio
+async def test_answers_stored_by_other_processes_are_loaded(storage):
+    entry = {"question": "¿Dónde están?", "answer": "En CDMX", "vector": [1.0, 0.0]}
+    storage.get_hash_keys.return_value = ["abc"]
+    storage.get_hash_fields.return_value = [json.dumps(entry)]
+    cache = SemanticAnswerCache("answers", prompt="p", storage=storage, refresh_interval=60)
+
+    assert await cache.get("¿Dónde están ubicados?") == "En CDMX"
+    assert await cache.get("¿Dónde están?") == "En CDMX"
+    storage.get_hash_keys.assert_awaited_once_with(cache.version)
+
+
+@pytest.mark.asyncio
+async def test_full_cache_evicts_the_oldest_answer(storage):
+    cache = SemanticAnswerCache("answers", prompt="p", storage=storage, max_entries=1)
+
+    await cache.set("¿Dónde están?", "En CDMX")
+    await cache.set("¿Qué garantía dan?", "Tres meses")
+
+    assert await cache.get("¿Qué garantía dan?") == "Tres meses"
+    assert await cache.get("¿Dónde están?") is None
+    assert cache.stats()["entries"] == 1
+    assert cache.stats()["evicted"] == 1
+    storage.delete_hash_fields.assert_awaited_once_with(
+        cache.version, [cache._entry_id("¿Dónde están?")]
+    )
+
+
+@pytest.mark.asyncio
+async def test_refresh_keeps_the_newest_answers_within_the_cap(storage):
+    entries = {
+        "old": {"answer": "En CDMX", "vector": [1.0, 0.0], "stored_at": 1},
+        "new": {"answer": "Tres meses", "vector": [0.0, 1.0], "stored_at": 2},
+    }
+    storage.get_hash_keys.return_value = list(entries)
+    storage.get_hash_fields.return_value = [json.dumps(entry) for entry in entries.values()]
+    cache = SemanticAnswerCache("answers", prompt="p", storage=storage, max_entries=1)
+
+    assert await cache.get("¿Qué garantía dan?") == "Tres meses"
+    assert cache.stats()["entries"] == 1
+    storage.delete_hash_fields.assert_awaited_once_with(cache.version, ["old"])
+
+
+def test_matrix_grows_in_chunks(storage):
+    cache = SemanticAnswerCache("answers", prompt="p", storage=storage, max_entries=100)
+
+    for i in range(module._GROWTH_ROWS + 1):
+        cache._add(str(i), "respuesta", [1.0, float(i)], stored_at=i)
+
+    assert cache._vectors.shape == (100, 2)
+    assert cache.stats()["entries"] == module._GROWTH_ROWS + 1
+
+
+@pytest.mark.asyncio
+async def test_storage_errors_are_misses(storage):
+    storage.get_hash_keys.side_effect = ConnectionError("down")
+    cache = SemanticAnswerCache("answers", prompt="p", storage=storage)
+
+    assert await cache.get("¿Dónde están?") is None
+    assert cache.stats()["errors"] == 1
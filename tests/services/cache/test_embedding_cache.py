@@ -0,0 +1,74 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from redis.exceptions import ConnectionError
+
+from app.services.cache.embedding_cache import (
+    EmbeddingCache,
+    decode_vector,
+    encode_vector,
+    normalize_text,
+)
+
+
+def test_normalize_text_collapses_whitespace():
+    assert normalize_text("  Mazda   3\n2020 ") == "Mazda 3 2020"
+
+
+def test_vectors_round_trip_as_float32():
+    data = encode_vector([0.5, -1.25])
+    assert len(data) == 8
+    assert decode_vector(data) == [0.5, -1.25]
+
+
+def test_keys_depend_on_model():
+    cache = EmbeddingCache()
+    assert cache._make_key("m1", "hola") != cache._make_key("m2", "hola")
+
+
+@pytest.mark.asyncio
+async def test_get_many_checks_local_then_redis():
+    cache = EmbeddingCache()
+    cache.local.set(cache._make_key("m", "a"), encode_vector([1.0]))
+    mock_redis = AsyncMock()
+    mock_redis.mget.return_value = [encode_vector([2.0]), None]
+
+    with patch("app.services.cache.embedding_cache.get_redis_binary_client", return_value=mock_redis):
+        result = await cache.get_many("m", ["a", "b", "c"])
+
+    assert result == [[1.0], [2.0], None]
+    assert cache.local.get(cache._make_key("m", "b")) == encode_vector([2.0])
+    stats = cache.stats()
+    assert (stats["local_hits"], stats["redis_hits"], stats["misses"]) == (1, 1, 1)
+    assert stats["hit_rate"] == pytest.approx(2 / 3)
+
+
+@pytest.mark.asyncio
+async def test_get_many_treats_redis_errors_as_misses():
+    cache = EmbeddingCache()
+    mock_redis = AsyncMock()
+    mock_redis.mget.side_effect = ConnectionError("down")
+
+    with patch("app.services.cache.embedding_cache.get_redis_binary_client", return_value=mock_redis):
+        result = await cache.get_many("m", ["a"])
+
+    assert result == [None]
+
+
+@pytest.mark.asyncio
+async def test_set_many_writes_both_tiers_with_ttl():
+    cache = EmbeddingCache(redis_ttl=60)
+    pipe = MagicMock()
+    pipe.execute = AsyncMock()
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=False)
+    mock_redis = MagicMock()
+    mock_redis.pipeline.return_value = pipe
+
+    with patch("app.services.cache.embedding_cache.get_redis_binary_client", AsyncMock(return_value=mock_redis)):
+        await cache.set_many("m", {"a": [1.0]})
+
+    key = cache._make_key("m", "a")
+    assert cache.local.get(key) == encode_vector([1.0])
+    pipe.set.assert_called_once_with(key, encode_vector([1.0]), ex=60)
+    pipe.execute.assert_awaited_once()
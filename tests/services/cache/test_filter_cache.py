@@ -0,0 +1,64 @@
+import pytest
+from unittest.mock import AsyncMock
+
+from redis.exceptions import ConnectionError
+
+from app.services.cache.filter_cache import INVALID_ENTRY, FilterCache
+
+
+@pytest.fixture
+def storage():
+    storage = AsyncMock()
+    storage.get.return_value = None
+    return storage
+
+
+def test_keys_ignore_case_accents_and_spaces(storage):
+    cache = FilterCache(storage, prompt="v1")
+    assert cache._make_key("SUV  familiar económica") == cache._make_key("suv familiar economica")
+
+
+def test_keys_change_with_prompt(storage):
+    assert FilterCache(storage, prompt="v1")._make_key("jetta") != FilterCache(storage, prompt="v2")._make_key("jetta")
+
+
+@pytest.mark.asyncio
+async def test_set_then_get_hits_local_tier(storage):
+    cache = FilterCache(storage, prompt="v1")
+
+    await cache.set("suv familiar", {"filter": []})
+    entry = await cache.get("SUV familiar")
+
+    assert entry == {"filters": {"filter": []}}
+    storage.get.assert_not_awaited()
+    assert storage.set.await_args.kwargs["ttl"] == cache.redis_ttl
+    assert cache.stats()["local_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_get_falls_back_to_redis(storage):
+    storage.get.return_value = {"filters": {"should": []}}
+    cache = FilterCache(storage, prompt="v1")
+
+    assert await cache.get("jetta") == {"filters": {"should": []}}
+    assert await cache.get("jetta") == {"filters": {"should": []}}
+    storage.get.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_invalid_answers_use_negative_ttl(storage):
+    cache = FilterCache(storage, prompt="v1", negative_ttl=5)
+
+    await cache.set_invalid("???")
+
+    assert await cache.get("???") == INVALID_ENTRY
+    assert storage.set.await_args.kwargs["ttl"] == 5
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_are_misses(storage):
+    storage.get.side_effect = ConnectionError("down")
+    cache = FilterCache(storage, prompt="v1")
+
+    assert await cache.get("jetta") is None
+    assert cache.stats()["misses"] == 1
@@ -0,0 +1,26 @@
+from unittest.mock import patch
+
+from app.services.cache.local_cache import LocalLRUCache
+
+
+def test_evicts_least_recently_used():
+    cache = LocalLRUCache(max_size=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    assert cache.get("a") == 1
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    assert len(cache) == 2
+
+
+def test_expires_entries_after_ttl():
+    cache = LocalLRUCache(ttl=10)
+    with patch("app.services.cache.local_cache.time.monotonic", return_value=100):
+        cache.set("a", 1)
+    with patch("app.services.cache.local_cache.time.monotonic", return_value=105):
+        assert cache.get("a") == 1
+    with patch("app.services.cache.local_cache.time.monotonic", return_value=111):
+        assert cache.get("a") is None
@@ -0,0 +1,57 @@
+import pytest
+from unittest.mock import AsyncMock
+
+from redis.exceptions import ConnectionError
+
+from app.services.cache.search_cache import CATALOG_VERSION_KEY, SearchResultCache
+
+
+@pytest.fixture
+def storage():
+    storage = AsyncMock()
+    storage.get.return_value = None
+    storage.increment.return_value = 1
+    return storage
+
+
+@pytest.mark.asyncio
+async def test_set_then_get_hits_local_tier(storage):
+    cache = SearchResultCache(storage)
+    parts = {"query": "jetta", "k": 5}
+
+    await cache.set(parts, [{"stock_id": 1}])
+
+    assert await cache.get(parts) == [{"stock_id": 1}]
+    assert await cache.get({"query": "jetta", "k": 3}) is None
+    assert cache.stats()["local_hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_bumping_the_catalog_version_invalidates_results(storage):
+    cache = SearchResultCache(storage, version_ttl=60)
+    parts = {"query": "jetta", "k": 5}
+    await cache.set(parts, [{"stock_id": 1}])
+
+    assert await cache.bump_catalog_version() == 1
+    storage.increment.assert_awaited_once_with(CATALOG_VERSION_KEY)
+    assert await cache.get(parts) is None
+
+
+@pytest.mark.asyncio
+async def test_catalog_version_is_reused_within_ttl(storage):
+    storage.get.return_value = 7
+    cache = SearchResultCache(storage, version_ttl=60)
+
+    assert await cache.catalog_version() == 7
+    assert await cache.catalog_version() == 7
+    storage.get.assert_awaited_once_with(CATALOG_VERSION_KEY)
+
+
+@pytest.mark.asyncio
+async def test_redis_errors_are_misses(storage):
+    storage.get.side_effect = ConnectionError("down")
+    storage.increment.side_effect = ConnectionError("down")
+    cache = SearchResultCache(storage)
+
+    assert await cache.get({"query": "jetta", "k": 5}) is None
+    assert await cache.bump_catalog_version() is None
@@ -0,0 +1,91 @@
+import numpy as np
+import pytest
+
+from app.services.finance.finance_engine import (
+    amortization_table,
+    asks_for_schedule,
+    monthly_payment,
+    parse_financing_terms,
+    payment_grid,
+    quote_vehicles,
+    yearly_schedule,
+)
+
+
+def test_monthly_payment_matches_the_annuity_formula():
+    r = 0.13 / 12
+    expected = 320000 * r / (1 - (1 + r) ** -36)
+
+    assert float(monthly_payment(320000, 0.13, 36)) == pytest.approx(expected)
+    assert float(monthly_payment(120000, 0.0, 24)) == pytest.approx(5000)
+
+
+def test_payment_grid_broadcasts_prices_down_payments_and_terms():
+    grid = payment_grid([400000, 250000], down_payments=[0.1, 0.2, 0.3], terms=[24, 36])
+
+    assert grid.shape == (2, 3, 2)
+    assert grid[0, 1, 1] == pytest.approx(float(monthly_payment(320000, 0.13, 36)))
+    assert (np.diff(grid, axis=1) < 0).all()
+    assert (np.diff(grid, axis=2) < 0).all()
+
+
+def test_amortization_table_pays_off_the_loan():
+    table = amortization_table(320000, 0.13, 36)
+
+    assert table.shape == (36, 5)
+    assert table[0, 2] == pytest.approx(320000 * 0.13 / 12)
+    assert table[:, 3].sum() == pytest.approx(320000)
+    assert table[-1, 4] == pytest.approx(0, abs=1e-6)
+
+
+def test_yearly_schedule_adds_up_each_year_of_the_table():
+    table = amortization_table(320000, 0.13, 30)
+    schedule = yearly_schedule(320000, 0.13, 30)
+
+    assert [row["year"] for row in schedule] == [1, 2, 3]
+    assert schedule[0]["interest"] == round(table[:12, 2].sum())
+    assert schedule[1]["balance"] == round(table[23, 4])
+    assert sum(row["principal"] for row in schedule) == pytest.approx(320000, abs=2)
+    assert schedule[-1]["balance"] == 0
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("¿Me pasas la tabla de amortización?", True),
+        ("quiero ver el calendario de pagos a 48 meses", True),
+        ("¿cuánto pagaría al mes?", False),
+    ],
+)
+def test_asks_for_schedule(text, expected):
+    assert asks_for_schedule(text) is expected
+
+
+def test_quote_vehicles_skips_vehicles_without_price():
+    quotes = quote_vehicles(
+        [{"price": 400000, "make": "Mazda", "model": "3"}, {"price": None}], terms=(24, 36)
+    )
+
+    assert len(quotes) == 1
+    assert quotes[0]["vehicle"] == {"make": "Mazda", "model": "3"}
+    assert quotes[0]["monthly_payment"] == 10782
+    assert quotes[0]["by_term"] == {24: 15213, 36: 10782}
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("¿Cuánto pagaría por un auto de $300,000 MXN?", {"price": 300000}),
+        ("a 48 meses con 30% de enganche", {"term_months": 48, "down_payment": 0.3}),
+        (
+            "enganche de 100 mil, auto de 450 mil, tasa del 11.5%",
+            {"down_payment_amount": 100000, "price": 450000, "annual_rate": 0.115},
+        ),
+        ("lo quiero a 3 años", {"term_months": 36}),
+        ("¿cuánto pago por un auto con 50 mil km?", {}),
+        ("auto de 280 mil con 45,000 kilómetros", {"price": 280000}),
+        ("¿me lo pueden financiar?", {}),
+    ],
+)
+def test_parse_financing_terms(text, expected):
+    assert parse_financing_terms(text) == pytest.approx(expected)
@@ -3,9 +3,40 @@ from unittest.mock import AsyncMock, patch
 from app.services.finance import finande_handler
 
 @pytest.mark.asyncio
-async def test_handle_financing_intent_generates_response():
+async def test_handle_financing_intent_quotes_locally_when_price_is_given():
     user_query = "¿Cuánto pagaría al mes por un auto de $300,000 MXN?"
-    fake_response = "Pagando un enganche del 20% y con un interés del 13%, tu mensualidad sería de aproximadamente $7,500 MXN."
+
+    with patch.object(finande_handler.llm, 'generate_response', new_callable=AsyncMock) as mock_generate:
+        result = await finande_handler.handle_financing_intent(user_query)
+
+        assert "$8,087 MXN" in result
+        assert "36 meses" in result
+        mock_generate.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_handle_financing_intent_renders_the_amortization_table_on_request():
+    user_query = "Tabla de amortización de un auto de 300 mil a 24 meses"
+
+    with patch.object(finande_handler.llm, 'generate_response', new_callable=AsyncMock) as mock_generate:
+        result = await finande_handler.handle_financing_intent(user_query)
+
+        assert "Amortización por año:" in result
+        assert "- Año 2:" in result
+        assert "saldo de $0 MXN" in result
+        mock_generate.assert_not_awaited()
+
+def test_quote_financing_adds_the_schedule_only_when_asked():
+    vehicles = [{"price": 400000}, {"price": 250000}]
+
+    assert "schedule" not in finande_handler.quote_financing("a 36 meses", vehicles)[0]
+    quotes = finande_handler.quote_financing("calendario de pagos a 36 meses", vehicles)
+    assert len(quotes[0]["schedule"]) == 3
+    assert "schedule" not in quotes[1]
+
+@pytest.mark.asyncio
+async def test_handle_financing_intent_generates_response():
+    user_query = "¿Puedo comprar un auto a crédito?"
+    fake_response = "Claro, ¿qué auto te interesa y cuál es su precio aproximado?"
 
     with patch.object(finande_handler.llm, 'generate_response', new_callable=AsyncMock) as mock_generate:
         mock_generate.return_value = fake_response
@@ -15,4 +46,25 @@ async def test_handle_financing_intent_generates_response():
         mock_generate.assert_awaited_once_with([
             {"role": "system", "content": finande_handler.FINANCE_PROMPT},
             {"role": "user", "content": user_query},
-        ])
\ No newline at end of file
+        ], task="finance")
+
+@pytest.mark.asyncio
+async def test_handle_financing_intent_lets_the_llm_explain_computed_quotes():
+    user_query = "auto de 300 mil a 48 meses"
+
+    with patch.object(finande_handler, "FINANCE_REPLY_MODE", "llm"), \
+         patch.object(finande_handler.llm, 'generate_response', new_callable=AsyncMock) as mock_generate:
+        mock_generate.return_value = "Pagarías unos $6,439 al mes."
+        await finande_handler.handle_financing_intent(user_query)
+
+    prompt = mock_generate.call_args.args[0][0]["content"]
+    assert '"monthly_payment": 6439' in prompt
+    assert '"term_months": 48' in prompt
+
+def test_quote_financing_spreads_a_peso_down_payment_over_each_price():
+    quotes = finande_handler.quote_financing(
+        "enganche de 100 mil", [{"price": 400000}, {"price": 250000}, {"price": None}]
+    )
+
+    assert [q["down_payment"] for q in quotes] == [0.25, 0.4]
+    assert [q["financed"] for q in quotes] == [300000, 150000]
@@ -0,0 +1,49 @@
+import pytest
+from unittest.mock import AsyncMock
+
+from app.services.ingestion.fingerprint_store import (
+    FINGERPRINTS_KEY,
+    FingerprintStore,
+    vehicle_fingerprint,
+)
+
+
+def test_vehicle_fingerprint_ignores_key_order():
+    assert vehicle_fingerprint({"a": 1, "b": "x"}) == vehicle_fingerprint({"b": "x", "a": 1})
+    assert vehicle_fingerprint({"a": 1}) != vehicle_fingerprint({"a": 2})
+
+
+@pytest.mark.asyncio
+async def test_split_changed_skips_records_with_same_fingerprint():
+    unchanged = {"stock_id": 1, "price": 100.0}
+    modified = {"stock_id": 2, "price": 200.0}
+    new = {"stock_id": 3, "price": 300.0}
+    storage = AsyncMock()
+    storage.get_hash_fields.return_value = [
+        vehicle_fingerprint(unchanged),
+        vehicle_fingerprint({"stock_id": 2, "price": 150.0}),
+        None,
+    ]
+
+    store = FingerprintStore(storage)
+    changed, fingerprints = await store.split_changed([unchanged, modified, new])
+
+    assert changed == [modified, new]
+    assert fingerprints == {
+        "2": vehicle_fingerprint(modified),
+        "3": vehicle_fingerprint(new),
+    }
+    storage.get_hash_fields.assert_awaited_once_with(FINGERPRINTS_KEY, ["1", "2", "3"])
+
+
+@pytest.mark.asyncio
+async def test_find_missing_and_remove():
+    storage = AsyncMock()
+    storage.get_hash_keys.return_value = ["1", "2", "3"]
+
+    store = FingerprintStore(storage)
+    missing = await store.find_missing([1, 3])
+    await store.remove(missing)
+
+    assert missing == [2]
+    storage.delete_hash_fields.assert_awaited_once_with(FINGERPRINTS_KEY, ["2"])
@@ -0,0 +1,115 @@
+import io
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.services.ingestion import ingestion_handler
+
+
+@pytest.fixture(autouse=True)
+def search_result_cache():
+    with patch.object(ingestion_handler, "search_result_cache", AsyncMock()) as cache:
+        yield cache
+
+CSV_HEADER = "stock_id,km,price,make,model,year,version,bluetooth,largo,ancho,altura,car_play\n"
+
+
+def make_row(stock_id: str = "1") -> dict:
+    return {
+        "stock_id": stock_id,
+        "km": "1000",
+        "price": "250000",
+        "make": "Mazda",
+        "model": "3",
+        "year": "2020",
+        "version": "i Touring",
+        "bluetooth": "Sí",
+        "largo": "4460",
+        "ancho": "1795",
+        "altura": "1450",
+        "car_play": "No",
+    }
+
+
+def test_parse_vehicle_row():
+    record = ingestion_handler.parse_vehicle_row(make_row())
+    assert record["stock_id"] == 1
+    assert record["price"] == 250000.0
+    assert record["bluetooth"] is True
+    assert record["car_play"] is False
+
+
+def test_parse_vehicle_row_rejects_invalid_data():
+    row = make_row()
+    row["year"] = "dos mil"
+    with pytest.raises(ValueError, match="Invalid data format"):
+        ingestion_handler.parse_vehicle_row(row)
+
+
+@pytest.mark.asyncio
+async def test_ingest_csv_runs_pipeline_and_prunes(search_result_cache):
+    content = CSV_HEADER + "7,1000,250000,Mazda,3,2020,i,Sí,1,1,1,No\n"
+    summary = {"processed": 1, "skipped": 0, "created": 1, "updated": 0, "unchanged": 0, "errors": 0}
+
+    with patch.object(ingestion_handler, "RelationalStorage"), \
+         patch.object(ingestion_handler, "SearchEngineStorage"), \
+         patch.object(ingestion_handler, "FingerprintStore"), \
+         patch.object(ingestion_handler, "IngestionPipeline") as mock_pipeline_class, \
+         patch.object(ingestion_handler, "prune_missing_vehicles", new_callable=AsyncMock) as mock_prune:
+
+        async def run(rows, parse_row, start_row=0):
+            for row in rows:
+                parse_row(row)
+            return dict(summary)
+
+        mock_pipeline_class.return_value.run = run
+        mock_prune.return_value = 3
+        result = await ingestion_handler.ingest_csv(io.BytesIO(content.encode("utf-8")), prune=True)
+
+    assert result == {**summary, "deleted": 3}
+    assert mock_prune.await_args.args[0] == {7}
+    search_result_cache.bump_catalog_version.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_ingest_csv_resumes_after_committed_rows():
+    content = CSV_HEADER + "7,1000,250000,Mazda,3,2020,i,Sí,1,1,1,No\n" + "8,1000,250000,Mazda,3,2020,i,Sí,1,1,1,No\n"
+    parsed = []
+
+    with patch.object(ingestion_handler, "RelationalStorage"), \
+         patch.object(ingestion_handler, "SearchEngineStorage"), \
+         patch.object(ingestion_handler, "FingerprintStore"), \
+         patch.object(ingestion_handler, "IngestionPipeline") as mock_pipeline_class, \
+         patch.object(ingestion_handler, "prune_missing_vehicles", new_callable=AsyncMock) as mock_prune:
+
+        async def run(rows, parse_row, start_row=0):
+            assert start_row == 1
+            for row in rows:
+                parsed.append(parse_row(row)["stock_id"])
+            return {}
+
+        mock_pipeline_class.return_value.run = run
+        mock_prune.return_value = 0
+        await ingestion_handler.ingest_csv(
+            io.BytesIO(content.encode("utf-8")), prune=True, start_row=1
+        )
+
+    assert parsed == [8]
+    assert mock_prune.await_args.args[0] == {7, 8}
+
+
+@pytest.mark.asyncio
+async def test_prune_missing_vehicles_deletes_everywhere():
+    relational_storage = AsyncMock()
+    search_engine_storage = AsyncMock()
+    fingerprint_store = AsyncMock()
+    fingerprint_store.find_missing.return_value = [4, 5]
+
+    deleted = await ingestion_handler.prune_missing_vehicles(
+        {1, 2}, relational_storage, search_engine_storage, fingerprint_store
+    )
+
+    assert deleted == 2
+    relational_storage.delete_many.assert_awaited_once_with([4, 5])
+    search_engine_storage.bulk_delete.assert_awaited_once_with([4, 5])
+    fingerprint_store.remove.assert_awaited_once_with([4, 5])
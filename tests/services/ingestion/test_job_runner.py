@@ -0,0 +1,146 @@
+import io
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.services.ingestion import job_runner
+
+
+@pytest.fixture
+def job_store():
+    store = AsyncMock()
+    with patch.object(job_runner, "job_store", store):
+        yield store
+
+
+@pytest.mark.asyncio
+async def test_submit_spools_upload_and_launches_job(job_store, tmp_path):
+    with patch.object(job_runner, "UPLOAD_DIR", str(tmp_path)), \
+         patch.object(job_runner, "_launch") as mock_launch:
+        job_id = await job_runner.submit_ingestion_job(io.BytesIO(b"a,b\n"), "cars.csv", False)
+
+    path = tmp_path / f"{job_id}.csv"
+    assert path.read_bytes() == b"a,b\n"
+    job_store.create.assert_awaited_once_with(job_id, "cars.csv", str(path), False)
+    mock_launch.assert_called_once_with(job_id)
+
+
+@pytest.mark.asyncio
+async def test_run_resumes_from_checkpoint(job_store, tmp_path):
+    path = tmp_path / "job1.csv"
+    path.write_bytes(b"a,b\n")
+    job_store.acquire_lease.return_value = True
+    job_store.get.return_value = {"path": str(path), "prune": 1, "checkpoint": 200}
+    job_store.rewind.return_value = {"rows_parsed": 200}
+    summary = {
+        "records_inserted": 5, "records_updated": 6, "deleted": 1, "created": 2, "updated": 3, "unchanged": 4
+    }
+
+    with patch.object(job_runner, "ingest_csv", new_callable=AsyncMock) as mock_ingest:
+        mock_ingest.return_value = summary
+        await job_runner.run_ingestion_job("job1")
+
+    kwargs = mock_ingest.await_args.kwargs
+    assert kwargs["start_row"] == 200
+    assert kwargs["prune"] is True
+    assert kwargs["progress"].committed == {"rows_parsed": 200}
+    assert job_store.finish.await_args.args == ("job1", "completed")
+    assert job_store.finish.await_args.kwargs["records_inserted"] == 5
+    assert job_store.finish.await_args.kwargs["records_updated"] == 6
+    assert not path.exists()
+    job_store.release_lease.assert_awaited_once_with("job1")
+
+
+@pytest.mark.asyncio
+async def test_run_marks_job_failed(job_store, tmp_path):
+    path = tmp_path / "job1.csv"
+    path.write_bytes(b"a,b\n")
+    job_store.acquire_lease.return_value = True
+    job_store.get.return_value = {"path": str(path), "prune": 0, "checkpoint": 0}
+
+    with patch.object(job_runner, "ingest_csv", new_callable=AsyncMock) as mock_ingest:
+        mock_ingest.side_effect = ValueError("Invalid data format: 'km'")
+        await job_runner.run_ingestion_job("job1")
+
+    job_store.finish.assert_awaited_once_with("job1", "failed", error="Invalid data format: 'km'")
+    job_store.release_lease.assert_awaited_once_with("job1")
+    mock_ingest.assert_awaited_once()
+    assert not path.exists()
+
+
+@pytest.mark.asyncio
+async def test_run_resumes_after_transient_error(job_store, tmp_path):
+    path = tmp_path / "job1.csv"
+    path.write_bytes(b"a,b\n")
+    job_store.acquire_lease.return_value = True
+    job_store.get.side_effect = [
+        {"path": str(path), "prune": 0, "checkpoint": 0},
+        {"path": str(path), "prune": 0, "checkpoint": 300},
+    ]
+    summary = {
+        "records_inserted": 1, "records_updated": 0, "deleted": 0, "created": 1, "updated": 0, "unchanged": 0
+    }
+
+    with patch.object(job_runner, "JOB_RETRY_BASE_DELAY", 0), \
+         patch.object(job_runner, "ingest_csv", new_callable=AsyncMock) as mock_ingest:
+        mock_ingest.side_effect = [ConnectionError("opensearch timeout"), summary]
+        await job_runner.run_ingestion_job("job1")
+
+    job_store.update.assert_any_await("job1", status="retrying", error="opensearch timeout")
+    assert mock_ingest.await_args.kwargs["start_row"] == 300
+    assert job_store.finish.await_args.args == ("job1", "completed")
+    assert job_store.release_lease.await_count == 2
+    assert not path.exists()
+
+
+@pytest.mark.asyncio
+async def test_run_fails_after_too_many_transient_errors(job_store, tmp_path):
+    path = tmp_path / "job1.csv"
+    path.write_bytes(b"a,b\n")
+    job_store.acquire_lease.return_value = True
+    job_store.get.return_value = {"path": str(path), "prune": 0, "checkpoint": 0}
+
+    with patch.object(job_runner, "JOB_MAX_ATTEMPTS", 2), \
+         patch.object(job_runner, "JOB_RETRY_BASE_DELAY", 0), \
+         patch.object(job_runner, "ingest_csv", new_callable=AsyncMock) as mock_ingest:
+        mock_ingest.side_effect = ConnectionError("opensearch down")
+        await job_runner.run_ingestion_job("job1")
+
+    assert mock_ingest.await_count == 2
+    job_store.finish.assert_awaited_once_with("job1", "failed", error="opensearch down")
+    assert not path.exists()
+
+
+@pytest.mark.asyncio
+async def test_run_skips_job_finished_by_another_worker(job_store):
+    job_store.acquire_lease.return_value = False
+    job_store.is_active.return_value = False
+
+    with patch.object(job_runner, "ingest_csv", new_callable=AsyncMock) as mock_ingest:
+        await job_runner.run_ingestion_job("job1")
+
+    mock_ingest.assert_not_awaited()
+    job_store.release_lease.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_resume_waits_for_stale_lease(job_store, tmp_path):
+    path = tmp_path / "job1.csv"
+    path.write_bytes(b"a,b\n")
+    job_store.list_active.return_value = ["job1"]
+    job_store.acquire_lease.side_effect = [False, False, True]
+    job_store.is_active.return_value = True
+    job_store.get.return_value = {"path": str(path), "prune": 0, "checkpoint": 100}
+    summary = {
+        "records_inserted": 1, "records_updated": 0, "deleted": 0, "created": 1, "updated": 0, "unchanged": 0
+    }
+
+    with patch.object(job_runner, "JOB_LEASE_SECONDS", 0), \
+         patch.object(job_runner, "ingest_csv", new_callable=AsyncMock) as mock_ingest:
+        mock_ingest.return_value = summary
+        await job_runner.resume_ingestion_jobs()
+        await job_runner._running_jobs["job1"]
+
+    assert job_store.acquire_lease.await_count == 3
+    assert mock_ingest.await_args.kwargs["start_row"] == 100
+    assert job_store.finish.await_args.args == ("job1", "completed")
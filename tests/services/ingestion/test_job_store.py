@@ -0,0 +1,90 @@
+import pytest
+from unittest.mock import AsyncMock
+
+from app.services.ingestion.job_store import IngestionJobStore, IngestionProgress
+
+
+@pytest.fixture
+def storage():
+    return AsyncMock()
+
+
+@pytest.mark.asyncio
+async def test_create_registers_active_job(storage):
+    store = IngestionJobStore(storage)
+
+    await store.create("job1", "cars.csv", "/tmp/job1.csv", True)
+
+    key, fields = storage.set_hash_fields.await_args.args
+    assert key == "job1"
+    assert fields["status"] == "queued"
+    assert fields["prune"] == 1
+    assert fields["rows_parsed"] == 0
+    storage.add_to_set.assert_awaited_once_with("active", "job1")
+
+
+@pytest.mark.asyncio
+async def test_get_returns_integer_counters(storage):
+    storage.get_hash.return_value = {"status": "running", "rows_parsed": "20", "checkpoint": "10", "prune": "0"}
+    store = IngestionJobStore(storage)
+
+    job = await store.get("job1")
+
+    assert job["rows_parsed"] == 20
+    assert job["checkpoint"] == 10
+    assert job["rows_indexed"] == 0
+
+
+@pytest.mark.asyncio
+async def test_get_unknown_job(storage):
+    storage.get_hash.return_value = {}
+    assert await IngestionJobStore(storage).get("missing") is None
+
+
+@pytest.mark.asyncio
+async def test_rewind_resets_counters_to_checkpoint(storage):
+    storage.get_hash.return_value = {"rows_parsed": "30", "committed_rows_parsed": "20"}
+    store = IngestionJobStore(storage)
+
+    committed = await store.rewind("job1")
+
+    assert committed["rows_parsed"] == 20
+    fields = storage.set_hash_fields.await_args.args[1]
+    assert fields["rows_parsed"] == 20
+    assert fields["errors"] == 0
+
+
+@pytest.mark.asyncio
+async def test_finish_removes_job_from_active_set(storage):
+    store = IngestionJobStore(storage)
+
+    await store.finish("job1", "failed", error="boom")
+
+    fields = storage.set_hash_fields.await_args.args[1]
+    assert fields["status"] == "failed"
+    assert fields["error"] == "boom"
+    storage.remove_from_set.assert_awaited_once_with("active", "job1")
+
+
+@pytest.mark.asyncio
+async def test_is_active_checks_active_set(storage):
+    storage.is_set_member.return_value = True
+    store = IngestionJobStore(storage)
+
+    assert await store.is_active("job1") is True
+    storage.is_set_member.assert_awaited_once_with("active", "job1")
+
+
+@pytest.mark.asyncio
+async def test_progress_checkpoint_adds_previous_run_counters():
+    job_store = AsyncMock()
+    progress = IngestionProgress(job_store, "job1", {"rows_parsed": 100})
+
+    await progress.advance("rows_parsed", 0)
+    await progress.advance("rows_parsed", 5)
+    await progress.checkpoint(105, {"rows_parsed": 5})
+
+    job_store.increment.assert_awaited_once_with("job1", "rows_parsed", 5)
+    fields = job_store.update.await_args.kwargs
+    assert fields["checkpoint"] == 105
+    assert fields["committed_rows_parsed"] == 105
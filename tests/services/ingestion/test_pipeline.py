@@ -0,0 +1,189 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.services.ingestion import pipeline as pipeline_module
+from app.services.ingestion.pipeline import IngestionPipeline
+
+
+def make_record(stock_id: int) -> dict:
+    return {
+        "stock_id": stock_id,
+        "km": 1000,
+        "price": 250000.0,
+        "make": "Mazda",
+        "model": "3",
+        "year": 2020,
+        "version": "i Touring",
+        "bluetooth": True,
+        "largo": 4460.0,
+        "ancho": 1795.0,
+        "altura": 1450.0,
+        "car_play": True,
+    }
+
+
+def index_result(documents, **overrides):
+    count = len(list(documents))
+    return {"created": count, "updated": 0, "unchanged": 0, "errors": [], **overrides}
+
+
+async def fake_bulk_upsert(records):
+    return {"inserted": len(records), "updated": 0}
+
+
+async def fake_get_embeddings(texts, priority=None):
+    return [[0.1] for _ in texts]
+
+
+@pytest.mark.asyncio
+async def test_run_streams_every_row_through_all_stages():
+    relational_storage = AsyncMock()
+    relational_storage.bulk_upsert.side_effect = fake_bulk_upsert
+    search_engine_storage = AsyncMock()
+    search_engine_storage.bulk_index_with_embedding.side_effect = index_result
+    rows = iter([{"id": str(i)} for i in range(25)])
+
+    with patch.object(pipeline_module, "get_embeddings", side_effect=fake_get_embeddings):
+        pipeline = IngestionPipeline(
+            relational_storage, search_engine_storage, batch_size=10, embed_workers=2
+        )
+        summary = await pipeline.run(rows, lambda row: make_record(int(row["id"])))
+
+    assert summary == {
+        "processed": 25,
+        "skipped": 0,
+        "records_inserted": 25,
+        "records_updated": 0,
+        "created": 25,
+        "updated": 0,
+        "unchanged": 0,
+        "errors": 0,
+    }
+    assert relational_storage.bulk_upsert.await_count == 3
+    assert search_engine_storage.bulk_index_with_embedding.await_count == 3
+
+
+@pytest.mark.asyncio
+async def test_run_overlaps_stages():
+    events = []
+    relational_storage = AsyncMock()
+
+    async def slow_embeddings(texts, priority=None):
+        events.append("embed")
+        await asyncio.sleep(0.01)
+        return [[0.1] for _ in texts]
+
+    async def bulk_upsert(records):
+        events.append("write")
+        return {"inserted": len(records), "updated": 0}
+
+    relational_storage.bulk_upsert.side_effect = bulk_upsert
+    search_engine_storage = AsyncMock()
+    search_engine_storage.bulk_index_with_embedding.side_effect = index_result
+    rows = iter([{"id": str(i)} for i in range(4)])
+
+    with patch.object(pipeline_module, "get_embeddings", side_effect=slow_embeddings):
+        pipeline = IngestionPipeline(
+            relational_storage, search_engine_storage, batch_size=1, embed_workers=1
+        )
+        await pipeline.run(rows, lambda row: make_record(int(row["id"])))
+
+    # The database keeps writing later batches while the first one is still embedding.
+    second_embed = events.index("embed", events.index("embed") + 1)
+    assert events[:second_embed].count("write") >= 3
+
+
+@pytest.mark.asyncio
+async def test_run_skips_unchanged_and_saves_fingerprints_of_indexed_records():
+    relational_storage = AsyncMock()
+    relational_storage.bulk_upsert.return_value = {"inserted": 1, "updated": 1}
+    search_engine_storage = AsyncMock()
+    search_engine_storage.bulk_index_with_embedding.return_value = {
+        "created": 0,
+        "updated": 1,
+        "unchanged": 0,
+        "errors": [{"update": {"_id": "3", "status": 400}}],
+    }
+    fingerprint_store = AsyncMock()
+    records = [make_record(1), make_record(2), make_record(3)]
+    fingerprint_store.split_changed.return_value = (records[1:], {"2": "fp2", "3": "fp3"})
+
+    with patch.object(pipeline_module, "get_embeddings", side_effect=fake_get_embeddings):
+        pipeline = IngestionPipeline(
+            relational_storage, search_engine_storage, fingerprint_store, batch_size=10
+        )
+        summary = await pipeline.run(iter(records), lambda row: row)
+
+    assert summary["skipped"] == 1
+    assert summary["records_inserted"] == 1
+    assert summary["records_updated"] == 1
+    assert summary["errors"] == 1
+    relational_storage.bulk_upsert.assert_awaited_once_with(records[1:])
+    fingerprint_store.save.assert_awaited_once_with({"2": "fp2"})
+
+
+@pytest.mark.asyncio
+async def test_run_reports_progress_and_checkpoints():
+    relational_storage = AsyncMock()
+    relational_storage.bulk_upsert.side_effect = fake_bulk_upsert
+    search_engine_storage = AsyncMock()
+    search_engine_storage.bulk_index_with_embedding.side_effect = index_result
+    progress = AsyncMock()
+    rows = iter([{"id": str(i)} for i in range(5)])
+
+    with patch.object(pipeline_module, "get_embeddings", side_effect=fake_get_embeddings):
+        pipeline = IngestionPipeline(
+            relational_storage, search_engine_storage, progress=progress, batch_size=2
+        )
+        await pipeline.run(rows, lambda row: make_record(int(row["id"])), start_row=10)
+
+    assert pipeline.checkpoint == 15
+    checkpoints = [call.args[0] for call in progress.checkpoint.await_args_list]
+    assert checkpoints == sorted(checkpoints)
+    assert checkpoints[-1] == 15
+    assert progress.checkpoint.await_args.args[1]["rows_indexed"] == 5
+    indexed = sum(
+        call.args[1] for call in progress.advance.await_args_list if call.args[0] == "rows_indexed"
+    )
+    assert indexed == 5
+
+
+@pytest.mark.asyncio
+async def test_run_does_not_checkpoint_past_unfinished_batches():
+    relational_storage = AsyncMock()
+    relational_storage.bulk_upsert.side_effect = fake_bulk_upsert
+    search_engine_storage = AsyncMock()
+    progress = AsyncMock()
+    calls = 0
+
+    async def bulk_index(documents):
+        nonlocal calls
+        calls += 1
+        if calls == 2:
+            raise RuntimeError("opensearch down")
+        return index_result(documents)
+
+    search_engine_storage.bulk_index_with_embedding.side_effect = bulk_index
+    rows = iter([{"id": str(i)} for i in range(6)])
+
+    with patch.object(pipeline_module, "get_embeddings", side_effect=fake_get_embeddings):
+        pipeline = IngestionPipeline(
+            relational_storage, search_engine_storage, progress=progress,
+            batch_size=2, embed_workers=1,
+        )
+        with pytest.raises(RuntimeError):
+            await pipeline.run(rows, lambda row: make_record(int(row["id"])))
+
+    assert pipeline.checkpoint == 2
+
+
+@pytest.mark.asyncio
+async def test_run_propagates_validation_errors():
+    def parse_row(row):
+        raise ValueError("Invalid data format: 'km'")
+
+    pipeline = IngestionPipeline(AsyncMock(), AsyncMock())
+    with pytest.raises(ValueError, match="Invalid data format"):
+        await pipeline.run(iter([{}]), parse_row)
@@ -0,0 +1,86 @@
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.services.intent import intent_classifier as module
+from app.services.intent.intent_classifier import IntentClassifier
+
+EXAMPLES = {
+    "exit": ["adiós", "gracias, bye"],
+    "search": ["busco un mazda", "quiero un jetta"],
+    "none": ["hola"],
+}
+
+EMBEDDINGS = {
+    "adiós": [1.0, 0.0, 0.0],
+    "gracias, bye": [0.9, 0.1, 0.0],
+    "busco un mazda": [0.0, 1.0, 0.0],
+    "quiero un jetta": [0.1, 0.9, 0.0],
+    "hola": [0.0, 0.0, 1.0],
+}
+
+
+async def fake_embeddings(texts, model=None):
+    return [EMBEDDINGS[text] for text in texts]
+
+
+@pytest.fixture
+def classifier():
+    return IntentClassifier(EXAMPLES, min_score=0.5, min_margin=0.2)
+
+
+def test_predict_many_scores_against_centroids(classifier):
+    classifier.fit({label: [EMBEDDINGS[t] for t in texts] for label, texts in EXAMPLES.items()})
+
+    predictions = classifier.predict_many([[0.0, 2.0, 0.0], [1.0, 0.8, 0.0]])
+
+    assert [p.intent for p in predictions] == ["search", "exit"]
+    assert predictions[0].score == pytest.approx(0.998, abs=1e-3)
+    assert predictions[0].margin > 0.8
+    assert 0 < predictions[1].margin < 0.2
+
+
+@pytest.mark.asyncio
+async def test_classify_returns_confident_local_intents(classifier):
+    with patch.object(module, "get_embeddings", side_effect=fake_embeddings) as mock_embeddings, \
+         patch.object(module, "get_embedding", new_callable=AsyncMock, return_value=[0.05, 1.0, 0.0]):
+        assert await classifier.classify("busco un versa") == "search"
+        assert await classifier.classify("busco un versa") == "search"
+
+    mock_embeddings.assert_called_once()
+    assert classifier.stats()["local"] == 2
+
+
+@pytest.mark.asyncio
+async def test_classify_falls_back_on_low_margin(classifier):
+    with patch.object(module, "get_embeddings", side_effect=fake_embeddings), \
+         patch.object(module, "get_embedding", new_callable=AsyncMock, return_value=[1.0, 1.0, 0.0]):
+        assert await classifier.classify("adiós, busco un auto") is None
+
+    assert classifier.stats()["low_confidence"] == 1
+
+
+@pytest.mark.asyncio
+async def test_classify_leaves_non_local_intents_to_the_llm(classifier):
+    with patch.object(module, "get_embeddings", side_effect=fake_embeddings), \
+         patch.object(module, "get_embedding", new_callable=AsyncMock, return_value=[0.0, 0.0, 1.0]):
+        assert await classifier.classify("hola") is None
+
+    assert classifier.stats()["not_local"] == 1
+
+
+@pytest.mark.asyncio
+async def test_classify_leaves_exit_to_the_llm(classifier):
+    with patch.object(module, "get_embeddings", side_effect=fake_embeddings), \
+         patch.object(module, "get_embedding", new_callable=AsyncMock, return_value=[1.0, 0.0, 0.0]):
+        assert await classifier.classify("adiós") is None
+
+    assert classifier.stats()["not_local"] == 1
+
+
+@pytest.mark.asyncio
+async def test_classify_falls_back_when_embedding_fails(classifier):
+    with patch.object(module, "get_embeddings", new_callable=AsyncMock, side_effect=RuntimeError("down")):
+        assert await classifier.classify("adiós") is None
+
+    assert classifier.stats()["errors"] == 1
+    assert classifier.centroids is None
@@ -0,0 +1,26 @@
+from unittest.mock import patch
+
+from app.services.llm.model_routing import TASK_INTENT, get_model_route
+
+
+def test_get_model_route_falls_back_to_defaults():
+    env = {"OPENAI_MODEL": "gpt-4o", "OPENAI_TEMPERATURE": "0.7"}
+    with patch.dict("os.environ", env, clear=True):
+        route = get_model_route(TASK_INTENT)
+
+    assert route.request_params() == {"model": "gpt-4o", "temperature": 0.7}
+
+
+def test_get_model_route_uses_task_overrides():
+    env = {
+        "OPENAI_MODEL": "gpt-4o",
+        "OPENAI_INTENT_MODEL": "gpt-4o-mini",
+        "OPENAI_INTENT_TEMPERATURE": "0",
+        "OPENAI_INTENT_MAX_TOKENS": "200",
+    }
+    with patch.dict("os.environ", env, clear=True):
+        route = get_model_route(TASK_INTENT)
+        default = get_model_route()
+
+    assert route.request_params() == {"model": "gpt-4o-mini", "temperature": 0.0, "max_tokens": 200}
+    assert default.model == "gpt-4o"
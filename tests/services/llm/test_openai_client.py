@@ -1,7 +1,28 @@
+import asyncio
+
 import pytest
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import openai
 
+from app.services.llm import openai_client
 from app.services.llm.openai_client import OpenAIClient
+from app.services.llm.rate_limiter import RateLimiter
+from app.services.llm.resilience import CircuitBreaker
+
+
+@pytest.fixture(autouse=True)
+def fresh_breaker():
+    breaker = CircuitBreaker("chat", failure_threshold=2, reset_timeout=60)
+    with patch.object(openai_client, "chat_breaker", breaker), \
+         patch.object(openai_client, "OPENAI_RETRY_BASE_DELAY", 0.001):
+        yield breaker
+
+
+def make_response(content):
+    response = MagicMock()
+    response.choices[0].message.content = content
+    return response
 
 @pytest.mark.asyncio
 async def test_generate_response_creates_client_and_returns_message():
@@ -34,6 +55,222 @@ async def test_generate_response_uses_existing_client():
     assert result == "Already here"
     mock_client.chat.completions.create.assert_called_once()
 
+@pytest.mark.asyncio
+async def test_generate_response_coalesces_identical_concurrent_requests():
+    async def create(**kwargs):
+        await asyncio.sleep(0.01)
+        response = MagicMock()
+        response.choices[0].message.content = "Hola"
+        return response
+
+    mock_client = AsyncMock()
+    mock_client.chat.completions.create.side_effect = create
+    client = OpenAIClient()
+    client.client = mock_client
+    messages = [{"role": "user", "content": "autos con carplay"}]
+
+    results = await asyncio.gather(*(client.generate_response(messages) for _ in range(3)))
+
+    assert results == ["Hola"] * 3
+    mock_client.chat.completions.create.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_generate_response_backs_off_on_rate_limit():
+    response = MagicMock(status_code=429, headers={"retry-after": "3"})
+    mock_client = AsyncMock()
+    mock_client.chat.completions.create.side_effect = openai.RateLimitError(
+        "rate limited", response=response, body=None
+    )
+    limiter = RateLimiter("chat", requests_per_minute=60, tokens_per_minute=10**5, max_concurrency=2)
+    client = OpenAIClient(fallback_response=None, max_retries=0)
+    client.client = mock_client
+
+    with patch.object(openai_client, "chat_limiter", limiter):
+        with pytest.raises(openai.RateLimitError):
+            await client.generate_response([{"role": "user", "content": "Hola"}])
+
+    stats = limiter.stats()
+    assert stats["rate_limited"] == 1
+    assert stats["scale"] == 0.5
+    assert stats["in_flight"] == 0
+
+@pytest.mark.asyncio
+async def test_generate_response_retries_transient_errors():
+    mock_client = AsyncMock()
+    mock_client.chat.completions.create.side_effect = [
+        openai.APIConnectionError(request=MagicMock()),
+        make_response("Hola"),
+    ]
+    client = OpenAIClient()
+    client.client = mock_client
+
+    result = await client.generate_response([{"role": "user", "content": "retry"}])
+
+    assert result == "Hola"
+    assert mock_client.chat.completions.create.await_count == 2
+
+@pytest.mark.asyncio
+async def test_generate_response_times_out_to_fallback():
+    async def slow(**kwargs):
+        await asyncio.sleep(1)
+
+    mock_client = AsyncMock()
+    mock_client.chat.completions.create.side_effect = slow
+    client = OpenAIClient(timeout=0.01, max_retries=0)
+    client.client = mock_client
+
+    result = await client.generate_response([{"role": "user", "content": "slow"}])
+
+    assert result == openai_client.FALLBACK_RESPONSE
+
+@pytest.mark.asyncio
+async def test_rate_limiter_wait_does_not_count_as_timeout(fresh_breaker):
+    limiter = RateLimiter("chat", requests_per_minute=600, tokens_per_minute=10**5, max_concurrency=1)
+    mock_client = AsyncMock()
+    mock_client.chat.completions.create.return_value = make_response("Hola")
+    client = OpenAIClient(timeout=0.05, max_retries=0)
+    client.client = mock_client
+
+    async def hold_slot():
+        async with limiter.limit(1):
+            await asyncio.sleep(0.1)
+
+    with patch.object(openai_client, "chat_limiter", limiter):
+        holder = asyncio.create_task(hold_slot())
+        await asyncio.sleep(0)
+        result = await client.generate_response([{"role": "user", "content": "queued"}])
+        await holder
+
+    assert result == "Hola"
+    assert fresh_breaker.stats()["failures"] == 0
+
+@pytest.mark.asyncio
+async def test_deadline_passed_in_queue_is_not_a_provider_failure(fresh_breaker):
+    limiter = RateLimiter("chat", requests_per_minute=600, tokens_per_minute=10**5, max_concurrency=1)
+    client = OpenAIClient(deadline=0.05)
+    client.client = AsyncMock()
+
+    async def hold_slot():
+        async with limiter.limit(1):
+            await asyncio.sleep(0.1)
+
+    with patch.object(openai_client, "chat_limiter", limiter):
+        holder = asyncio.create_task(hold_slot())
+        await asyncio.sleep(0)
+        result = await client.generate_response([{"role": "user", "content": "late"}])
+        await holder
+
+    assert result == openai_client.FALLBACK_RESPONSE
+    client.client.chat.completions.create.assert_not_awaited()
+    assert fresh_breaker.stats()["failures"] == 0
+
+@pytest.mark.asyncio
+async def test_open_breaker_fails_fast(fresh_breaker):
+    mock_client = AsyncMock()
+    mock_client.chat.completions.create.side_effect = openai.APIConnectionError(request=MagicMock())
+    client = OpenAIClient(max_retries=1)
+    client.client = mock_client
+
+    first = await client.generate_response([{"role": "user", "content": "down"}])
+    second = await client.generate_response([{"role": "user", "content": "still down"}])
+
+    assert first == second == openai_client.FALLBACK_RESPONSE
+    assert fresh_breaker.state == "open"
+    assert mock_client.chat.completions.create.await_count == 2
+
+@pytest.mark.asyncio
+async def test_generate_response_without_fallback_raises(fresh_breaker):
+    fresh_breaker.state = "open"
+    fresh_breaker._opened_at = float("inf")
+    client = OpenAIClient(fallback_response=None)
+    client.client = AsyncMock()
+
+    with pytest.raises(openai_client.CircuitOpenError):
+        await client.generate_response([{"role": "user", "content": "Hola"}])
+
+@pytest.mark.asyncio
+async def test_generate_response_uses_the_model_routed_to_the_task():
+    mock_client = AsyncMock()
+    mock_client.chat.completions.create.return_value = make_response("{}")
+    client = OpenAIClient()
+    client.client = mock_client
+    env = {"OPENAI_FILTERS_MODEL": "gpt-4o-mini", "OPENAI_FILTERS_TEMPERATURE": "0", "OPENAI_FILTERS_MAX_TOKENS": "150"}
+
+    with patch.dict("os.environ", env):
+        await client.generate_response([{"role": "user", "content": "mazda"}], task="filters")
+
+    kwargs = mock_client.chat.completions.create.call_args.kwargs
+    assert kwargs["model"] == "gpt-4o-mini"
+    assert kwargs["temperature"] == 0.0
+    assert kwargs["max_tokens"] == 150
+
+def make_stream(*texts, error=None):
+    async def stream():
+        for text in texts:
+            chunk = MagicMock()
+            chunk.choices[0].delta.content = text
+            yield chunk
+        if error is not None:
+            raise error
+
+    return stream()
+
+async def collect(chunks):
+    return [chunk async for chunk in chunks]
+
+@pytest.mark.asyncio
+async def test_stream_response_yields_tokens_as_they_arrive():
+    mock_client = AsyncMock()
+    mock_client.chat.completions.create.return_value = make_stream(" Hola", "", " mundo", None)
+    client = OpenAIClient()
+    client.client = mock_client
+
+    result = await collect(client.stream_response([{"role": "user", "content": "Hola"}]))
+
+    assert result == ["Hola", " mundo"]
+    assert mock_client.chat.completions.create.call_args.kwargs["stream"] is True
+
+@pytest.mark.asyncio
+async def test_stream_response_retries_before_first_token():
+    mock_client = AsyncMock()
+    mock_client.chat.completions.create.side_effect = [
+        openai.APIConnectionError(request=MagicMock()),
+        make_stream("Hola"),
+    ]
+    client = OpenAIClient()
+    client.client = mock_client
+
+    result = await collect(client.stream_response([{"role": "user", "content": "Hola"}]))
+
+    assert result == ["Hola"]
+    assert mock_client.chat.completions.create.await_count == 2
+
+@pytest.mark.asyncio
+async def test_stream_response_ends_early_when_interrupted():
+    mock_client = AsyncMock()
+    mock_client.chat.completions.create.return_value = make_stream(
+        "Hola", error=openai.APIConnectionError(request=MagicMock())
+    )
+    client = OpenAIClient()
+    client.client = mock_client
+
+    result = await collect(client.stream_response([{"role": "user", "content": "Hola"}]))
+
+    assert result == ["Hola"]
+    mock_client.chat.completions.create.assert_awaited_once()
+
+@pytest.mark.asyncio
+async def test_stream_response_uses_fallback_when_breaker_is_open(fresh_breaker):
+    fresh_breaker.state = "open"
+    fresh_breaker._opened_at = float("inf")
+    client = OpenAIClient()
+    client.client = AsyncMock()
+
+    result = await collect(client.stream_response([{"role": "user", "content": "Hola"}]))
+
+    assert result == [openai_client.FALLBACK_RESPONSE]
+    client.client.chat.completions.create.assert_not_awaited()
+
 @pytest.mark.asyncio
 async def test_interpret_returns_default_intent():
     client = OpenAIClient()
@@ -0,0 +1,114 @@
+import asyncio
+
+import pytest
+
+from app.services.llm.rate_limiter import (
+    PRIORITY_BULK,
+    PRIORITY_INTERACTIVE,
+    RateLimiter,
+    estimate_tokens,
+    parse_retry_after,
+)
+
+
+def test_estimate_tokens():
+    assert estimate_tokens("") == 1
+    assert estimate_tokens("a" * 400) == 100
+
+
+def test_parse_retry_after():
+    assert parse_retry_after({"retry-after": "2"}) == 2.0
+    assert parse_retry_after({"retry-after-ms": "250"}) == 0.25
+    assert parse_retry_after({"retry-after": "soon"}) is None
+    assert parse_retry_after(None) is None
+
+
+@pytest.mark.asyncio
+async def test_grants_immediately_within_budget():
+    limiter = RateLimiter("test", requests_per_minute=60, tokens_per_minute=1000, max_concurrency=2)
+
+    async with limiter.limit(100) as lease:
+        assert lease.tokens == 100
+        assert limiter.stats()["in_flight"] == 1
+
+    stats = limiter.stats()
+    assert stats["granted"] == 1
+    assert stats["in_flight"] == 0
+
+
+@pytest.mark.asyncio
+async def test_interactive_calls_jump_ahead_of_bulk():
+    limiter = RateLimiter("test", requests_per_minute=6000, tokens_per_minute=10**6, max_concurrency=1)
+    order = []
+    release = asyncio.Event()
+
+    async def call(name, priority):
+        async with limiter.limit(1, priority):
+            order.append(name)
+            if name == "first":
+                await release.wait()
+
+    first = asyncio.create_task(call("first", PRIORITY_BULK))
+    await asyncio.sleep(0)
+    bulk = asyncio.create_task(call("bulk", PRIORITY_BULK))
+    chat = asyncio.create_task(call("chat", PRIORITY_INTERACTIVE))
+    await asyncio.sleep(0)
+    release.set()
+    await asyncio.gather(first, bulk, chat)
+
+    assert order == ["first", "chat", "bulk"]
+
+
+@pytest.mark.asyncio
+async def test_waits_for_token_budget():
+    limiter = RateLimiter("test", requests_per_minute=6000, tokens_per_minute=6000, max_concurrency=10)
+    async with limiter.limit(6000):
+        pass
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    async with limiter.limit(10):
+        pass
+
+    # 10 tokens at 100 tokens per second.
+    assert loop.time() - started >= 0.09
+    assert limiter.stats()["wait_ms"]["interactive"]["max"] >= 90
+
+
+@pytest.mark.asyncio
+async def test_rate_limited_pauses_and_halves_the_rate():
+    limiter = RateLimiter("test", requests_per_minute=60000, tokens_per_minute=10**6, max_concurrency=10)
+    limiter.on_rate_limited(retry_after=0.05)
+
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    async with limiter.limit(1):
+        pass
+
+    assert loop.time() - started >= 0.05
+    assert limiter.stats()["scale"] == 0.5
+    assert limiter.stats()["rate_limited"] == 1
+    limiter.on_success()
+    assert limiter.stats()["scale"] == 0.55
+
+
+@pytest.mark.asyncio
+async def test_cancelled_waiter_does_not_leak_a_slot():
+    limiter = RateLimiter("test", requests_per_minute=6000, tokens_per_minute=10**6, max_concurrency=1)
+    release = asyncio.Event()
+
+    async def hold():
+        async with limiter.limit(1):
+            await release.wait()
+
+    holder = asyncio.create_task(hold())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(limiter.limit(1).__aenter__())
+    await asyncio.sleep(0)
+    waiter.cancel()
+    release.set()
+    await holder
+
+    async with limiter.limit(1):
+        pass
+    assert limiter.stats()["in_flight"] == 0
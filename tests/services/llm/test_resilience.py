@@ -0,0 +1,58 @@
+import pytest
+
+from app.services.llm.resilience import CircuitBreaker, LatencyHistogram, backoff_delay
+
+
+def test_backoff_delay_is_capped_and_jittered():
+    for attempt in range(1, 10):
+        delay = backoff_delay(attempt, base=0.5, cap=4)
+        assert 0 <= delay <= min(4, 0.5 * 2 ** (attempt - 1))
+
+
+def test_breaker_opens_after_consecutive_failures():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.allow()
+
+    breaker.record_failure()
+
+    assert breaker.state == "open"
+    assert not breaker.allow()
+    assert breaker.stats()["rejected"] == 1
+
+
+def test_breaker_probes_once_after_reset_timeout():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+
+    assert breaker.allow()
+    assert breaker.state == "half_open"
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed"
+
+
+def test_half_open_lets_a_single_probe_through():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+    breaker.record_failure()
+    breaker._opened_at -= 60
+
+    assert breaker.allow()
+    assert not breaker.allow()
+
+
+def test_latency_histogram():
+    histogram = LatencyHistogram(bounds_ms=(100, 1000))
+    for seconds in (0.05, 0.1, 0.5, 2):
+        histogram.observe(seconds)
+
+    assert histogram.stats() == {
+        "count": 4,
+        "avg_ms": 662.5,
+        "buckets": {"<=100": 2, "<=1000": 1, ">1000": 1},
+    }
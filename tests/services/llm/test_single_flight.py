@@ -0,0 +1,67 @@
+import asyncio
+
+import pytest
+
+from app.services.llm.single_flight import SingleFlight
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_calls_share_one_upstream_call():
+    flight = SingleFlight("test")
+    calls = 0
+
+    async def upstream():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return "answer"
+
+    results = await asyncio.gather(*(flight.do("key", upstream) for _ in range(5)))
+
+    assert results == ["answer"] * 5
+    assert calls == 1
+    assert flight.stats() == {"calls": 5, "coalesced": 4, "in_flight": 0}
+
+
+@pytest.mark.asyncio
+async def test_different_keys_and_later_calls_are_not_coalesced():
+    flight = SingleFlight("test")
+
+    async def upstream(value):
+        await asyncio.sleep(0)
+        return value
+
+    assert await asyncio.gather(flight.do("a", lambda: upstream(1)), flight.do("b", lambda: upstream(2))) == [1, 2]
+    assert await flight.do("a", lambda: upstream(3)) == 3
+    assert flight.stats()["coalesced"] == 0
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared():
+    flight = SingleFlight("test")
+
+    async def upstream():
+        await asyncio.sleep(0.01)
+        raise RuntimeError("boom")
+
+    results = await asyncio.gather(
+        flight.do("key", upstream), flight.do("key", upstream), return_exceptions=True
+    )
+
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight("test")
+
+    async def upstream():
+        await asyncio.sleep(0.02)
+        return "answer"
+
+    first = asyncio.create_task(flight.do("key", upstream))
+    second = asyncio.create_task(flight.do("key", upstream))
+    await asyncio.sleep(0)
+    first.cancel()
+
+    assert await second == "answer"
@@ -0,0 +1,217 @@
+import asyncio
+import json
+
+import pytest
+from unittest.mock import AsyncMock, call, patch
+
+from app.services.memory import closure_jobs as closure_module
+from app.services.memory.closure_jobs import ACTIVE_JOBS_KEY, ClosureJobQueue
+
+MESSAGES = [{"role": "user", "content": "adiós"}]
+
+
+def make_queue(**kwargs):
+    settings = {"max_attempts": 3, "retry_base_delay": 0, "retry_max_delay": 0, **kwargs}
+    queue = ClosureJobQueue(storage=AsyncMock(), **settings)
+    queue.storage.set_if_absent.return_value = True
+    return queue
+
+
+def stored_job(done="", attempts=0):
+    return {"status": "queued", "messages": json.dumps(MESSAGES), "done": done, "attempts": str(attempts)}
+
+
+@pytest.fixture
+def orchestrator():
+    instance = AsyncMock()
+    instance.write_long_term_memory.return_value = {}
+    with patch(
+        "app.services.memory.cognitive_orchestrator.CognitiveOrchestrator.from_defaults",
+        AsyncMock(return_value=instance),
+    ):
+        yield instance
+
+
+@pytest.mark.asyncio
+async def test_enqueue_stores_snapshot_and_launches():
+    queue = make_queue()
+    queue.storage.add_to_set.return_value = 1
+    queue.launch = lambda user_id: None
+
+    assert await queue.enqueue("user_1", MESSAGES) is True
+
+    queue.storage.add_to_set.assert_awaited_once_with(ACTIVE_JOBS_KEY, "user_1")
+    fields = queue.storage.set_hash_fields.await_args.args[1]
+    assert json.loads(fields["messages"]) == MESSAGES
+    assert fields["status"] == "queued"
+
+
+@pytest.mark.asyncio
+async def test_enqueue_leaves_pending_job_alone():
+    queue = make_queue()
+    queue.storage.add_to_set.return_value = 0
+
+    assert await queue.enqueue("user_1", MESSAGES) is False
+    queue.storage.set_hash_fields.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_run_writes_everything_then_releases_working_memory(orchestrator):
+    queue = make_queue()
+    queue.storage.get_hash.return_value = stored_job()
+
+    await queue.run("user_1")
+
+    orchestrator.write_long_term_memory.assert_awaited_once_with(
+        "user_1", MESSAGES, ["episodic", "summary", "facts"]
+    )
+    orchestrator.release_working_memory.assert_awaited_once_with("user_1", MESSAGES)
+    queue.storage.remove_from_set.assert_awaited_with(ACTIVE_JOBS_KEY, "user_1")
+    queue.storage.delete.assert_any_await("user_1:lease")
+    assert queue.counters["completed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_run_retries_only_failed_writes(orchestrator):
+    queue = make_queue()
+    queue.storage.get_hash.return_value = stored_job(done="episodic")
+    orchestrator.write_long_term_memory.side_effect = [{"facts": RuntimeError("llm down")}, {}]
+
+    await queue.run("user_1")
+
+    calls = orchestrator.write_long_term_memory.await_args_list
+    assert calls[0].args[2] == ["summary", "facts"]
+    assert calls[1].args[2] == ["facts"]
+    queue.storage.set_hash_fields.assert_any_await(
+        "user_1", {"done": "episodic,summary", "attempts": 1}
+    )
+    orchestrator.release_working_memory.assert_awaited_once()
+    assert queue.counters["retries"] == 1
+
+
+@pytest.mark.asyncio
+async def test_run_gives_up_and_keeps_working_memory(orchestrator):
+    queue = make_queue(max_attempts=2)
+    queue.storage.get_hash.return_value = stored_job()
+    orchestrator.write_long_term_memory.return_value = {"summary": RuntimeError("llm down")}
+
+    await queue.run("user_1")
+
+    assert orchestrator.write_long_term_memory.await_count == 2
+    orchestrator.release_working_memory.assert_not_awaited()
+    failed = queue.storage.set_hash_fields.await_args_list[-1].args[1]
+    assert failed["status"] == "failed"
+    queue.storage.remove_from_set.assert_awaited_with(ACTIVE_JOBS_KEY, "user_1")
+    assert queue.counters["failed"] == 1
+
+
+@pytest.mark.asyncio
+async def test_run_gives_up_and_tracks_user_again(orchestrator):
+    queue = make_queue(max_attempts=1)
+    queue.storage.get_hash.return_value = stored_job()
+    orchestrator.write_long_term_memory.return_value = {"facts": RuntimeError("llm down")}
+
+    await queue.run("user_1")
+
+    orchestrator.session_sweeper.touch.assert_awaited_once_with("user_1")
+
+
+@pytest.mark.asyncio
+async def test_run_retries_interrupted_attempt(orchestrator):
+    queue = make_queue()
+    queue.storage.get_hash.return_value = stored_job()
+    orchestrator.release_working_memory.side_effect = [ConnectionError("redis down"), None]
+
+    await queue.run("user_1")
+
+    assert orchestrator.release_working_memory.await_count == 2
+    assert queue.counters["interrupted"] == 1
+    assert queue.counters["completed"] == 1
+    assert queue.storage.delete.await_args_list.count(call("user_1:lease")) == 2
+
+
+@pytest.mark.asyncio
+async def test_run_fails_after_too_many_interruptions(orchestrator):
+    queue = make_queue(max_attempts=2)
+    queue.storage.get_hash.return_value = stored_job()
+    orchestrator.release_working_memory.side_effect = ConnectionError("redis down")
+
+    with patch("app.services.memory.session_sweeper.session_sweeper") as sweeper:
+        sweeper.touch = AsyncMock()
+        await queue.run("user_1")
+
+    assert orchestrator.release_working_memory.await_count == 2
+    failed = queue.storage.set_hash_fields.await_args_list[-1].args[1]
+    assert failed["status"] == "failed"
+    queue.storage.remove_from_set.assert_awaited_with(ACTIVE_JOBS_KEY, "user_1")
+    sweeper.touch.assert_awaited_once_with("user_1")
+
+
+@pytest.mark.asyncio
+async def test_run_fails_malformed_job_without_retrying(orchestrator):
+    queue = make_queue()
+    queue.storage.get_hash.return_value = {"status": "queued", "messages": "{not json", "done": ""}
+
+    with patch("app.services.memory.session_sweeper.session_sweeper") as sweeper:
+        sweeper.touch = AsyncMock()
+        await queue.run("user_1")
+
+    assert queue.storage.get_hash.await_count == 1
+    orchestrator.write_long_term_memory.assert_not_awaited()
+    failed = queue.storage.set_hash_fields.await_args_list[-1].args[1]
+    assert failed["status"] == "failed"
+    assert "JSONDecodeError" in failed["error"]
+    queue.storage.remove_from_set.assert_awaited_once_with(ACTIVE_JOBS_KEY, "user_1")
+    sweeper.touch.assert_awaited_once_with("user_1")
+    assert queue.counters["interrupted"] == 0
+
+
+@pytest.mark.asyncio
+async def test_run_waits_for_stale_lease(orchestrator):
+    queue = make_queue(lease_seconds=0)
+    queue.storage.set_if_absent.side_effect = [False, False, True]
+    queue.storage.is_set_member.return_value = True
+    queue.storage.get_hash.return_value = stored_job()
+
+    await queue.run("user_1")
+
+    assert queue.storage.set_if_absent.await_count == 3
+    orchestrator.release_working_memory.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_run_stops_waiting_once_job_finished_elsewhere(orchestrator):
+    queue = make_queue(lease_seconds=0)
+    queue.storage.set_if_absent.return_value = False
+    queue.storage.is_set_member.return_value = False
+
+    await queue.run("user_1")
+
+    queue.storage.get_hash.assert_not_awaited()
+    orchestrator.write_long_term_memory.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_resume_launches_active_jobs():
+    queue = make_queue()
+    queue.storage.get_set_members.return_value = ["u1", "u2"]
+    launched = []
+    queue.launch = launched.append
+
+    await queue.resume()
+
+    assert launched == ["u1", "u2"]
+
+
+@pytest.mark.asyncio
+async def test_launch_runs_one_job_per_user():
+    queue = make_queue()
+    queue.run = AsyncMock()
+
+    queue.launch("user_1")
+    queue.launch("user_1")
+    await closure_module._running_closures["user_1"]
+    await asyncio.sleep(0)
+
+    queue.run.assert_awaited_once_with("user_1")
+    assert closure_module._running_closures == {}
@@ -1,8 +1,10 @@
+import json
+
 import pytest
 import asyncio
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
-from app.services.memory.cognitive_orchestrator import CognitiveOrchestrator
+from app.services.memory.cognitive_orchestrator import EMPTY_REPLY, CognitiveOrchestrator
 
 
 @pytest.fixture
@@ -59,4 +61,239 @@ async def test_handle_exit_intention(orchestrator):
     assert result == "See you!"
     orchestrator.llm.generate_response.assert_awaited()
     orchestrator.working_memory.store_in_memory.assert_awaited()
-    orchestrator.episodic_memory.store_in_memory.assert_awaited()
\ No newline at end of file
+    orchestrator.episodic_memory.store_in_memory.assert_awaited()
+
+async def stream(*chunks):
+    for chunk in chunks:
+        yield chunk
+
+
+@pytest.mark.asyncio
+async def test_stream_incoming_message_streams_kavak_info(orchestrator):
+    orchestrator.llm.generate_response.return_value = '{"intention": "kavak_info", "response": ""}'
+    orchestrator.llm.stream_response = MagicMock(return_value=stream("Kavak ", "ofrece garantía"))
+    orchestrator.working_memory.retrieve_from_memory.return_value = [
+        {"role": "user", "content": "Hola"}
+    ]
+    orchestrator.fact_memory.retrieve_from_memory.return_value = ""
+    orchestrator.summary_memory.retrieve_from_memory.return_value = ""
+
+    chunks = [c async for c in orchestrator.stream_incoming_message("user_1", "¿Garantía?")]
+
+    assert chunks == ["Kavak ", "ofrece garantía"]
+    orchestrator.working_memory.store_in_memory.assert_awaited_with(
+        "user_1",
+        [
+            {"role": "user", "content": "¿Garantía?"},
+            {"role": "assistant", "content": "Kavak ofrece garantía"},
+        ],
+    )
+
+
+@pytest.mark.asyncio
+async def test_stream_incoming_message_yields_other_replies_whole(orchestrator):
+    orchestrator.llm.generate_response.return_value = '{"intention": "none", "response": ""}'
+    orchestrator.working_memory.retrieve_from_memory.return_value = [
+        {"role": "user", "content": "Hola"}
+    ]
+    orchestrator.fact_memory.retrieve_from_memory.return_value = ""
+    orchestrator.summary_memory.retrieve_from_memory.return_value = ""
+
+    chunks = [c async for c in orchestrator.stream_incoming_message("user_1", "...")]
+
+    assert chunks == [EMPTY_REPLY]
+
+
+@pytest.mark.asyncio
+async def test_local_intent_skips_the_intent_llm_call(orchestrator):
+    orchestrator.intent_classifier = AsyncMock()
+    orchestrator.intent_classifier.classify.return_value = "kavak_info"
+    orchestrator.working_memory.retrieve_from_memory.return_value = [
+        {"role": "user", "content": "Hola"}
+    ]
+    orchestrator.fact_memory.retrieve_from_memory.return_value = ""
+    orchestrator.summary_memory.retrieve_from_memory.return_value = ""
+    orchestrator.llm.generate_response.return_value = "Tenemos garantía de 3 meses."
+
+    result = await orchestrator.handle_incoming_message("user_1", "¿Qué garantía dan?")
+
+    assert result == "Tenemos garantía de 3 meses."
+    orchestrator.llm.generate_response.assert_awaited_once()
+    assert orchestrator.llm.generate_response.call_args.kwargs["task"] == "kavak_info"
+
+
+@pytest.mark.asyncio
+async def test_kavak_info_answers_from_the_answer_cache(orchestrator):
+    orchestrator.kavak_answer_cache = AsyncMock()
+    orchestrator.kavak_answer_cache.get.return_value = "Tenemos garantía de 3 meses."
+
+    result = await orchestrator._handle_kavak_info_intention("user_1", "¿Qué garantía dan?")
+
+    assert result == "Tenemos garantía de 3 meses."
+    orchestrator.llm.generate_response.assert_not_awaited()
+    orchestrator.working_memory.store_in_memory.assert_awaited()
+
+
+@pytest.mark.asyncio
+async def test_kavak_info_caches_new_answers_but_not_the_fallback(orchestrator):
+    orchestrator.kavak_answer_cache = AsyncMock()
+    orchestrator.kavak_answer_cache.get.return_value = None
+    orchestrator.llm.fallback_response = "Lo siento"
+
+    orchestrator.llm.generate_response.return_value = "Estamos en CDMX."
+    await orchestrator._handle_kavak_info_intention("user_1", "¿Dónde están?")
+    orchestrator.llm.generate_response.return_value = "Lo siento"
+    await orchestrator._handle_kavak_info_intention("user_1", "¿Dónde están?")
+
+    orchestrator.kavak_answer_cache.set.assert_awaited_once_with("¿Dónde están?", "Estamos en CDMX.")
+
+
+@pytest.mark.asyncio
+async def test_financing_quotes_the_last_search_results_without_the_llm(orchestrator):
+    results = [
+        {"make": "Mazda", "model": "3", "year": 2021, "price": 400000},
+        {"make": "Kia", "model": "Rio", "year": 2020, "price": 250000},
+    ]
+    orchestrator.working_memory.retrieve_from_memory.return_value = [
+        {"role": "user", "content": "Busco un sedán"},
+        {"role": "assistant", "content": f"<vehicle_results>{json.dumps(results)}</vehicle_results>"},
+    ]
+
+    result = await orchestrator._handle_financing_intention("user_1", "¿Y a 48 meses?", {})
+
+    assert "Mazda 3 2021" in result and "Kia Rio 2020" in result
+    assert "48 meses" in result
+    orchestrator.llm.generate_response.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_financing_without_a_price_asks_the_llm(orchestrator):
+    orchestrator.working_memory.retrieve_from_memory.return_value = []
+    orchestrator.llm.generate_response.return_value = "¿Qué auto te interesa?"
+
+    result = await orchestrator._handle_financing_intention("user_1", "¿Dan crédito?", {})
+
+    assert result == "¿Qué auto te interesa?"
+    orchestrator.llm.generate_response.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_handle_incoming_message_schedules_compaction(orchestrator):
+    orchestrator.compactor = MagicMock()
+    orchestrator.llm.generate_response.return_value = '{"intention": "none", "response": "Hola"}'
+    orchestrator.working_memory.retrieve_from_memory.return_value = []
+    orchestrator.fact_memory.retrieve_from_memory.return_value = ""
+    orchestrator.summary_memory.retrieve_from_memory.return_value = ""
+
+    await orchestrator.handle_incoming_message("user_1", "Hola")
+
+    orchestrator.compactor.schedule.assert_called_once_with("user_1")
+
+
+@pytest.mark.asyncio
+async def test_incoming_message_touches_session_and_closure_forgets_it(orchestrator):
+    orchestrator.session_sweeper = AsyncMock()
+    orchestrator.llm.generate_response.return_value = '{"intention": "none", "response": "Hola"}'
+    orchestrator.working_memory.retrieve_from_memory.return_value = []
+    orchestrator.fact_memory.retrieve_from_memory.return_value = ""
+    orchestrator.summary_memory.retrieve_from_memory.return_value = ""
+
+    await orchestrator.handle_incoming_message("user_1", "Hola")
+    orchestrator.session_sweeper.touch.assert_awaited_once_with("user_1")
+
+    await orchestrator.persist_conversation_closure("user_1")
+    orchestrator.session_sweeper.forget.assert_awaited_once_with("user_1")
+
+
+@pytest.mark.asyncio
+async def test_persist_conversation_closure_enqueues_job(orchestrator):
+    history = [{"role": "user", "content": "Adiós"}]
+    orchestrator.closure_jobs = AsyncMock()
+    orchestrator.closure_jobs.enqueue.return_value = True
+    orchestrator.working_memory.retrieve_from_memory.return_value = history
+
+    assert await orchestrator.persist_conversation_closure("user_1") is True
+
+    orchestrator.closure_jobs.enqueue.assert_awaited_once_with("user_1", history)
+    orchestrator.summary_memory.store_in_memory.assert_not_awaited()
+    orchestrator.working_memory.delete_from_memory.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_persist_conversation_closure_keeps_session_if_closure_pending(orchestrator):
+    orchestrator.closure_jobs = AsyncMock()
+    orchestrator.closure_jobs.enqueue.return_value = False
+    orchestrator.session_sweeper = AsyncMock()
+    orchestrator.working_memory.retrieve_from_memory.return_value = [{"role": "user", "content": "x"}]
+
+    assert await orchestrator.persist_conversation_closure("user_1") is False
+    orchestrator.session_sweeper.forget.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_persist_conversation_closure_inline_keeps_memory_on_failure(orchestrator):
+    orchestrator.working_memory.retrieve_from_memory.return_value = [{"role": "user", "content": "x"}]
+    orchestrator.fact_memory.store_in_memory.side_effect = RuntimeError("llm down")
+
+    with pytest.raises(RuntimeError):
+        await orchestrator.persist_conversation_closure("user_1")
+    orchestrator.working_memory.delete_from_memory.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_write_long_term_memory_runs_writes_concurrently(orchestrator):
+    started = []
+    release = asyncio.Event()
+
+    async def slow_write(user_id, data):
+        started.append(user_id)
+        await release.wait()
+
+    orchestrator.summary_memory.store_in_memory.side_effect = slow_write
+    orchestrator.fact_memory.store_in_memory.side_effect = slow_write
+    messages = [{"role": "user", "content": "hola"}, {"role": "assistant", "content": ""}]
+
+    task = asyncio.create_task(
+        orchestrator.write_long_term_memory("user_1", messages, ["episodic", "summary", "facts"])
+    )
+    for _ in range(3):
+        await asyncio.sleep(0)
+    assert len(started) == 2
+    release.set()
+
+    assert await task == {}
+    orchestrator.episodic_memory.store_in_memory.assert_awaited_once_with(
+        "user_1", [{"role": "user", "content": "hola"}]
+    )
+
+
+@pytest.mark.asyncio
+async def test_write_long_term_memory_reports_failed_steps(orchestrator):
+    error = RuntimeError("llm down")
+    orchestrator.summary_memory.store_in_memory.side_effect = error
+
+    errors = await orchestrator.write_long_term_memory(
+        "user_1", [{"role": "user", "content": "hola"}], ["summary", "facts"]
+    )
+
+    assert errors == {"summary": error}
+    orchestrator.episodic_memory.store_in_memory.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_release_working_memory_keeps_newer_messages(orchestrator):
+    closed = [{"role": "user", "content": "adiós"}]
+    newer = [{"role": "user", "content": "¿sigues ahí?"}]
+
+    orchestrator.working_memory.retrieve_from_memory.return_value = closed
+    await orchestrator.release_working_memory("user_1", closed)
+    orchestrator.working_memory.delete_from_memory.assert_awaited_once_with("user_1")
+
+    orchestrator.working_memory.retrieve_from_memory.return_value = closed + newer
+    await orchestrator.release_working_memory("user_1", closed)
+    orchestrator.working_memory.trim_oldest.assert_awaited_once_with("user_1", 1)
+
+    orchestrator.working_memory.retrieve_from_memory.return_value = newer
+    await orchestrator.release_working_memory("user_1", closed)
+    assert orchestrator.working_memory.delete_from_memory.await_count == 1
+    assert orchestrator.working_memory.trim_oldest.await_count == 1
@@ -0,0 +1,175 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.services.memory import compaction
+from app.services.memory.compaction import KeyedLocks, MemoryCompactor, conversation_locks
+
+
+def conversation(count):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"mensaje {i}"}
+        for i in range(count)
+    ]
+
+
+def make_compactor(**kwargs):
+    settings = {"max_messages": 6, "max_tokens": 10_000, "keep_messages": 2, **kwargs}
+    return MemoryCompactor(AsyncMock(), AsyncMock(), AsyncMock(), AsyncMock(), **settings)
+
+
+def test_needs_compaction_by_messages():
+    compactor = make_compactor()
+    assert not compactor.needs_compaction(conversation(6))
+    assert compactor.needs_compaction(conversation(7))
+
+
+def test_needs_compaction_by_tokens():
+    compactor = make_compactor(max_tokens=20)
+    long_messages = [{"role": "user", "content": "x" * 100}] * 3
+    assert compactor.needs_compaction(long_messages)
+    assert not compactor.needs_compaction(long_messages[:2])
+
+
+@pytest.mark.asyncio
+async def test_compact_folds_oldest_segment():
+    compactor = make_compactor()
+    messages = [{"role": "system", "content": "<context>hechos</context>"}] + conversation(7)
+    compactor.working_memory.retrieve_from_memory.return_value = messages
+
+    folded = await compactor.compact("user_1")
+
+    assert folded == 6
+    summarized = compactor.summary_memory.store_in_memory.await_args.args[1]
+    assert summarized == messages[1:6]
+    compactor.episodic_memory.store_in_memory.assert_awaited_once_with("user_1", messages[1:6])
+    compactor.working_memory.trim_oldest.assert_awaited_once_with("user_1", 6)
+
+
+@pytest.mark.asyncio
+async def test_compact_merges_facts_of_folded_messages_before_trimming():
+    compactor = make_compactor()
+    messages = [{"role": "user", "content": "vivo en Monterrey y tengo 300 mil"}] + conversation(6)
+    compactor.working_memory.retrieve_from_memory.return_value = messages
+    events = []
+    compactor.fact_memory.store_in_memory.side_effect = lambda *args: events.append("facts")
+    compactor.working_memory.trim_oldest.side_effect = lambda *args: events.append("trim")
+
+    await compactor.compact("user_1")
+
+    facts = compactor.fact_memory.store_in_memory.await_args.args[1]
+    assert facts[0]["content"] == "vivo en Monterrey y tengo 300 mil"
+    assert facts == messages[:5]
+    assert events == ["facts", "trim"]
+
+
+@pytest.mark.asyncio
+async def test_compact_keeps_messages_if_fact_merge_fails():
+    compactor = make_compactor()
+    compactor.working_memory.retrieve_from_memory.return_value = conversation(8)
+    compactor.fact_memory.store_in_memory.side_effect = RuntimeError("llm down")
+
+    with pytest.raises(RuntimeError):
+        await compactor.compact("user_1")
+
+    compactor.episodic_memory.store_in_memory.assert_not_awaited()
+    compactor.working_memory.trim_oldest.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_compact_summarizes_vehicle_results_as_stock_ids():
+    compactor = make_compactor(max_messages=2, keep_messages=1)
+    results = {"role": "assistant", "content": '<vehicle_results>[{"stock_id": 7}]</vehicle_results>'}
+    messages = [{"role": "user", "content": "busco auto"}, results, {"role": "user", "content": "gracias"}]
+    compactor.working_memory.retrieve_from_memory.return_value = messages
+
+    await compactor.compact("user_1")
+
+    summarized = compactor.summary_memory.store_in_memory.await_args.args[1]
+    assert summarized[1]["content"] == '<vehicle_results stock_ids="7"/>'
+    compactor.episodic_memory.store_in_memory.assert_awaited_once_with("user_1", messages[:2])
+
+
+@pytest.mark.asyncio
+async def test_compact_skips_short_conversations():
+    compactor = make_compactor()
+    compactor.working_memory.retrieve_from_memory.return_value = conversation(3)
+
+    assert await compactor.compact("user_1") == 0
+    compactor.summary_memory.store_in_memory.assert_not_awaited()
+    compactor.working_memory.trim_oldest.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_compact_does_not_trim_if_conversation_changed():
+    compactor = make_compactor()
+    compactor.working_memory.retrieve_from_memory.side_effect = [conversation(8), None]
+
+    assert await compactor.compact("user_1") == 0
+    compactor.summary_memory.store_in_memory.assert_awaited_once()
+    compactor.episodic_memory.store_in_memory.assert_not_awaited()
+    compactor.working_memory.trim_oldest.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_compact_waits_for_incoming_message():
+    compactor = make_compactor()
+    compactor.working_memory.retrieve_from_memory.return_value = conversation(8)
+    events = []
+
+    async with conversation_locks.hold("user_1"):
+        task = asyncio.create_task(compactor.compact("user_1"))
+        await asyncio.sleep(0)
+        events.append("message handled")
+        compactor.working_memory.retrieve_from_memory.assert_not_awaited()
+    await task
+    assert events == ["message handled"]
+    compactor.working_memory.trim_oldest.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_keyed_locks_are_dropped_when_released():
+    locks = KeyedLocks()
+    async with locks.hold("a"):
+        assert "a" in locks._locks
+    assert locks._locks == {}
+
+
+@pytest.mark.asyncio
+async def test_schedule_runs_once_per_user_and_logs_errors():
+    compactor = make_compactor()
+    compactor.working_memory.retrieve_from_memory.side_effect = RuntimeError("redis down")
+    errors = compaction.compaction_counters["errors"]
+
+    compactor.schedule("user_1")
+    compactor.schedule("user_1")
+    assert len(compaction._running_compactions) == 1
+    await compaction._running_compactions["user_1"]
+    await asyncio.sleep(0)
+
+    assert compaction._running_compactions == {}
+    assert compactor.working_memory.retrieve_from_memory.await_count == 1
+    assert compaction.compaction_counters["errors"] == errors + 1
+
+
+@pytest.mark.asyncio
+async def test_compact_skips_conversations_being_closed():
+    closure_jobs = AsyncMock()
+    closure_jobs.is_pending.return_value = True
+    compactor = make_compactor(closure_jobs=closure_jobs)
+    compactor.working_memory.retrieve_from_memory.return_value = conversation(8)
+
+    assert await compactor.compact("user_1") == 0
+    compactor.summary_memory.store_in_memory.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_compact_does_not_trim_if_closure_started_meanwhile():
+    closure_jobs = AsyncMock()
+    closure_jobs.is_pending.side_effect = [False, True]
+    compactor = make_compactor(closure_jobs=closure_jobs)
+    compactor.working_memory.retrieve_from_memory.return_value = conversation(8)
+
+    assert await compactor.compact("user_1") == 0
+    compactor.working_memory.trim_oldest.assert_not_awaited()
@@ -0,0 +1,100 @@
+import json
+
+import pytest
+from unittest.mock import MagicMock, patch
+
+from app.services.memory import context_builder
+from app.services.memory.context_builder import (
+    build_history,
+    compact_vehicle_results,
+    count_tokens,
+)
+
+
+def vehicle_results(*stock_ids):
+    results = [{"stock_id": stock_id, "make": "Toyota", "model": "Corolla"} for stock_id in stock_ids]
+    return {"role": "assistant", "content": f"<vehicle_results>{json.dumps(results)}</vehicle_results>"}
+
+
+def turn(user, assistant):
+    return [{"role": "user", "content": user}, {"role": "assistant", "content": assistant}]
+
+
+def test_compact_vehicle_results_keeps_stock_ids():
+    content = vehicle_results(101, 202)["content"]
+    assert compact_vehicle_results(content) == '<vehicle_results stock_ids="101,202"/>'
+
+
+def test_compact_vehicle_results_leaves_other_content():
+    assert compact_vehicle_results("hola") == "hola"
+    assert compact_vehicle_results("<vehicle_results>no json</vehicle_results>") == (
+        "<vehicle_results>no json</vehicle_results>"
+    )
+
+
+def test_count_tokens_caches_counts():
+    count_tokens.cache_clear()
+    with patch.object(context_builder, "estimate_tokens", return_value=7) as estimate, \
+         patch.object(context_builder, "_encoding", return_value=None):
+        assert count_tokens("un mensaje") == 7
+        assert count_tokens("un mensaje") == 7
+    estimate.assert_called_once_with("un mensaje")
+    count_tokens.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_load_tokenizer_replaces_cached_estimates():
+    encoding = MagicMock()
+    encoding.encode.return_value = [1, 2]
+    fake_tiktoken = MagicMock()
+    fake_tiktoken.get_encoding.return_value = encoding
+    count_tokens.cache_clear()
+    with patch.object(context_builder, "tiktoken", fake_tiktoken), \
+         patch.object(context_builder, "_tokenizer", None), \
+         patch.object(context_builder, "estimate_tokens", return_value=7):
+        assert count_tokens("un mensaje") == 7
+        assert await context_builder.load_tokenizer() is True
+        assert count_tokens("un mensaje") == 2
+    fake_tiktoken.get_encoding.assert_called_once_with(context_builder.HISTORY_TOKENIZER)
+    count_tokens.cache_clear()
+
+
+@pytest.mark.asyncio
+async def test_load_tokenizer_keeps_estimating_when_unavailable():
+    fake_tiktoken = MagicMock()
+    fake_tiktoken.get_encoding.side_effect = OSError("no network")
+    with patch.object(context_builder, "tiktoken", fake_tiktoken), \
+         patch.object(context_builder, "_tokenizer", None):
+        assert await context_builder.load_tokenizer() is False
+        assert context_builder._encoding() is None
+
+
+def test_build_history_formats_messages_within_budget():
+    messages = turn("hola", "¿en qué te ayudo?")
+    assert build_history(messages, token_budget=1000) == (
+        "<user>hola</user>\n<assistant>¿en qué te ayudo?</assistant>"
+    )
+
+
+def test_build_history_drops_oldest_messages_over_budget():
+    messages = turn("a" * 400, "b" * 400) + turn("c" * 40, "d" * 40)
+    history = build_history(messages, token_budget=60)
+    assert history == f"<user>{'c' * 40}</user>\n<assistant>{'d' * 40}</assistant>"
+
+
+def test_build_history_collapses_older_vehicle_results():
+    messages = (
+        [{"role": "user", "content": "busco un corolla"}, vehicle_results(1, 2)]
+        + [{"role": "user", "content": "y un civic"}, vehicle_results(3)]
+        + turn("gracias", "de nada")
+    )
+    history = build_history(messages, token_budget=10_000, verbatim_turns=2)
+    lines = history.split("\n")
+    assert lines[1] == '<assistant><vehicle_results stock_ids="1,2"/></assistant>'
+    assert lines[3].startswith('<assistant><vehicle_results>[{"stock_id": 3')
+
+
+def test_build_history_collapses_recent_results_that_do_not_fit():
+    messages = [{"role": "user", "content": "busco un corolla"}, vehicle_results(*range(50))]
+    history = build_history(messages, token_budget=150, verbatim_turns=2)
+    assert history.startswith("<user>busco un corolla</user>\n<assistant><vehicle_results stock_ids=")
@@ -0,0 +1,125 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.services.memory.compaction import conversation_locks
+from app.services.memory.session_sweeper import LAST_ACTIVITY_KEY, IdleSessionSweeper
+
+
+def make_sweeper(**kwargs):
+    settings = {"idle_seconds": 600, "batch_size": 2, "concurrency": 2, **kwargs}
+    return IdleSessionSweeper(storage=AsyncMock(), **settings)
+
+
+@pytest.fixture
+def orchestrator():
+    instance = AsyncMock()
+    instance.persist_conversation_closure.return_value = True
+    with patch(
+        "app.services.memory.cognitive_orchestrator.CognitiveOrchestrator.from_defaults",
+        AsyncMock(return_value=instance),
+    ):
+        yield instance
+
+
+@pytest.mark.asyncio
+async def test_touch_records_last_activity():
+    sweeper = make_sweeper()
+    with patch("app.services.memory.session_sweeper.time.time", return_value=1000.0):
+        await sweeper.touch("user_1")
+    sweeper.storage.add_to_sorted_set.assert_awaited_once_with(LAST_ACTIVITY_KEY, {"user_1": 1000.0})
+
+
+@pytest.mark.asyncio
+async def test_sweep_closes_idle_conversations_in_batches(orchestrator):
+    sweeper = make_sweeper()
+    sweeper.storage.get_sorted_set_range_by_score.side_effect = [["u1", "u2"], ["u3"]]
+    sweeper.storage.get_sorted_set_score.return_value = 0.0
+
+    with patch("app.services.memory.session_sweeper.time.time", return_value=1000.0):
+        closed = await sweeper.sweep()
+
+    assert closed == 3
+    assert [c.args[0] for c in orchestrator.persist_conversation_closure.await_args_list] == ["u1", "u2", "u3"]
+    sweeper.storage.get_sorted_set_range_by_score.assert_any_await(
+        LAST_ACTIVITY_KEY, "-inf", 400.0, offset=0, count=2
+    )
+    sweeper.storage.remove_from_sorted_set.assert_any_await(LAST_ACTIVITY_KEY, "u3")
+
+
+@pytest.mark.asyncio
+async def test_sweep_skips_users_active_again(orchestrator):
+    sweeper = make_sweeper()
+    sweeper.storage.get_sorted_set_range_by_score.return_value = ["u1"]
+    sweeper.storage.get_sorted_set_score.return_value = 999.0
+
+    with patch("app.services.memory.session_sweeper.time.time", return_value=1000.0):
+        assert await sweeper.sweep() == 0
+
+    orchestrator.persist_conversation_closure.assert_not_awaited()
+    assert sweeper.counters["skipped"] == 1
+
+
+@pytest.mark.asyncio
+async def test_sweep_moves_past_failed_closures(orchestrator):
+    sweeper = make_sweeper()
+    sweeper.storage.get_sorted_set_range_by_score.side_effect = [["u1", "u2"], ["u3"]]
+    sweeper.storage.get_sorted_set_score.return_value = 0.0
+    orchestrator.persist_conversation_closure.side_effect = [RuntimeError("llm down"), True, True]
+
+    assert await sweeper.sweep() == 2
+
+    second_batch = sweeper.storage.get_sorted_set_range_by_score.await_args_list[1]
+    assert second_batch.kwargs["offset"] == 1
+    assert sweeper.counters["errors"] == 1
+    sweeper.storage.remove_from_sorted_set.assert_any_await(LAST_ACTIVITY_KEY, "u2")
+
+
+@pytest.mark.asyncio
+async def test_sweep_waits_for_message_in_progress(orchestrator):
+    sweeper = make_sweeper()
+    sweeper.storage.get_sorted_set_range_by_score.return_value = ["u1"]
+    sweeper.storage.get_sorted_set_score.return_value = 0.0
+
+    async with conversation_locks.hold("u1"):
+        task = asyncio.create_task(sweeper.sweep())
+        for _ in range(5):
+            await asyncio.sleep(0)
+        orchestrator.persist_conversation_closure.assert_not_awaited()
+    await task
+    orchestrator.persist_conversation_closure.assert_awaited_once_with("u1")
+
+
+@pytest.mark.asyncio
+async def test_sweep_limits_concurrency(orchestrator):
+    sweeper = make_sweeper(batch_size=10, concurrency=2)
+    sweeper.storage.get_sorted_set_range_by_score.return_value = [f"u{i}" for i in range(6)]
+    sweeper.storage.get_sorted_set_score.return_value = 0.0
+    running, peak = 0, 0
+
+    async def close(user_id):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0)
+        running -= 1
+        return True
+
+    orchestrator.persist_conversation_closure.side_effect = close
+    assert await sweeper.sweep() == 6
+    assert peak == 2
+
+
+@pytest.mark.asyncio
+async def test_sweep_retouches_users_with_pending_closure(orchestrator):
+    sweeper = make_sweeper()
+    sweeper.storage.get_sorted_set_range_by_score.return_value = ["u1"]
+    sweeper.storage.get_sorted_set_score.return_value = 0.0
+    orchestrator.persist_conversation_closure.return_value = False
+
+    with patch("app.services.memory.session_sweeper.time.time", return_value=1000.0):
+        assert await sweeper.sweep() == 0
+
+    sweeper.storage.add_to_sorted_set.assert_awaited_once_with(LAST_ACTIVITY_KEY, {"u1": 1000.0})
+    sweeper.storage.remove_from_sorted_set.assert_not_awaited()
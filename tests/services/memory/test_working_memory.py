@@ -1,24 +1,42 @@
 import pytest
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock
+from redis.exceptions import ResponseError
 from app.services.memory.working_memory import WorkingMemory
 
+WRONGTYPE = ResponseError("WRONGTYPE Operation against a key holding the wrong kind of value")
 
-@pytest.mark.asyncio
-async def test_store_in_memory_appends_to_existing_list():
-    memory = WorkingMemory()
+
+def make_memory(max_messages=200):
+    memory = WorkingMemory(max_messages=max_messages)
     memory.storage = AsyncMock()
-    memory.storage.get.return_value = ["existing"]
-    await memory.store_in_memory("test_key", ["new_item"])
-    memory.storage.set.assert_awaited_with("test_key", ["existing", "new_item"])
+    return memory
 
 
 @pytest.mark.asyncio
-async def test_store_in_memory_appends_list():
-    memory = WorkingMemory()
-    memory.storage = AsyncMock()
-    memory.storage.get.return_value = ["existing"]
+async def test_store_in_memory_pushes_each_message():
+    memory = make_memory()
     await memory.store_in_memory("test_key", ["new1", "new2"])
-    memory.storage.set.assert_awaited_with("test_key", ["existing", "new1", "new2"])
+    memory.storage.push_to_list.assert_awaited_once_with(
+        "test_key", ["new1", "new2"], max_length=200
+    )
+    memory.storage.get.assert_not_awaited()
+    memory.storage.set.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_store_in_memory_wraps_single_item():
+    memory = make_memory(max_messages=0)
+    await memory.store_in_memory("test_key", {"role": "user", "content": "hola"})
+    memory.storage.push_to_list.assert_awaited_once_with(
+        "test_key", [{"role": "user", "content": "hola"}], max_length=0
+    )
+
+
+@pytest.mark.asyncio
+async def test_store_in_memory_ignores_empty_list():
+    memory = make_memory()
+    await memory.store_in_memory("test_key", [])
+    memory.storage.push_to_list.assert_not_awaited()
 
 
 @pytest.mark.asyncio
@@ -29,35 +47,75 @@ async def test_store_in_memory_raises_error_on_string():
 
 
 @pytest.mark.asyncio
-async def test_retrieve_from_memory_returns_deserialized_json():
-    memory = WorkingMemory()
-    memory.storage = AsyncMock()
-    memory.storage.get.return_value = '{"a": 1}'
-    result = await memory.retrieve_from_memory("test_key")
-    assert result == {"a": 1}
+async def test_store_in_memory_converts_legacy_key_and_retries():
+    memory = make_memory()
+    memory.storage.push_to_list.side_effect = [WRONGTYPE, 3]
+    await memory.store_in_memory("test_key", ["new"])
+    memory.storage.convert_to_list.assert_awaited_once_with("test_key")
+    assert memory.storage.push_to_list.await_count == 2
 
 
 @pytest.mark.asyncio
-async def test_retrieve_from_memory_returns_list_directly():
-    memory = WorkingMemory()
-    memory.storage = AsyncMock()
-    memory.storage.get.return_value = [1, 2, 3]
+async def test_store_in_memory_reraises_other_errors():
+    memory = make_memory()
+    memory.storage.push_to_list.side_effect = ResponseError("OOM command not allowed")
+    with pytest.raises(ResponseError):
+        await memory.store_in_memory("test_key", ["new"])
+    memory.storage.convert_to_list.assert_not_awaited()
+
+
+@pytest.mark.asyncio
+async def test_retrieve_from_memory_returns_whole_list():
+    memory = make_memory()
+    memory.storage.get_list_range.return_value = [1, 2, 3]
     result = await memory.retrieve_from_memory("test_key")
     assert result == [1, 2, 3]
+    memory.storage.get_list_range.assert_awaited_once_with("test_key", 0, -1)
+
+
+@pytest.mark.asyncio
+async def test_retrieve_from_memory_reads_window():
+    memory = make_memory()
+    memory.storage.get_list_range.return_value = [2, 3]
+    result = await memory.retrieve_from_memory("test_key", last=2)
+    assert result == [2, 3]
+    memory.storage.get_list_range.assert_awaited_once_with("test_key", -2, -1)
 
 
 @pytest.mark.asyncio
 async def test_retrieve_from_memory_returns_none():
-    memory = WorkingMemory()
-    memory.storage = AsyncMock()
-    memory.storage.get.return_value = None
+    memory = make_memory()
+    memory.storage.get_list_range.return_value = []
     result = await memory.retrieve_from_memory("test_key")
     assert result is None
 
 
+@pytest.mark.asyncio
+async def test_retrieve_from_memory_converts_legacy_key():
+    memory = make_memory()
+    memory.storage.get_list_range.side_effect = [WRONGTYPE, [{"a": 1}]]
+    result = await memory.retrieve_from_memory("test_key")
+    assert result == [{"a": 1}]
+    memory.storage.convert_to_list.assert_awaited_once_with("test_key")
+
+
 @pytest.mark.asyncio
 async def test_delete_from_memory():
-    memory = WorkingMemory()
-    memory.storage = AsyncMock()
+    memory = make_memory()
     await memory.delete_from_memory("test_key")
-    memory.storage.delete.assert_awaited_with("test_key")
\ No newline at end of file
+    memory.storage.delete.assert_awaited_with("test_key")
+
+
+@pytest.mark.asyncio
+async def test_convert_legacy_keys_counts_converted():
+    memory = make_memory()
+    memory.storage.scan_keys.return_value = ["u1", "u2", "u3"]
+    memory.storage.convert_to_list.side_effect = [True, False, True]
+    assert await memory.convert_legacy_keys() == 2
+
+
+@pytest.mark.asyncio
+async def test_trim_oldest_keeps_newest_messages():
+    memory = make_memory()
+    await memory.trim_oldest("test_key", 4)
+    memory.storage.trim_list.assert_awaited_once_with("test_key", 4, -1)
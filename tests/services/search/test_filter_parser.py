@@ -0,0 +1,79 @@
+import pytest
+
+from app.services.search.filter_parser import RuleBasedFilterParser
+
+CATALOG = [
+    ("Mazda", "3"),
+    ("Mazda", "CX-3"),
+    ("Mazda", "CX-30"),
+    ("Volkswagen", "Jetta"),
+    ("Mercedes-Benz", "Clase A"),
+]
+
+
+@pytest.fixture
+def parser():
+    return RuleBasedFilterParser(CATALOG)
+
+
+def test_parses_prompt_example(parser):
+    assert parser.parse("Mazda con Car Play y menos de 400 mil") == {
+        "should": [{"match": {"metadata.make": "Mazda"}}],
+        "minimum_should_match": 1,
+        "filter": [
+            {"term": {"metadata.car_play": True}},
+            {"range": {"metadata.price": {"lte": 400000}}},
+        ],
+    }
+
+
+def test_numeric_model_needs_its_make(parser):
+    assert parser.parse("mazda 3")["should"] == [
+        {"match": {"metadata.make": "Mazda"}},
+        {"match": {"metadata.model": "3"}},
+    ]
+
+
+def test_longest_model_wins(parser):
+    assert parser.parse("cx-30")["should"] == [{"match": {"metadata.model": "CX-30"}}]
+
+
+@pytest.mark.parametrize(
+    "query, field, bounds",
+    [
+        ("menos de 50 mil km", "km", {"lte": 50000}),
+        ("kilometraje menor a 30,000", "km", {"lte": 30000}),
+        ("precio maximo $350,000", "price", {"lte": 350000}),
+        ("entre 250 y 300 mil", "price", {"gte": 250000, "lte": 300000}),
+        ("mas de 1.5 millones", "price", {"gte": 1500000}),
+        ("2018 en adelante", "year", {"gte": 2018}),
+        ("desde 2019 hasta 2021", "year", {"gte": 2019, "lte": 2021}),
+        ("del 2020", "year", {"gte": 2020, "lte": 2020}),
+        ("autos de 2015 a 2018", "year", {"gte": 2015, "lte": 2018}),
+        ("2015 a 2018", "year", {"gte": 2015, "lte": 2018}),
+        ("del 2016 al 2019", "year", {"gte": 2016, "lte": 2019}),
+    ],
+)
+def test_ranges(parser, query, field, bounds):
+    assert parser.parse(query)["filter"] == [{"range": {f"metadata.{field}": bounds}}]
+
+
+def test_negated_flag(parser):
+    assert parser.parse("busco un auto sin bluetooth") == {
+        "filter": [{"term": {"metadata.bluetooth": False}}]
+    }
+
+
+@pytest.mark.parametrize(
+    "query",
+    [
+        "suv familiar barata",
+        "mazda o jetta",
+        "mercedes benz jetta",
+        "menos de 400",
+        "mazda 2019 2021",
+        "2017 desde 2019",
+    ],
+)
+def test_returns_none_when_not_confident(parser, query):
+    assert parser.parse(query) is None
@@ -0,0 +1,142 @@
+import asyncio
+
+import pytest
+from unittest.mock import AsyncMock, patch
+
+from app.services.cache.filter_cache import INVALID_ENTRY, FilterCache
+from app.services.cache.search_cache import SearchResultCache
+from app.services.llm.resilience import CircuitOpenError
+from app.services.search import search_handler
+from app.services.search.filter_parser import RuleBasedFilterParser
+from app.utils.timing import StageTimer
+
+
+@pytest.fixture(autouse=True)
+def empty_filter_cache():
+    storage = AsyncMock()
+    storage.get.return_value = None
+    cache = FilterCache(storage)
+    with patch.object(search_handler, "filter_cache", cache):
+        yield cache
+
+
+@pytest.fixture(autouse=True)
+def empty_search_cache():
+    storage = AsyncMock()
+    storage.get.return_value = None
+    cache = SearchResultCache(storage)
+    with patch.object(search_handler, "search_result_cache", cache):
+        yield cache
+
+
+@pytest.mark.asyncio
+async def test_perform_vehicle_search_runs_filters_and_embedding_concurrently():
+    events = []
+
+    async def generate_response(messages, task=None):
+        events.append("filters:start")
+        await asyncio.sleep(0.01)
+        events.append("filters:end")
+        return '{"make": "Mazda"}'
+
+    async def get_embedding(query):
+        events.append("embedding:start")
+        await asyncio.sleep(0.01)
+        events.append("embedding:end")
+        return [0.1, 0.2]
+
+    timer = StageTimer()
+    with patch.object(search_handler, "get_filter_parser", new_callable=AsyncMock, return_value=RuleBasedFilterParser([])), \
+         patch.object(search_handler.llm, "generate_response", side_effect=generate_response), \
+         patch.object(search_handler, "get_embedding", side_effect=get_embedding), \
+         patch.object(search_handler.search_engine_storage, "knn_search", new_callable=AsyncMock) as mock_knn:
+        mock_knn.return_value = [{"stock_id": 1}]
+        results = await search_handler.perform_vehicle_search("mazda 2020", k=3, timer=timer)
+
+    assert results == [{"stock_id": 1}]
+    assert events[:2] == ["filters:start", "embedding:start"]
+    mock_knn.assert_awaited_once_with([0.1, 0.2], k=3, filters={"make": "Mazda"})
+    assert set(timer.as_dict()) == {"cache", "filters", "embedding", "knn", "total"}
+
+
+@pytest.mark.asyncio
+async def test_repeated_search_skips_llm_and_knn():
+    with patch.object(search_handler, "extract_filters", new_callable=AsyncMock, return_value={}) as mock_filters, \
+         patch.object(search_handler, "get_embedding", new_callable=AsyncMock, return_value=[0.1]), \
+         patch.object(search_handler.search_engine_storage, "knn_search", new_callable=AsyncMock) as mock_knn:
+        mock_knn.return_value = [{"stock_id": 1}]
+        await search_handler.perform_vehicle_search("Jetta 2018", k=3)
+        results = await search_handler.perform_vehicle_search("jetta  2018", k=3)
+
+    assert results == [{"stock_id": 1}]
+    mock_filters.assert_awaited_once()
+    mock_knn.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_extract_filters_skips_llm_for_common_queries():
+    parser = RuleBasedFilterParser([("Mazda", "3")])
+    with patch.object(search_handler, "get_filter_parser", new_callable=AsyncMock, return_value=parser), \
+         patch.object(search_handler.llm, "generate_response", new_callable=AsyncMock) as mock_llm:
+        filters = await search_handler.extract_filters("mazda con car play y menos de 400 mil")
+
+    mock_llm.assert_not_awaited()
+    assert filters["should"] == [{"match": {"metadata.make": "Mazda"}}]
+
+
+@pytest.mark.asyncio
+async def test_extract_filters_falls_back_to_llm():
+    parser = RuleBasedFilterParser([("Mazda", "3")])
+    with patch.object(search_handler, "get_filter_parser", new_callable=AsyncMock, return_value=parser), \
+         patch.object(search_handler.llm, "generate_response", new_callable=AsyncMock) as mock_llm:
+        mock_llm.return_value = '{"filter": []}'
+        filters = await search_handler.extract_filters("suv familiar barata")
+
+    mock_llm.assert_awaited_once()
+    assert filters == {"filter": []}
+
+
+@pytest.mark.asyncio
+async def test_extract_filters_caches_llm_answers(empty_filter_cache):
+    parser = RuleBasedFilterParser([])
+    with patch.object(search_handler, "get_filter_parser", new_callable=AsyncMock, return_value=parser), \
+         patch.object(search_handler.llm, "generate_response", new_callable=AsyncMock) as mock_llm:
+        mock_llm.return_value = '{"filter": []}'
+        await search_handler.extract_filters("SUV familiar barata")
+        filters = await search_handler.extract_filters("suv  familiar barata")
+
+    mock_llm.assert_awaited_once()
+    assert filters == {"filter": []}
+
+
+@pytest.mark.asyncio
+async def test_extract_filters_negatively_caches_invalid_json(empty_filter_cache):
+    parser = RuleBasedFilterParser([])
+    with patch.object(search_handler, "get_filter_parser", new_callable=AsyncMock, return_value=parser), \
+         patch.object(search_handler.llm, "generate_response", new_callable=AsyncMock) as mock_llm:
+        mock_llm.return_value = "Claro, aquí tienes los filtros"
+        first = await search_handler.extract_filters("algo bonito")
+        second = await search_handler.extract_filters("algo bonito")
+
+    assert first == second == {}
+    mock_llm.assert_awaited_once()
+    assert await empty_filter_cache.get("algo bonito") == INVALID_ENTRY
+
+
+@pytest.mark.asyncio
+async def test_llm_outage_is_not_cached(empty_filter_cache, empty_search_cache):
+    parser = RuleBasedFilterParser([])
+    with patch.object(search_handler, "get_filter_parser", new_callable=AsyncMock, return_value=parser), \
+         patch.object(search_handler.llm, "generate_response", new_callable=AsyncMock) as mock_llm, \
+         patch.object(search_handler, "get_embedding", new_callable=AsyncMock, return_value=[0.1]), \
+         patch.object(search_handler.search_engine_storage, "knn_search", new_callable=AsyncMock) as mock_knn:
+        mock_llm.side_effect = [CircuitOpenError("open"), '{"filter": []}']
+        mock_knn.return_value = [{"stock_id": 1}]
+        first = await search_handler.perform_vehicle_search("algo bonito", k=3)
+        second = await search_handler.perform_vehicle_search("algo bonito", k=3)
+
+    assert first == second == [{"stock_id": 1}]
+    assert mock_llm.await_count == 2
+    assert mock_knn.await_args_list[0].kwargs["filters"] == {}
+    assert mock_knn.await_args_list[1].kwargs["filters"] == {"filter": []}
+    assert await empty_filter_cache.get("algo bonito") == {"filters": {"filter": []}}
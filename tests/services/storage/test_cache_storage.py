@@ -1,5 +1,6 @@
 import pytest
-from unittest.mock import AsyncMock
+from unittest.mock import AsyncMock, MagicMock
+from redis.exceptions import WatchError
 import json
 
 from app.services.storage.cache_storage import CacheStorage
@@ -56,4 +57,157 @@ async def test_get_raw(cache, mocker):
     mock_redis.get.return_value = b'raw_string'
 
     raw_value = await cache.get_raw("key3")
-    assert raw_value == b'raw_string'
\ No newline at end of file
+    assert raw_value == b'raw_string'
+
+@pytest.mark.asyncio
+async def test_hash_fields(cache, mocker):
+    mock_redis = AsyncMock()
+    mocker.patch("app.services.storage.cache_storage.get_redis_client", return_value=mock_redis)
+    mock_redis.hmget.return_value = ["a", None]
+
+    values = await cache.get_hash_fields("h", ["1", "2"])
+    await cache.set_hash_fields("h", {"1": "a"})
+    await cache.delete_hash_fields("h", ["2"])
+
+    assert values == ["a", None]
+    mock_redis.hmget.assert_awaited_once_with("test:h", ["1", "2"])
+    mock_redis.hset.assert_awaited_once_with("test:h", mapping={"1": "a"})
+    mock_redis.hdel.assert_awaited_once_with("test:h", "2")
+
+@pytest.mark.asyncio
+async def test_set_if_absent(cache, mocker):
+    mock_redis = AsyncMock()
+    mocker.patch("app.services.storage.cache_storage.get_redis_client", return_value=mock_redis)
+    mock_redis.set.return_value = None
+
+    acquired = await cache.set_if_absent("lock", "1", 30)
+
+    assert acquired is False
+    mock_redis.set.assert_awaited_once_with("test:lock", "1", nx=True, ex=30)
+
+
+def make_pipeline(mock_redis, results):
+    pipe = MagicMock()
+    pipe.__aenter__ = AsyncMock(return_value=pipe)
+    pipe.__aexit__ = AsyncMock(return_value=False)
+    pipe.execute = AsyncMock(return_value=results)
+    pipe.watch = AsyncMock()
+    pipe.type = AsyncMock()
+    pipe.get = AsyncMock()
+    mock_redis.pipeline = MagicMock(return_value=pipe)
+    return pipe
+
+@pytest.mark.asyncio
+async def test_push_to_list_serializes_each_value_and_trims(cache, mocker):
+    mock_redis = AsyncMock()
+    mocker.patch("app.services.storage.cache_storage.get_redis_client", return_value=mock_redis)
+    pipe = make_pipeline(mock_redis, [5, True])
+
+    length = await cache.push_to_list("conv", [{"a": 1}, "hola"], max_length=3)
+
+    pipe.rpush.assert_called_once_with("test:conv", '{"a": 1}', '"hola"')
+    pipe.ltrim.assert_called_once_with("test:conv", -3, -1)
+    mock_redis.pipeline.assert_called_once_with(transaction=True)
+    assert length == 3
+
+@pytest.mark.asyncio
+async def test_push_to_list_without_max_length_does_not_trim(cache, mocker):
+    mock_redis = AsyncMock()
+    mocker.patch("app.services.storage.cache_storage.get_redis_client", return_value=mock_redis)
+    pipe = make_pipeline(mock_redis, [2])
+
+    assert await cache.push_to_list("conv", [1, 2]) == 2
+    pipe.ltrim.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_push_to_list_with_no_values_returns_length(cache, mocker):
+    mock_redis = AsyncMock()
+    mocker.patch("app.services.storage.cache_storage.get_redis_client", return_value=mock_redis)
+    mock_redis.llen.return_value = 4
+
+    assert await cache.push_to_list("conv", []) == 4
+    mock_redis.pipeline.assert_not_called()
+
+@pytest.mark.asyncio
+async def test_get_list_range_deserializes_items(cache, mocker):
+    mock_redis = AsyncMock()
+    mocker.patch("app.services.storage.cache_storage.get_redis_client", return_value=mock_redis)
+    mock_redis.lrange.return_value = ['{"a": 1}', '"hola"']
+
+    assert await cache.get_list_range("conv", -2, -1) == [{"a": 1}, "hola"]
+    mock_redis.lrange.assert_called_once_with("test:conv", -2, -1)
+
+@pytest.mark.asyncio
+async def test_trim_list(cache, mocker):
+    mock_redis = AsyncMock()
+    mocker.patch("app.services.storage.cache_storage.get_redis_client", return_value=mock_redis)
+
+    await cache.trim_list("conv", -10, -1)
+    mock_redis.ltrim.assert_called_once_with("test:conv", -10, -1)
+
+@pytest.mark.asyncio
+async def test_convert_to_list_rewrites_json_array(cache, mocker):
+    mock_redis = AsyncMock()
+    mocker.patch("app.services.storage.cache_storage.get_redis_client", return_value=mock_redis)
+    pipe = make_pipeline(mock_redis, [1, 2])
+    pipe.type.return_value = "string"
+    pipe.get.return_value = json.dumps([{"a": 1}, {"b": 2}])
+
+    assert await cache.convert_to_list("conv") is True
+    pipe.watch.assert_awaited_once_with("test:conv")
+    pipe.multi.assert_called_once()
+    pipe.delete.assert_called_once_with("test:conv")
+    pipe.rpush.assert_called_once_with("test:conv", '{"a": 1}', '{"b": 2}')
+
+@pytest.mark.asyncio
+async def test_convert_to_list_skips_lists_and_non_arrays(cache, mocker):
+    mock_redis = AsyncMock()
+    mocker.patch("app.services.storage.cache_storage.get_redis_client", return_value=mock_redis)
+    pipe = make_pipeline(mock_redis, [])
+
+    pipe.type.return_value = "list"
+    assert await cache.convert_to_list("conv") is False
+    pipe.type.return_value = "string"
+    pipe.get.return_value = json.dumps({"a": 1})
+    assert await cache.convert_to_list("conv") is False
+    pipe.execute.assert_not_awaited()
+
+@pytest.mark.asyncio
+async def test_convert_to_list_gives_up_on_concurrent_write(cache, mocker):
+    mock_redis = AsyncMock()
+    mocker.patch("app.services.storage.cache_storage.get_redis_client", return_value=mock_redis)
+    pipe = make_pipeline(mock_redis, [])
+    pipe.type.return_value = "string"
+    pipe.get.return_value = json.dumps([1])
+    pipe.execute.side_effect = WatchError()
+
+    assert await cache.convert_to_list("conv") is False
+
+@pytest.mark.asyncio
+async def test_scan_keys_strips_namespace(cache, mocker):
+    mock_redis = MagicMock()
+    mocker.patch("app.services.storage.cache_storage.get_redis_client", AsyncMock(return_value=mock_redis))
+
+    async def scan_iter(match, count):
+        assert match == "test:*"
+        for key in ("test:u1", "test:u2"):
+            yield key
+
+    mock_redis.scan_iter = scan_iter
+    assert await cache.scan_keys() == ["u1", "u2"]
+
+@pytest.mark.asyncio
+async def test_sorted_set_operations(cache, mocker):
+    mock_redis = AsyncMock()
+    mocker.patch("app.services.storage.cache_storage.get_redis_client", return_value=mock_redis)
+    mock_redis.zrangebyscore.return_value = ["u1"]
+    mock_redis.zscore.return_value = 12.5
+
+    await cache.add_to_sorted_set("active", {"u1": 12.5})
+    assert await cache.get_sorted_set_range_by_score("active", "-inf", 20, offset=3, count=10) == ["u1"]
+    assert await cache.get_sorted_set_score("active", "u1") == 12.5
+    await cache.remove_from_sorted_set("active", "u1")
+
+    mock_redis.zadd.assert_called_once_with("test:active", {"u1": 12.5})
+    mock_redis.zrangebyscore.assert_called_once_with("test:active", "-inf", 20, start=3, num=10)
+    mock_redis.zrem.assert_called_once_with("test:active", "u1")
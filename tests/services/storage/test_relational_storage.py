@@ -0,0 +1,110 @@
+import pytest
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from sqlalchemy.dialects import postgresql
+
+from app.services.ingestion.pipeline import INGESTION_BATCH_SIZE
+from app.services.storage.relational_storage import COPY_THRESHOLD, RelationalStorage
+
+
+def make_record(stock_id: int, price: float = 250000.0) -> dict:
+    return {
+        "stock_id": stock_id,
+        "km": 1000,
+        "price": price,
+        "make": "Mazda",
+        "model": "3",
+        "year": 2020,
+        "version": "i Touring",
+        "bluetooth": True,
+        "largo": 4460.0,
+        "ancho": 1795.0,
+        "altura": 1450.0,
+        "car_play": True,
+    }
+
+
+def make_session(inserted_flags):
+    result = MagicMock()
+    result.scalars.return_value.all.return_value = inserted_flags
+    session = MagicMock()
+    session.execute = AsyncMock(return_value=result)
+    session.__aenter__ = AsyncMock(return_value=session)
+    session.__aexit__ = AsyncMock(return_value=False)
+    transaction = MagicMock()
+    transaction.__aenter__ = AsyncMock()
+    transaction.__aexit__ = AsyncMock(return_value=False)
+    session.begin.return_value = transaction
+    return session
+
+
+def test_upsert_statement_uses_on_conflict():
+    storage = RelationalStorage()
+    statement = storage._build_upsert_statement([make_record(1), make_record(2)])
+    sql = str(statement.compile(dialect=postgresql.dialect()))
+
+    assert "ON CONFLICT (stock_id) DO UPDATE SET" in sql
+    assert "price = excluded.price" in sql
+    assert "RETURNING (xmax = 0)" in sql
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_counts_inserted_and_updated():
+    storage = RelationalStorage()
+    session = make_session([True, False])
+    storage.session_local = MagicMock(return_value=session)
+
+    result = await storage.bulk_upsert(
+        [make_record(1), make_record(2, price=1.0), make_record(2, price=2.0)]
+    )
+
+    assert result == {"inserted": 1, "updated": 1}
+    session.execute.assert_awaited_once()
+
+
+def make_copy_connection(inserted_flags):
+    driver = MagicMock()
+    driver.execute = AsyncMock()
+    driver.copy_records_to_table = AsyncMock()
+    driver.fetch = AsyncMock(return_value=[{"inserted": flag} for flag in inserted_flags])
+    transaction = MagicMock()
+    transaction.__aenter__ = AsyncMock()
+    transaction.__aexit__ = AsyncMock(return_value=False)
+    driver.transaction.return_value = transaction
+    conn = MagicMock()
+    conn.get_raw_connection = AsyncMock(return_value=MagicMock(driver_connection=driver))
+    conn.__aenter__ = AsyncMock(return_value=conn)
+    conn.__aexit__ = AsyncMock(return_value=False)
+    return conn, driver
+
+
+@pytest.mark.asyncio
+async def test_bulk_upsert_copies_a_full_ingestion_batch():
+    storage = RelationalStorage()
+    records = [make_record(stock_id) for stock_id in range(INGESTION_BATCH_SIZE)]
+    conn, driver = make_copy_connection([True] * (len(records) - 1) + [False])
+    storage.engine = MagicMock()
+    storage.engine.connect.return_value = conn
+    storage.session_local = MagicMock()
+
+    result = await storage.bulk_upsert(records)
+
+    assert INGESTION_BATCH_SIZE >= COPY_THRESHOLD
+    assert result == {"inserted": len(records) - 1, "updated": 1}
+    storage.session_local.assert_not_called()
+    table, = driver.copy_records_to_table.await_args.args
+    kwargs = driver.copy_records_to_table.await_args.kwargs
+    assert table == "vehicle_staging"
+    assert len(kwargs["records"]) == len(records)
+    assert kwargs["records"][0][kwargs["columns"].index("stock_id")] == 0
+    assert "CREATE TEMP TABLE" in driver.execute.await_args.args[0]
+    assert "ON CONFLICT (stock_id) DO UPDATE" in driver.fetch.await_args.args[0]
+
+
+@pytest.mark.asyncio
+async def test_bulk_load_returns_records():
+    storage = RelationalStorage()
+    records = [make_record(1)]
+    with patch.object(storage, "bulk_upsert", new_callable=AsyncMock) as mock_upsert:
+        assert await storage.bulk_load({"records": records}) == records
+    mock_upsert.assert_awaited_once_with(records)
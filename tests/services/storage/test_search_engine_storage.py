@@ -1,5 +1,6 @@
 import pytest
 from unittest.mock import AsyncMock, patch
+from app.services.cache.search_cache import SearchResultCache
 from app.services.storage.search_engine_storage import SearchEngineStorage, filters_to_opensearch_clauses
 
 @pytest.mark.asyncio
@@ -60,9 +61,89 @@ async def test_index_with_embedding(mock_get_client):
     mock_get_client.return_value = mock_client
 
     storage = SearchEngineStorage()
-    await storage.index_with_embedding("text", {"make": "Mazda"}, [0.1] * 1536)
+    await storage.index_with_embedding(
+        "text", {"stock_id": 7, "make": "Mazda"}, [0.1] * 1536
+    )
 
-    mock_client.index.assert_called_once()
+    mock_client.update.assert_called_once()
+    assert mock_client.update.call_args.kwargs["id"] == 7
+    assert mock_client.update.call_args.kwargs["body"]["doc_as_upsert"] is True
+
+def fake_streaming_bulk(results):
+    async def streaming_bulk(client, actions, **kwargs):
+        list(actions)
+        for result in results:
+            yield result
+
+    return streaming_bulk
+
+@pytest.mark.asyncio
+@patch("app.services.storage.search_engine_storage.get_open_search_client")
+async def test_bulk_index_with_embedding_collects_errors(mock_get_client):
+    mock_client = AsyncMock()
+    mock_get_client.return_value = mock_client
+    failed = {"update": {"status": 400, "error": {"type": "mapper_parsing_exception"}}}
+
+    with patch(
+        "app.services.storage.search_engine_storage.async_streaming_bulk",
+        fake_streaming_bulk([(True, {"update": {"status": 201, "result": "created"}}), (False, failed)]),
+    ):
+        storage = SearchEngineStorage()
+        result = await storage.bulk_index_with_embedding(
+            [("a", {"stock_id": 1}, [0.1]), ("b", {"stock_id": 2}, [0.2])]
+        )
+
+    assert result == {"created": 1, "updated": 0, "unchanged": 0, "errors": [failed]}
+    mock_client.indices.put_settings.assert_not_called()
+
+@pytest.mark.asyncio
+@patch("app.services.storage.search_engine_storage.get_open_search_client")
+async def test_bulk_index_with_embedding_upserts_by_stock_id(mock_get_client):
+    mock_get_client.return_value = AsyncMock()
+    captured = []
+    results = [
+        (True, {"update": {"_id": "1", "result": "created"}}),
+        (True, {"update": {"_id": "2", "result": "updated"}}),
+        (True, {"update": {"_id": "3", "result": "noop"}}),
+    ]
+
+    async def streaming_bulk(client, actions, **kwargs):
+        captured.extend(actions)
+        for result in results:
+            yield result
+
+    with patch("app.services.storage.search_engine_storage.async_streaming_bulk", streaming_bulk):
+        storage = SearchEngineStorage()
+        result = await storage.bulk_index_with_embedding(
+            [("t", {"stock_id": i}, [0.1]) for i in (1, 2, 3)]
+        )
+
+    assert result == {"created": 1, "updated": 1, "unchanged": 1, "errors": []}
+    assert [action["_id"] for action in captured] == [1, 2, 3]
+    assert all(action["_op_type"] == "update" and action["doc_as_upsert"] for action in captured)
+
+@pytest.mark.asyncio
+@patch("app.services.storage.search_engine_storage.get_open_search_client")
+async def test_bulk_index_with_embedding_restores_refresh_interval(mock_get_client):
+    mock_client = AsyncMock()
+    mock_get_client.return_value = mock_client
+    mock_client.indices.get_settings.return_value = {
+        "vehicles": {"settings": {"index": {"refresh_interval": "5s"}}}
+    }
+
+    with patch(
+        "app.services.storage.search_engine_storage.async_streaming_bulk",
+        fake_streaming_bulk([(True, {"update": {"status": 201, "result": "created"}})]),
+    ):
+        storage = SearchEngineStorage()
+        await storage.bulk_index_with_embedding(
+            [("a", {"stock_id": 1}, [0.1])], disable_refresh=True
+        )
+
+    calls = mock_client.indices.put_settings.call_args_list
+    assert calls[0].kwargs["body"] == {"index": {"refresh_interval": "-1"}}
+    assert calls[1].kwargs["body"] == {"index": {"refresh_interval": "5s"}}
+    mock_client.indices.refresh.assert_awaited_once()
 
 @pytest.mark.asyncio
 @patch("app.services.storage.search_engine_storage.get_open_search_client")
@@ -73,10 +154,30 @@ async def test_knn_search(mock_get_client):
         "hits": {"hits": [{"_source": {"make": "Mazda"}}]}
     }
 
-    storage = SearchEngineStorage()
+    storage = SearchEngineStorage(result_cache=None)
+    result = await storage.knn_search([0.1] * 1536, filters={"filter": []})
+
+    assert result == [{"make": "Mazda"}]
+
+
+@pytest.mark.asyncio
+@patch("app.services.storage.search_engine_storage.get_open_search_client")
+async def test_knn_search_uses_result_cache(mock_get_client):
+    mock_client = AsyncMock()
+    mock_get_client.return_value = mock_client
+    mock_client.search.return_value = {
+        "hits": {"hits": [{"_source": {"make": "Mazda"}}]}
+    }
+    cache_storage = AsyncMock()
+    cache_storage.get.return_value = None
+
+    storage = SearchEngineStorage(result_cache=SearchResultCache(cache_storage))
+    await storage.knn_search([0.1] * 1536, filters={"filter": []})
     result = await storage.knn_search([0.1] * 1536, filters={"filter": []})
+    await storage.knn_search([0.1] * 1536, k=3, filters={"filter": []})
 
     assert result == [{"make": "Mazda"}]
+    assert mock_client.search.await_count == 2
 
 def test_filters_to_opensearch_clauses():
     filters = {
@@ -1,7 +1,7 @@
 
 
 import pytest
-from app.utils.helpers import chunk_records, parse_bool, parse_float
+from app.utils.helpers import chunk_records, fold_text, parse_bool, parse_float
 
 
 def test_chunk_records_basic():
@@ -31,4 +31,7 @@ def test_parse_float_valid():
 def test_parse_float_invalid():
     assert parse_float("abc") == 0.0
     assert parse_float(None) == 0.0
-    assert parse_float("", default=1.23) == 1.23
\ No newline at end of file
+    assert parse_float("", default=1.23) == 1.23
+
+def test_fold_text():
+    assert fold_text("  Año   Económico\tSUV ") == "ano economico suv"
@@ -1,7 +1,18 @@
+import asyncio
+
 import pytest
-from unittest.mock import AsyncMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
+
+from app.utils.openai_utils import get_embedding, get_embeddings
+
+
+@pytest.fixture(autouse=True)
+def empty_cache():
+    with patch("app.utils.openai_utils.embedding_cache") as mock_cache:
+        mock_cache.get_many = AsyncMock(side_effect=lambda model, texts: [None] * len(texts))
+        mock_cache.set_many = AsyncMock()
+        yield mock_cache
 
-from app.utils.openai_utils import get_embedding
 
 @pytest.mark.asyncio
 async def test_get_embedding():
@@ -17,4 +28,60 @@ async def test_get_embedding():
         mock_get_client.return_value = mock_client
         result = await get_embedding("Mazda 3")
         assert result == fake_embedding
-        mock_client.embeddings.create.assert_awaited_once_with(input=["Mazda 3"], model="text-embedding-3-small")
\ No newline at end of file
+        mock_client.embeddings.create.assert_awaited_once_with(input=["Mazda 3"], model="text-embedding-3-small")
+
+@pytest.mark.asyncio
+async def test_get_embeddings_sends_single_request_and_keeps_order():
+    mock_response = MagicMock()
+    mock_response.data = [
+        MagicMock(index=1, embedding=[0.2]),
+        MagicMock(index=0, embedding=[0.1]),
+    ]
+
+    mock_client = AsyncMock()
+    mock_client.embeddings.create.return_value = mock_response
+
+    with patch("app.utils.openai_utils.get_openai_client", new_callable=AsyncMock) as mock_get_client:
+        mock_get_client.return_value = mock_client
+        result = await get_embeddings(["Mazda 3", "Kia Rio"])
+        assert result == [[0.1], [0.2]]
+        mock_client.embeddings.create.assert_awaited_once_with(
+            input=["Mazda 3", "Kia Rio"], model="text-embedding-3-small"
+        )
+
+
+@pytest.mark.asyncio
+async def test_get_embeddings_only_requests_cache_misses(empty_cache):
+    empty_cache.get_many = AsyncMock(return_value=[[0.9], None, None])
+    mock_response = MagicMock()
+    mock_response.data = [MagicMock(index=0, embedding=[0.2])]
+
+    mock_client = AsyncMock()
+    mock_client.embeddings.create.return_value = mock_response
+
+    with patch("app.utils.openai_utils.get_openai_client", new_callable=AsyncMock) as mock_get_client:
+        mock_get_client.return_value = mock_client
+        result = await get_embeddings(["Mazda 3", "Kia  Rio", "Kia Rio"])
+
+    assert result == [[0.9], [0.2], [0.2]]
+    mock_client.embeddings.create.assert_awaited_once_with(
+        input=["Kia Rio"], model="text-embedding-3-small"
+    )
+    empty_cache.set_many.assert_awaited_once_with("text-embedding-3-small", {"Kia Rio": [0.2]})
+
+
+@pytest.mark.asyncio
+async def test_get_embedding_coalesces_identical_concurrent_calls():
+    async def create(**kwargs):
+        await asyncio.sleep(0.01)
+        return MagicMock(data=[MagicMock(index=0, embedding=[0.5])])
+
+    mock_client = AsyncMock()
+    mock_client.embeddings.create.side_effect = create
+
+    with patch("app.utils.openai_utils.get_openai_client", new_callable=AsyncMock) as mock_get_client:
+        mock_get_client.return_value = mock_client
+        results = await asyncio.gather(get_embedding("Jetta"), get_embedding(" Jetta "))
+
+    assert results == [[0.5], [0.5]]
+    mock_client.embeddings.create.assert_awaited_once()
@@ -0,0 +1,17 @@
+from app.utils.timing import StageTimer
+
+
+def test_stage_timer_records_durations():
+    timer = StageTimer()
+    with timer.stage("knn"):
+        pass
+
+    assert list(timer.as_dict()) == ["knn"]
+    assert timer.as_dict()["knn"] >= 0
+
+
+def test_server_timing_header():
+    timer = StageTimer()
+    timer.durations = {"filters": 412.34, "knn": 20.0}
+
+    assert timer.server_timing() == "filters;dur=412.3, knn;dur=20.0"